@@ -0,0 +1,146 @@
+# backend/benchmarks/bench_overlay.py - Custo de anotação por frame vs. número de boxes
+#
+# Compara o desenho antigo (getTextSize/putText por box e painel redesenhado a
+# cada frame) com o OverlayRenderer (sprites e painel em cache).
+#
+# Uso (a partir de backend/):
+#   python -m benchmarks.bench_overlay [--frames 300] [--width 640] [--height 480]
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.infrastructure.presenters.overlay_renderer import OverlayRenderer  # noqa: E402
+
+COLORS = {
+    "person_box": (0, 255, 255),
+    "person_label_bg": (0, 200, 200),
+    "person_text": (0, 0, 0),
+    "face_box": (255, 128, 0),
+    "face_label_bg": (200, 100, 0),
+    "face_text": (255, 255, 255),
+    "info_bg": (0, 0, 0),
+    "info_text": (255, 255, 255),
+}
+
+BOX_COUNTS = [0, 1, 2, 4, 8, 16, 32]
+
+
+def legacy_annotate(frame, results, total_passed, fps):
+    """Reprodução do detect_and_annotate anterior (referência)."""
+    annotated = frame.copy()
+
+    for i, (x1, y1, x2, y2) in enumerate(results["people_boxes"]):
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), COLORS["person_box"], 2)
+        label = f"P{i+1}"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+        cv2.rectangle(
+            annotated,
+            (x1, max(y1 - label_size[1] - 8, 0)),
+            (x1 + label_size[0] + 8, y1),
+            COLORS["person_label_bg"],
+            cv2.FILLED,
+        )
+        cv2.putText(
+            annotated, label, (x1 + 4, y1 - 4),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLORS["person_text"], 2,
+        )
+
+    for i, (x1, y1, x2, y2) in enumerate(results["face_boxes"]):
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), COLORS["face_box"], 2)
+        label = f"F{i+1}"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+        cv2.rectangle(
+            annotated,
+            (x1, max(y1 - label_size[1] - 6, 0)),
+            (x1 + label_size[0] + 6, y1),
+            COLORS["face_label_bg"],
+            cv2.FILLED,
+        )
+        cv2.putText(
+            annotated, label, (x1 + 3, y1 - 3),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLORS["face_text"], 1,
+        )
+
+    cv2.rectangle(annotated, (10, 10), (300, 140), COLORS["info_bg"], cv2.FILLED)
+    cv2.rectangle(annotated, (10, 10), (300, 140), (100, 100, 100), 1)
+    info_lines = [
+        f"Pessoas: {results['people_count']}",
+        f"Rostos: {results['faces_count']}",
+        f"Total Passaram: {total_passed}",
+        f"FPS: {fps:.1f}",
+        f"Tempo: {datetime.now().strftime('%H:%M:%S')}",
+    ]
+    for i, line in enumerate(info_lines):
+        cv2.putText(
+            annotated, line, (20, 35 + i * 22),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLORS["info_text"], 1,
+        )
+    return annotated
+
+
+def cached_annotate(renderer, frame, results, total_passed, fps):
+    annotated = frame.copy()
+    renderer.render(annotated, results, total_passed, fps)
+    return annotated
+
+
+def make_results(n, width, height, rng):
+    people, faces = [], []
+    for _ in range(n):
+        x1 = int(rng.integers(0, width - 120))
+        y1 = int(rng.integers(30, height - 200))
+        people.append((x1, y1, x1 + 100, y1 + 180))
+        faces.append((x1 + 30, y1 + 10, x1 + 70, y1 + 50))
+    return {
+        "people_boxes": people,
+        "face_boxes": faces,
+        "people_count": n,
+        "faces_count": n,
+    }
+
+
+def bench(fn, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames * 1e6  # µs por frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    renderer = OverlayRenderer(COLORS)
+
+    # Mesma imagem nos dois caminhos para validar equivalência visual
+    sample = make_results(4, args.width, args.height, rng)
+    diff = np.count_nonzero(
+        legacy_annotate(frame, sample, 7, 29.9) != cached_annotate(renderer, frame, sample, 7, 29.9)
+    )
+    print(f"pixels diferentes (4 boxes): {diff}")
+
+    print(f"{'boxes':>6} {'legado (µs)':>12} {'cache (µs)':>12} {'ganho':>7}")
+    for n in BOX_COUNTS:
+        results = make_results(n, args.width, args.height, rng)
+        legacy = bench(lambda: legacy_annotate(frame, results, 7, 29.9), args.frames)
+        cached = bench(lambda: cached_annotate(renderer, frame, results, 7, 29.9), args.frames)
+        print(f"{n:>6} {legacy:>12.1f} {cached:>12.1f} {legacy / cached:>6.2f}x")
+
+    print(f"rebuilds do painel: {renderer.panel_rebuilds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# backend/benchmarks/bench_security_middleware.py - Custo do middleware de segurança
+#
+# Compara o middleware antigo (função em `app.middleware("http")`, ou seja,
+# BaseHTTPMiddleware, com CSP/CORS montados a cada chamada) com o
+# SecurityMiddleware ASGI puro. Chama a aplicação ASGI direto, sem servidor,
+# para medir só o custo do middleware:
+#   - requisições/s num endpoint JSON pequeno
+#   - vazão (MB/s) e custo por chunk numa resposta em streaming tipo MJPEG
+#
+# Uso (a partir de backend/):
+#   python -m benchmarks.bench_security_middleware [--requests 5000] [--chunks 2000] [--chunk-kb 64]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Rate limit fora do caminho: o benchmark repete o mesmo "IP" milhares de vezes
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1e12")
+os.environ.setdefault("RATE_LIMIT_BURST", "1e12")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, HTTPException, Request  # noqa: E402
+from fastapi.responses import JSONResponse, Response, StreamingResponse  # noqa: E402
+
+from src.infrastructure.middleware import SecurityMiddleware  # noqa: E402
+from src.infrastructure.services import check_rate_limit  # noqa: E402
+
+
+async def legacy_security_middleware(request: Request, call_next):
+    """Reprodução do security_middleware anterior (referência)."""
+    EXEMPT_RATE_LIMIT_PREFIXES = (
+        "/stats",
+        "/performance",
+        "/camera/status",
+        "/health",
+        "/stream",
+        "/hls",
+    )
+    if request.method == "OPTIONS":
+        response = Response(status_code=204)
+        origin = request.headers.get("origin", "http://localhost:3000")
+        req_headers = request.headers.get("access-control-request-headers", "*")
+        req_method = request.headers.get("access-control-request-method", "*")
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Methods"] = req_method or "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = req_headers or "*"
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        return response
+    client_ip = request.client.host
+    current_time = time.time()
+
+    try:
+        if not any(request.url.path.startswith(p) for p in EXEMPT_RATE_LIMIT_PREFIXES):
+            check_rate_limit(client_ip, current_time)
+        response = await call_next(request)
+    except HTTPException as http_exc:
+        origin = request.headers.get("origin", "http://localhost:3000")
+        response = JSONResponse({"detail": http_exc.detail}, status_code=http_exc.status_code)
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        return response
+
+    response.headers["X-Frame-Options"] = "DENY"
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["X-XSS-Protection"] = "1; mode=block"
+    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    default_csp = (
+        "default-src 'self'; "
+        "base-uri 'self'; "
+        "img-src 'self' data:; "
+        "font-src 'self'; "
+        "style-src 'self' 'unsafe-inline'; "
+        "script-src 'self' 'unsafe-inline'; "
+        "connect-src 'self'; "
+        "frame-ancestors 'self'"
+    )
+    docs_csp = (
+        "default-src 'self'; "
+        "base-uri 'self'; "
+        "img-src 'self' data: https://fastapi.tiangolo.com https://cdn.jsdelivr.net; "
+        "font-src 'self' https://cdn.jsdelivr.net; "
+        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        "connect-src 'self'; "
+        "frame-ancestors 'self'"
+    )
+    request_path = request.url.path or ""
+    if request_path.startswith("/docs") or request_path.startswith("/redoc"):
+        response.headers["Content-Security-Policy"] = docs_csp
+    else:
+        response.headers["Content-Security-Policy"] = default_csp
+
+    if "Access-Control-Allow-Origin" not in response.headers:
+        origin = request.headers.get("origin", "http://localhost:3000")
+        response.headers["Access-Control-Allow-Origin"] = origin
+    if "Access-Control-Allow-Methods" not in response.headers:
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+    if "Access-Control-Allow-Headers" not in response.headers:
+        response.headers["Access-Control-Allow-Headers"] = "*"
+    if "Access-Control-Allow-Credentials" not in response.headers:
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+    return response
+
+
+def build_app(kind: str, chunks: int, chunk: bytes) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/video")
+    async def video():
+        async def frames():
+            for _ in range(chunks):
+                yield chunk
+
+        return StreamingResponse(frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+    if kind == "legacy":
+        app.middleware("http")(legacy_security_middleware)
+    elif kind == "asgi":
+        app.add_middleware(SecurityMiddleware)
+    return app
+
+
+def make_scope(path: str):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"origin", b"http://localhost:5173")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def call(app, path: str):
+    """Executa uma requisição; retorna (status, bytes do corpo, chunks, headers)."""
+    sent_request = False
+    result = {"status": None, "bytes": 0, "chunks": 0, "headers": []}
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # cliente nunca desconecta
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body:
+                result["bytes"] += len(body)
+                result["chunks"] += 1
+
+    await app(make_scope(path), receive, send)
+    return result
+
+
+async def bench_requests(app, n: int) -> float:
+    await call(app, "/ping")  # aquecimento (monta a pilha de middlewares)
+    start = time.perf_counter()
+    for _ in range(n):
+        await call(app, "/ping")
+    return n / (time.perf_counter() - start)
+
+
+async def bench_stream(app):
+    start = time.perf_counter()
+    result = await call(app, "/video")
+    elapsed = time.perf_counter() - start
+    return result["bytes"] / elapsed / 1e6, elapsed / max(1, result["chunks"]) * 1e6
+
+
+async def main_async(args):
+    chunk = os.urandom(args.chunk_kb * 1024)
+    apps = {kind: build_app(kind, args.chunks, chunk) for kind in ("none", "legacy", "asgi")}
+
+    # Os dois middlewares devem produzir os mesmos headers
+    legacy_headers = sorted((await call(apps["legacy"], "/ping"))["headers"])
+    asgi_headers = sorted((await call(apps["asgi"], "/ping"))["headers"])
+    print(f"headers idênticos: {legacy_headers == asgi_headers}")
+
+    print(f"{'cenário':>22} {'sem middleware':>15} {'legado':>12} {'asgi':>12} {'ganho':>7}")
+    rps = {kind: await bench_requests(app, args.requests) for kind, app in apps.items()}
+    print(
+        f"{'JSON (req/s)':>22} {rps['none']:>15.0f} {rps['legacy']:>12.0f} "
+        f"{rps['asgi']:>12.0f} {rps['asgi'] / rps['legacy']:>6.2f}x"
+    )
+
+    stream = {kind: await bench_stream(app) for kind, app in apps.items()}
+    print(
+        f"{'streaming (MB/s)':>22} {stream['none'][0]:>15.0f} {stream['legacy'][0]:>12.0f} "
+        f"{stream['asgi'][0]:>12.0f} {stream['asgi'][0] / stream['legacy'][0]:>6.2f}x"
+    )
+    print(
+        f"{'streaming (µs/chunk)':>22} {stream['none'][1]:>15.1f} {stream['legacy'][1]:>12.1f} "
+        f"{stream['asgi'][1]:>12.1f} {stream['legacy'][1] / stream['asgi'][1]:>6.2f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,12 @@ import numpy as np
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Tuple
 from collections import deque
+from types import MappingProxyType
 import queue
-from src.shared.config import brasilia_now
+import uuid
+from src.shared.config import brasilia_now, Config
+from src.infrastructure.presenters import OverlayRenderer
+from src.infrastructure.recording import ClipRecorder, FrameRing
 
 try:
     import torch  # type: ignore
@@ -79,15 +83,37 @@ class VisualDetector:
         self.frame_queue = queue.Queue(maxsize=BUFFER_SIZE)
         self.detection_results = {
             "people_boxes": [],
+            "people_ids": [],
             "face_boxes": [],
             "people_count": 0,
             "faces_count": 0,
             "last_update": 0,
+            "frame_seq": 0,  # seq do frame em que as boxes foram detectadas
+            "detection_seq": 0,
         }
+        self.detection_seq = 0
+
+        # Snapshot imutável das stats, republicado a cada tick de detecção
+        self.stats_seq = 0
+        self.stats_snapshot = None
 
         # Lock para resultados de detecção
         self.detection_lock = threading.Lock()
 
+        # Overlay com sprites de labels e painel de stats em cache
+        self.overlay = OverlayRenderer(COLORS)
+
+        # Último frame capturado (seq, timestamp, frame) - leitura sem consumir a fila
+        self.instance_id = uuid.uuid4().hex[:8]  # identifica a fonte nos caches
+        self.frame_seq = 0
+        self._latest_packet = None
+
+        # Listeners de eventos de tracking (ENTRY/EXIT e amostras OCCUPANCY),
+        # chamados na thread de detecção
+        self._event_listeners: List[Any] = []
+        self.camera_id = "webcam" if isinstance(src, int) else "ip_camera"
+        self._last_occupancy_sample = 0.0
+
         # Otimizações gerais do OpenCV
         try:
             cv2.setUseOptimized(True)
@@ -104,10 +130,41 @@ class VisualDetector:
         self.running = True
         self.last_detection_time = 0
         self.detection_interval = 1.0 / DETECTION_FPS
+        self._publish_stats_snapshot()
 
         # Iniciar threads
         self._start_threads()
 
+        # Gravação de clipes em eventos de entrada (opcional)
+        self.clip_recorder = None
+        if Config.CLIP_ENABLED:
+            self.clip_recorder = ClipRecorder(
+                self,
+                output_dir=Config.CLIP_DIR,
+                fps=Config.CLIP_FPS,
+                pre_roll_seconds=Config.CLIP_PRE_ROLL_SECONDS,
+                post_roll_seconds=Config.CLIP_POST_ROLL_SECONDS,
+                max_clip_seconds=Config.CLIP_MAX_SECONDS,
+                jpeg_quality=Config.CLIP_JPEG_QUALITY,
+                annotate=Config.CLIP_ANNOTATE,
+                writer_queue_size=Config.CLIP_WRITER_QUEUE,
+                max_disk_bytes=Config.CLIP_MAX_DISK_MB * 1024 * 1024,
+                retention_seconds=Config.CLIP_RETENTION_HOURS * 3600,
+            )
+            self.add_event_listener(self.clip_recorder.on_event)
+
+        # Histórico recente em ring mmap para replay (opcional)
+        self.frame_ring = None
+        if Config.RING_ENABLED:
+            self.frame_ring = FrameRing(
+                self,
+                capacity_bytes=Config.RING_MAX_MB * 1024 * 1024,
+                fps=Config.RING_FPS,
+                jpeg_quality=Config.RING_JPEG_QUALITY,
+                annotate=Config.RING_ANNOTATE,
+                directory=Config.RING_DIR or None,
+            )
+
     def _setup_camera(self, src):
         """Configuração ultra-otimizada da câmera.
 
@@ -301,11 +358,15 @@ class VisualDetector:
                         time.sleep(0.002)
                         continue
 
+                # Publicar frame mais recente para os streams (não consome a fila)
+                self.frame_seq += 1
+                self._latest_packet = (self.frame_seq, time.time(), frame)
+
                 # Buffer ultra-otimizado - sempre substituir frame mais recente
                 try:
                     if self.frame_queue.full():
                         self.frame_queue.get_nowait()  # Remove frame antigo
-                    self.frame_queue.put_nowait(frame)
+                    self.frame_queue.put_nowait(self._latest_packet)
                 except (queue.Full, queue.Empty):
                     pass
 
@@ -333,15 +394,16 @@ class VisualDetector:
 
                 # Obter frame mais recente
                 try:
-                    frame = self.frame_queue.get(timeout=0.01)  # Timeout mínimo
+                    packet = self.frame_queue.get(timeout=0.01)  # Timeout mínimo
                     # Limpar buffer - pegar sempre o mais recente
                     while not self.frame_queue.empty():
                         try:
-                            frame = self.frame_queue.get_nowait()
+                            packet = self.frame_queue.get_nowait()
                         except queue.Empty:
                             break
                 except queue.Empty:
                     continue
+                frame_seq, _, frame = packet
 
                 # Executar detecções
                 people_boxes, people_count = self._detect_people_with_boxes(frame)
@@ -349,15 +411,23 @@ class VisualDetector:
 
                 # Sistema de tracking avançado
                 tracked_count = self._track_persons(people_boxes)
+                people_ids = [
+                    self.person_tracking["active_persons"][f"P{i+1}"]["person_id"]
+                    for i in range(len(people_boxes))
+                ]
 
                 # Atualizar cache de resultados COM as coordenadas das boxes
                 with self.detection_lock:
+                    self.detection_seq += 1
                     self.detection_results = {
                         "people_boxes": people_boxes,  # Lista de (x1,y1,x2,y2)
+                        "people_ids": people_ids,  # IDs de tracking alinhados às boxes
                         "face_boxes": face_boxes,  # Lista de (x1,y1,x2,y2)
                         "people_count": tracked_count,  # Usar contagem tracked
                         "faces_count": faces_count,
                         "last_update": current_time,
+                        "frame_seq": frame_seq,
+                        "detection_seq": self.detection_seq,
                     }
 
                 # Atualizar contadores
@@ -366,6 +436,9 @@ class VisualDetector:
                 # Atualizar o tracking de detecção em tempo real
                 self._update_detection_tracker(tracked_count, faces_count)
 
+                # Stats prontas para /stats, /performance e /health
+                self._publish_stats_snapshot()
+
                 self.last_detection_time = current_time
 
             except Exception as e:
@@ -504,24 +577,62 @@ class VisualDetector:
 
         return frame
 
+    def get_frame_packet(self):
+        """Retorna (seq, timestamp, frame) do frame mais recente sem consumi-lo.
+
+        Vários consumidores (streams, snapshots) podem ler o mesmo frame sem
+        competir com a thread de detecção pela fila.
+        """
+        packet = self._latest_packet
+        if packet is None and self.use_fake_camera:
+            return (self.frame_seq, time.time(), self._generate_test_frame())
+        return packet
+
     def get_frame(self):
         """Retorna frame mais recente."""
-        try:
-            frame = self.frame_queue.get_nowait()
-            # Pegar sempre o mais recente
-            while not self.frame_queue.empty():
-                try:
-                    frame = self.frame_queue.get_nowait()
-                except queue.Empty:
-                    break
-            return frame
-        except queue.Empty:
-            if self.use_fake_camera:
-                return self._generate_test_frame()
+        packet = self.get_frame_packet()
+        if packet is None:
             return None
+        return packet[2]
+
+    def get_detection_results(self):
+        """Retorna cópia dos resultados de detecção mais recentes."""
+        with self.detection_lock:
+            return self.detection_results.copy()
+
+    def get_detection_event(self):
+        """Resultados da última detecção no formato enviado aos clientes (overlay no cliente)."""
+        results = self.get_detection_results()
+        frame_shape = None
+        packet = self._latest_packet
+        if packet is not None:
+            frame_shape = packet[2].shape[:2]
+        return {
+            "detection_seq": results.get("detection_seq", 0),
+            "frame_seq": results.get("frame_seq", 0),
+            "timestamp": results.get("last_update", 0),
+            "frame_size": (
+                {"width": frame_shape[1], "height": frame_shape[0]}
+                if frame_shape
+                else None
+            ),
+            "people_boxes": [list(b) for b in results.get("people_boxes", [])],
+            "people_ids": list(results.get("people_ids", [])),
+            "face_boxes": [list(b) for b in results.get("face_boxes", [])],
+            "people_count": results.get("people_count", 0),
+            "faces_count": results.get("faces_count", 0),
+            "total_passed": self.total_passed,
+            "total_entries": self.person_tracking["total_entries"],
+            "total_exits": self.person_tracking["total_exits"],
+            "fps": round(self.current_fps, 1),
+        }
+
+    def detect_and_annotate(self, frame, results=None):
+        """Anota frame com TODAS as detecções visuais ultra-otimizado.
 
-    def detect_and_annotate(self, frame):
-        """Anota frame com TODAS as detecções visuais ultra-otimizado."""
+        `results` permite anotar com um snapshot já obtido, garantindo que as
+        boxes desenhadas sejam as mesmas enviadas junto do frame.
+        """
         if frame is None:
             return self._generate_test_frame()
 
@@ -530,81 +641,11 @@ class VisualDetector:
             annotated = frame.copy()
 
             # Obter resultados cached das detecções
-            with self.detection_lock:
-                results = self.detection_results.copy()
-
-            # DESENHAR PESSOAS (bounding boxes amarelas)
-            people_boxes = results.get("people_boxes", [])
-            for i, (x1, y1, x2, y2) in enumerate(people_boxes):
-                # Bounding box da pessoa
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), COLORS["person_box"], 2)
-
-                # Label da pessoa
-                label = f"P{i+1}"
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-
-                # Background do label
-                label_bg_x1 = x1
-                label_bg_y1 = max(y1 - label_size[1] - 8, 0)
-                label_bg_x2 = x1 + label_size[0] + 8
-                label_bg_y2 = y1
-
-                cv2.rectangle(
-                    annotated,
-                    (label_bg_x1, label_bg_y1),
-                    (label_bg_x2, label_bg_y2),
-                    COLORS["person_label_bg"],
-                    cv2.FILLED,
-                )
+            if results is None:
+                results = self.get_detection_results()
 
-                # Texto do label
-                cv2.putText(
-                    annotated,
-                    label,
-                    (x1 + 4, y1 - 4),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6,
-                    COLORS["person_text"],
-                    2,
-                )
-
-            # DESENHAR ROSTOS (bounding boxes azuis)
-            face_boxes = results.get("face_boxes", [])
-            for i, (x1, y1, x2, y2) in enumerate(face_boxes):
-                # Bounding box do rosto
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), COLORS["face_box"], 2)
-
-                # Label do rosto (opcional)
-                label = f"F{i+1}"
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-
-                # Background pequeno do label
-                label_bg_x1 = x1
-                label_bg_y1 = max(y1 - label_size[1] - 6, 0)
-                label_bg_x2 = x1 + label_size[0] + 6
-                label_bg_y2 = y1
-
-                cv2.rectangle(
-                    annotated,
-                    (label_bg_x1, label_bg_y1),
-                    (label_bg_x2, label_bg_y2),
-                    COLORS["face_label_bg"],
-                    cv2.FILLED,
-                )
-
-                # Texto do label
-                cv2.putText(
-                    annotated,
-                    label,
-                    (x1 + 3, y1 - 3),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    COLORS["face_text"],
-                    1,
-                )
-
-            # ADICIONAR INFORMAÇÕES NO FRAME
-            self._add_visual_info(annotated, results)
+            # Boxes, labels (sprites em cache) e painel de informações
+            self.overlay.render(annotated, results, self.total_passed, self.current_fps)
 
             return annotated
 
@@ -612,42 +653,14 @@ class VisualDetector:
             return frame
 
     def _add_visual_info(self, frame, results):
-        """Adiciona informações visuais no frame ultra-otimizado."""
-        h, w = frame.shape[:2]
-
-        # Background para informações (canto superior esquerdo)
-        info_width = 300
-        info_height = 140
-        cv2.rectangle(
-            frame, (10, 10), (info_width, info_height), COLORS["info_bg"], cv2.FILLED
+        """Adiciona informações visuais no frame (painel em cache)."""
+        self.overlay.draw_info_panel(
+            frame,
+            results.get("people_count", 0),
+            results.get("faces_count", 0),
+            self.total_passed,
+            self.current_fps,
         )
-        cv2.rectangle(frame, (10, 10), (info_width, info_height), (100, 100, 100), 1)
-
-        # Informações de texto
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.6
-        thickness = 1
-        line_height = 22
-
-        info_lines = [
-            f"Pessoas: {results.get('people_count', 0)}",
-            f"Rostos: {results.get('faces_count', 0)}",
-            f"Total Passaram: {self.total_passed}",
-            f"FPS: {self.current_fps:.1f}",
-            f"Tempo: {datetime.now().strftime('%H:%M:%S')}",
-        ]
-
-        for i, line in enumerate(info_lines):
-            y_pos = 35 + i * line_height
-            cv2.putText(
-                frame,
-                line,
-                (20, y_pos),
-                font,
-                font_scale,
-                COLORS["info_text"],
-                thickness,
-            )
 
     def _update_counters(self, current_count):
         """Atualiza contadores usando dados de tracking."""
@@ -696,37 +709,77 @@ class VisualDetector:
             self.detection_tracker["total_detections"] += total_detections
             self.detection_tracker["last_detection_time"] = current_time
 
+    def _publish_stats_snapshot(self):
+        """Publica as stats do tick atual como snapshot imutável.
+
+        Só tipos primitivos (serializáveis direto em JSON). A publicação é uma
+        troca de referência: leitores pegam `stats_snapshot` sem lock e sem
+        copiar `detection_results`. `seq` muda a cada publicação.
+        """
+        results = self.detection_results
+        tracking = self.person_tracking
+        session_start = tracking["session_start"]
+        self.stats_seq += 1
+        self.stats_snapshot = MappingProxyType(
+            {
+                "seq": self.stats_seq,
+                "published_at": time.time(),
+                "running": self.running,
+                "current": self.prev_count,
+                "total_passed": self.total_passed,
+                "capture_fps": self.current_fps,
+                "detection_fps": 1.0 / self.detection_interval,
+                "frame_queue_size": self.frame_queue.qsize(),
+                "models_ready": self.models_ready,
+                "yolo_available": self.yolo_available,
+                "face_available": self.face_available,
+                "current_people": results.get("people_count", 0),
+                "current_faces": results.get("faces_count", 0),
+                "total_detections": len(self.log),
+                "detections_per_second": self.detection_tracker["detections_per_second"],
+                "tracked_detections": self.detection_tracker["total_detections"],
+                "detection_efficiency": self._calculate_detection_efficiency(),
+                "total_entries": tracking["total_entries"],
+                "total_exits": tracking["total_exits"],
+                "current_persons": tracking["current_session_persons"],
+                "active_persons": len(tracking["active_persons"]),
+                "person_counter": tracking["person_counter"],
+                "session_start": session_start.isoformat(),
+                "session_start_ts": session_start.timestamp(),
+            }
+        )
+
+    def get_stats_snapshot(self):
+        """Último snapshot publicado (somente leitura)."""
+        return self.stats_snapshot
+
     def get_performance_stats(self):
         """Stats de performance ultra-otimizada."""
-        with self.detection_lock:
-            results = self.detection_results.copy()
-
+        snapshot = self.stats_snapshot
         return {
-            "capture_fps": self.current_fps,
-            "detection_fps": 1.0 / self.detection_interval,
-            "frame_queue_size": self.frame_queue.qsize(),
-            "models_ready": self.models_ready,
-            "yolo_available": self.yolo_available,
-            "face_available": self.face_available,
-            "current_people": results.get("people_count", 0),
-            "current_faces": results.get("faces_count", 0),
-            "total_detections": len(self.log),
+            "capture_fps": snapshot["capture_fps"],
+            "detection_fps": snapshot["detection_fps"],
+            "frame_queue_size": snapshot["frame_queue_size"],
+            "models_ready": snapshot["models_ready"],
+            "yolo_available": snapshot["yolo_available"],
+            "face_available": snapshot["face_available"],
+            "current_people": snapshot["current_people"],
+            "current_faces": snapshot["current_faces"],
+            "total_detections": snapshot["total_detections"],
             "detection_rate": {
-                "detections_per_second": self.detection_tracker[
-                    "detections_per_second"
-                ],
-                "total_detections": self.detection_tracker["total_detections"],
-                "detection_efficiency": self._calculate_detection_efficiency(),
+                "detections_per_second": snapshot["detections_per_second"],
+                "total_detections": snapshot["tracked_detections"],
+                "detection_efficiency": snapshot["detection_efficiency"],
             },
             "tracking_stats": {
-                "total_entries": self.person_tracking["total_entries"],
-                "total_exits": self.person_tracking["total_exits"],
-                "current_persons": self.person_tracking["current_session_persons"],
-                "session_start": self.person_tracking["session_start"].isoformat(),
-                "session_duration": (
-                    datetime.now() - self.person_tracking["session_start"]
-                ).total_seconds(),
+                "total_entries": snapshot["total_entries"],
+                "total_exits": snapshot["total_exits"],
+                "current_persons": snapshot["current_persons"],
+                "session_start": snapshot["session_start"],
+                "session_duration": time.time() - snapshot["session_start_ts"],
             },
+            "clips": self.clip_recorder.get_stats() if self.clip_recorder else None,
+            "frame_ring": self.frame_ring.get_stats() if self.frame_ring else None,
         }
 
     def _calculate_detection_efficiency(self):
@@ -738,10 +791,27 @@ class VisualDetector:
             return min(100, max(0, detection_efficiency))  # Limitar entre 0-100%
         return 0
 
+    def add_event_listener(self, callback):
+        """Registra callback(evento) para ENTRY/EXIT. Deve retornar rápido."""
+        if callback not in self._event_listeners:
+            self._event_listeners.append(callback)
+
+    def _emit_event(self, event):
+        for callback in self._event_listeners:
+            try:
+                callback(event)
+            except Exception:
+                pass
+
     def stop(self):
         """Para o detector."""
         self.running = False
 
+        if self.clip_recorder is not None:
+            self.clip_recorder.stop()
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+
         if hasattr(self, "capture_thread"):
             self.capture_thread.join(timeout=1.0)
         if hasattr(self, "detection_thread"):
@@ -775,17 +845,18 @@ class VisualDetector:
                 }
 
                 # Log de entrada
-                self.log.append(
-                    {
-                        "timestamp": current_time.isoformat(),
-                        "event": "ENTRY",
-                        "person_id": self.person_tracking["person_counter"],
-                        "session_id": current_time.strftime("%Y%m%d_%H%M%S"),
-                        "bbox": bbox,
-                        "current_count": len(current_persons),
-                        "total_entries": self.person_tracking["total_entries"],
-                    }
-                )
+                entry_event = {
+                    "timestamp": current_time.isoformat(),
+                    "event": "ENTRY",
+                    "camera": self.camera_id,
+                    "person_id": self.person_tracking["person_counter"],
+                    "session_id": current_time.strftime("%Y%m%d_%H%M%S"),
+                    "bbox": bbox,
+                    "current_count": len(current_persons),
+                    "total_entries": self.person_tracking["total_entries"],
+                }
+                self.log.append(entry_event)
+                self._emit_event(entry_event)
             else:
                 # Pessoa já conhecida, atualizar última vez vista
                 self.person_tracking["active_persons"][person_id][
@@ -810,21 +881,22 @@ class VisualDetector:
                     ).total_seconds()
 
                     # Log de saída
-                    self.log.append(
-                        {
-                            "timestamp": person_data["last_seen"].isoformat(),
-                            "event": "EXIT",
-                            "person_id": person_data["person_id"],
-                            "session_id": person_data["session_id"],
-                            "entry_time": person_data["entry_time"].isoformat(),
-                            "exit_time": person_data["last_seen"].isoformat(),
-                            "duration_seconds": round(duration, 2),
-                            "duration_formatted": f"{int(duration//60)}m {int(duration%60)}s",
-                            "bbox": person_data["bbox"],
-                            "current_count": len(current_persons),
-                            "total_exits": self.person_tracking["total_exits"] + 1,
-                        }
-                    )
+                    exit_event = {
+                        "timestamp": person_data["last_seen"].isoformat(),
+                        "event": "EXIT",
+                        "camera": self.camera_id,
+                        "person_id": person_data["person_id"],
+                        "session_id": person_data["session_id"],
+                        "entry_time": person_data["entry_time"].isoformat(),
+                        "exit_time": person_data["last_seen"].isoformat(),
+                        "duration_seconds": round(duration, 2),
+                        "duration_formatted": f"{int(duration//60)}m {int(duration%60)}s",
+                        "bbox": person_data["bbox"],
+                        "current_count": len(current_persons),
+                        "total_exits": self.person_tracking["total_exits"] + 1,
+                    }
+                    self.log.append(exit_event)
+                    self._emit_event(exit_event)
 
                     self.person_tracking["total_exits"] += 1
 
@@ -835,6 +907,18 @@ class VisualDetector:
         # Atualizar contador de pessoas atuais
         self.person_tracking["current_session_persons"] = len(current_persons)
 
+        # Amostra periódica de ocupação (rollups); não vai para o log
+        if time.time() - self._last_occupancy_sample >= Config.OCCUPANCY_SAMPLE_SECONDS:
+            self._last_occupancy_sample = time.time()
+            self._emit_event(
+                {
+                    "timestamp": current_time.isoformat(),
+                    "event": "OCCUPANCY",
+                    "camera": self.camera_id,
+                    "current_count": len(current_persons),
+                }
+            )
+
         return len(current_persons)
 
 
@@ -12,11 +12,13 @@ import uvicorn
 
 # Importações da nova estrutura DDD
 from src.infrastructure.controllers import api_router
-from src.infrastructure.middleware import setup_cors, security_middleware
+from src.infrastructure.middleware import setup_cors, SecurityMiddleware
 from src.shared.config import Config
 from detection import VisualDetector
-from src.infrastructure.repositories.postgres_repository import engine
-from src.infrastructure.repositories.postgres_models import Base
+from src.infrastructure.repositories.postgres_repository import engine, warmup_pool
+from src.infrastructure.repositories.schema import upgrade_schema
+from src.infrastructure.repositories.log_partitions import LogPartitionManager
+from src.infrastructure.repositories import SpoolingLogRepository
 
 # Configuração de logging otimizada
 logging.basicConfig(level=logging.WARNING)  # Menos logs = mais performance
@@ -32,8 +34,8 @@ app = FastAPI(
 # Configuração de CORS
 setup_cors(app)
 
-# Middleware de segurança
-app.middleware("http")(security_middleware)
+# Middleware de segurança (ASGI puro: não envolve o corpo de respostas em streaming)
+app.add_middleware(SecurityMiddleware)
 
 # Incluir rotas da API
 app.include_router(api_router)
@@ -44,19 +46,64 @@ detector = None
 # Configurações de câmera usando o arquivo de configuração
 camera_config = Config.get_camera_config()
 
+# Partições mensais de logs (criação antecipada + retenção)
+partition_manager = LogPartitionManager(
+    engine,
+    months_ahead=Config.LOGS_PARTITIONS_AHEAD,
+    retention_months=Config.LOGS_RETENTION_MONTHS,
+    interval_seconds=Config.LOGS_MAINTENANCE_INTERVAL_HOURS * 3600,
+    lock_timeout_ms=Config.LOGS_MAINTENANCE_LOCK_TIMEOUT_MS,
+    retry_seconds=Config.LOGS_MAINTENANCE_RETRY_SECONDS,
+)
+
+
+schema_task = None
+
+
+async def prepare_database():
+    """Aplica as migrations (se configurado), aquece o pool e inicia a manutenção de partições.
+
+    Não bloqueia a inicialização: enquanto o Postgres estiver indisponível,
+    tenta novamente a cada `SCHEMA_RETRY_SECONDS` (os logs ficam no spool).
+    """
+    while True:
+        try:
+            if Config.RUN_MIGRATIONS_ON_STARTUP:
+                await upgrade_schema()
+            # Conexões abertas antes das primeiras requisições
+            await warmup_pool(Config.DB_WARMUP_CONNECTIONS)
+            break
+        except Exception as e:
+            logger.warning(f"Banco indisponível para migrations, nova tentativa em breve: {e}")
+            await asyncio.sleep(Config.SCHEMA_RETRY_SECONDS)
+    partition_manager.start()
+
 
 @app.on_event("startup")
 async def startup_event():
     """Inicialização ultra-otimizada."""
-    global detector
+    global detector, schema_task
     try:
         # Garantir que as rotas tenham acesso ao camera_config desde o início
         from src.infrastructure.controllers.api_controller import set_globals
         set_globals(detector, camera_config)
 
-        # Criar schema no Postgres (equivalente simples a migrations iniciais)
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+        # Reenvio do spool local de logs (antes do banco: aceita eventos mesmo offline)
+        from src.infrastructure.controllers.api_controller import (
+            log_repository, event_sink, auth_service
+        )
+        if isinstance(log_repository, SpoolingLogRepository):
+            log_repository.start()
+
+        # Schema e partições: com o Postgres fora, tenta de novo em segundo plano
+        schema_task = asyncio.ensure_future(prepare_database())
+
+        # Gravação em lote dos eventos ENTRY/EXIT
+        if Config.EVENT_SINK_ENABLED:
+            event_sink.start()
+
+        # Mede o custo do bcrypt neste hardware (em thread, sem atrasar a subida)
+        asyncio.ensure_future(auth_service.password_worker.calibrate())
 
         detector = VisualDetector(src=camera_config["current_source"])
         
@@ -77,6 +124,21 @@ async def shutdown_event():
     if detector:
         detector.stop()
 
+    from src.infrastructure.services import hls_segmenter
+    hls_segmenter.stop()
+
+    if schema_task is not None and not schema_task.done():
+        schema_task.cancel()
+
+    from src.infrastructure.controllers.api_controller import (
+        event_sink, log_repository, auth_service
+    )
+    await event_sink.stop()
+    if isinstance(log_repository, SpoolingLogRepository):
+        await log_repository.stop()
+    await partition_manager.stop()
+    auth_service.password_worker.shutdown()
+
 
 if __name__ == "__main__":
     import time
@@ -0,0 +1,140 @@
+"""Schema inicial com `logs` particionada por mês
+
+Cria (ou converte, em bancos criados por `create_all`) a tabela `logs`
+particionada por RANGE(timestamp), com BRIN em timestamp, índice de
+expressão em details->>'event' e GIN em details.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.infrastructure.repositories.log_partitions import (
+    add_months,
+    create_partition_sql,
+    month_start,
+)
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 2
+
+
+def _table_kind(bind, name):
+    """'r' = tabela comum, 'p' = particionada, None = não existe."""
+    return bind.execute(
+        sa.text(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = :name AND n.nspname = current_schema()"
+        ),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id VARCHAR NOT NULL PRIMARY KEY,
+            username VARCHAR(150) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL
+        )
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)")
+
+    for table in ("occupancy_minute", "occupancy_hour"):
+        op.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                camera VARCHAR(64) NOT NULL,
+                bucket TIMESTAMP NOT NULL,
+                entries INTEGER NOT NULL DEFAULT 0,
+                exits INTEGER NOT NULL DEFAULT 0,
+                peak_occupancy INTEGER NOT NULL DEFAULT 0,
+                occupancy_sum BIGINT NOT NULL DEFAULT 0,
+                occupancy_samples INTEGER NOT NULL DEFAULT 0,
+                dwell_seconds_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                dwell_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (camera, bucket)
+            )
+            """
+        )
+
+    # Tabela `logs` antiga (não particionada): renomear e liberar nomes de índices
+    legacy = _table_kind(bind, "logs") == "r"
+    if legacy:
+        op.execute("ALTER TABLE logs RENAME TO logs_unpartitioned")
+        op.execute("ALTER INDEX IF EXISTS logs_pkey RENAME TO logs_unpartitioned_pkey")
+        op.execute("DROP INDEX IF EXISTS ix_logs_timestamp")
+        op.execute("DROP INDEX IF EXISTS ix_logs_user")
+
+    # Chave primária e unicidade precisam incluir a chave de partição
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS logs (
+            id VARCHAR NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            count INTEGER NOT NULL,
+            details JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            "user" VARCHAR,
+            idempotency_key VARCHAR(64),
+            PRIMARY KEY (id, timestamp),
+            CONSTRAINT uq_logs_idempotency UNIQUE (idempotency_key, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute("CREATE TABLE IF NOT EXISTS logs_default PARTITION OF logs DEFAULT")
+
+    # Índices na tabela pai são propagados para todas as partições
+    op.execute("CREATE INDEX IF NOT EXISTS ix_logs_timestamp_brin ON logs USING brin (timestamp)")
+    op.execute('CREATE INDEX IF NOT EXISTS ix_logs_user ON logs ("user")')
+    op.execute("CREATE INDEX IF NOT EXISTS ix_logs_event ON logs ((details ->> 'event'))")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_logs_details_gin ON logs USING gin (details jsonb_path_ops)"
+    )
+
+    # Partições mensais: do dado mais antigo (se houver) até alguns meses à frente
+    first = month_start(datetime.now())
+    if legacy:
+        oldest = bind.execute(sa.text("SELECT min(timestamp) FROM logs_unpartitioned")).scalar()
+        if oldest is not None:
+            first = min(first, month_start(oldest))
+    last = add_months(month_start(datetime.now()), PARTITIONS_AHEAD)
+    month = first
+    while month <= last:
+        op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+
+    if legacy:
+        op.execute(
+            """
+            INSERT INTO logs (id, timestamp, count, details, created_at, "user", idempotency_key)
+            SELECT id, timestamp, count, details, created_at, "user", NULL
+            FROM logs_unpartitioned
+            """
+        )
+        op.execute("DROP TABLE logs_unpartitioned")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS logs CASCADE")
+    op.execute("DROP TABLE IF EXISTS occupancy_hour")
+    op.execute("DROP TABLE IF EXISTS occupancy_minute")
+    op.execute("DROP TABLE IF EXISTS users")
@@ -0,0 +1,28 @@
+"""Índice btree em logs (timestamp, id)
+
+A 0001 trocou o btree de `timestamp` por BRIN. BRIN serve para varreduras
+de intervalos largos, mas não entrega linhas ordenadas: a paginação keyset
+de GET /logs e /logs/stream (`ORDER BY timestamp DESC, id DESC LIMIT n`) e
+`find_recent` virariam varredura + ordenação de todas as partições. Criado
+na tabela pai, o índice é propagado para cada partição.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS ix_logs_timestamp_id ON logs (timestamp, id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_logs_timestamp_id")
@@ -6,26 +6,120 @@ from shomer.application.detect_people import DetectPeopleUseCase
 from shomer.application.detect_faces import DetectFacesUseCase
 from datetime import datetime, timezone, timedelta
 import httpx
-import asyncio
+import logging
+import queue
 import sys
 import os
+import threading
+import time
+import uuid
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 from config import brasilia_now
 
+logger = logging.getLogger(__name__)
 
-async def send_log(count: int, details: dict = None):
+BULK_LOGS_URL = os.getenv("SHOMER_BULK_LOGS_URL", "http://localhost:8000/logs/bulk")
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_SECONDS = 2.0
+LOG_MAX_PENDING = 10000
+LOG_MAX_BACKOFF_SECONDS = 60.0
+LOG_SAMPLE_SECONDS = 1.0  # contagem inalterada: no máximo um registro por intervalo
+# 4xx que valem reenvio (timeout do servidor e rate limit); os demais não mudam ao repetir
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+class LogBatcher:
     """
-    Envia um registro de log para o backend FastAPI.
+    Acumula registros de log e envia em lote para POST /logs/bulk numa thread
+    própria. Cada registro leva uma idempotency_key, então reenvios após falha
+    não duplicam linhas no backend.
     """
-    payload = {
-        "timestamp": brasilia_now().isoformat() + "Z",
-        "count": count,
-        "details": details or {},
-    }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post("http://localhost:8000/logs", json=payload)
-        resp.raise_for_status()
+
+    def __init__(self, url: str = BULK_LOGS_URL, token: str = None):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if not token:
+            logger.warning("SHOMER_API_TOKEN não definido: /logs/bulk exige autenticação")
+        self._queue = queue.Queue(maxsize=LOG_MAX_PENDING)
+        self._running = True
+
+        # Métricas
+        self.sent = 0
+        self.dropped = 0  # fila cheia ou lote rejeitado pelo backend
+        self.retries = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, count: int, details: dict = None):
+        """Enfileira um registro (descarta se a fila estiver cheia)."""
+        record = {
+            "timestamp": brasilia_now().isoformat(),
+            "count": count,
+            "details": details or {},
+            "idempotency_key": uuid.uuid4().hex,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _send(self, client, batch) -> bool:
+        """Envia um lote; False se vale tentar de novo (mesmas chaves)."""
+        try:
+            resp = client.post(self.url, json=batch, headers=self.headers)
+        except httpx.HTTPError as e:
+            logger.warning(f"Falha ao enviar logs em lote: {e}")
+            return False
+        if resp.is_success:
+            self.sent += len(batch)
+            return True
+        if resp.status_code >= 500 or resp.status_code in RETRYABLE_CLIENT_ERRORS:
+            logger.warning(f"Backend respondeu {resp.status_code} ao lote de logs, reenviando")
+            return False
+        # Erro permanente (401, 413, 422...): repetir não resolve, descarta o lote
+        self.dropped += len(batch)
+        logger.error(
+            f"Lote de {len(batch)} logs descartado: {resp.status_code} {resp.text[:200]}"
+        )
+        return True
+
+    def _run(self):
+        # No máximo um lote fora da fila: o limite de memória é o da fila
+        pending = []
+        last_flush = time.monotonic()
+        backoff = 0.0
+        retry_at = 0.0
+        with httpx.Client(timeout=10) as client:
+            while self._running or pending or not self._queue.empty():
+                if len(pending) < LOG_BATCH_SIZE:
+                    try:
+                        pending.append(self._queue.get(timeout=0.2))
+                    except queue.Empty:
+                        pass
+                else:
+                    time.sleep(0.2)
+                now = time.monotonic()
+                due = now - last_flush >= LOG_FLUSH_SECONDS
+                if not pending or (now < retry_at and self._running):
+                    continue
+                if len(pending) >= LOG_BATCH_SIZE or due or not self._running:
+                    if self._send(client, pending):
+                        pending = []
+                        backoff = 0.0
+                    elif not self._running:
+                        break
+                    else:
+                        self.retries += 1
+                        backoff = min(LOG_MAX_BACKOFF_SECONDS, backoff * 2 or 1.0)
+                        retry_at = time.monotonic() + backoff
+                    last_flush = time.monotonic()
+
+    def close(self):
+        """Envia o que falta e encerra a thread."""
+        self._running = False
+        self._thread.join(timeout=5)
 
 
 class Orchestrator:
@@ -40,19 +134,24 @@ class Orchestrator:
         self.people_uc = people_uc
         self.face_uc = face_uc
         self.renderer = renderer
+        self.log_batcher = LogBatcher(token=os.getenv("SHOMER_API_TOKEN"))
 
     def run(self):
+        last_count = None
+        last_logged = 0.0
         while True:
             frame = self.source.read_frame()
             if frame is None:
                 continue
 
             people = self.people_uc.execute(frame)
-            # dispara log (contagem de pessoas)
-            try:
-                asyncio.create_task(send_log(len(people), {"mode": "usb_camera"}))
-            except Exception as e:
-                pass
+            # registra log (contagem de pessoas) quando muda, ou a cada
+            # LOG_SAMPLE_SECONDS; enviado em lote ao backend
+            now = time.monotonic()
+            if len(people) != last_count or now - last_logged >= LOG_SAMPLE_SECONDS:
+                self.log_batcher.add(len(people), {"mode": "usb_camera"})
+                last_count = len(people)
+                last_logged = now
 
             faces = self.face_uc.execute(frame, people)
 
@@ -63,3 +162,4 @@ class Orchestrator:
 
         self.source.close()
         self.renderer.close()
+        self.log_batcher.close()
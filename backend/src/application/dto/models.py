@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr, validator
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 
 class RegisterModel(BaseModel):
@@ -50,6 +50,8 @@ class LogModel(BaseModel):
     timestamp: datetime
     count: int
     details: dict  # opcional: pode guardar info extra da detecção
+    # Chave do cliente por registro: reenvios com a mesma chave não duplicam linhas
+    idempotency_key: Optional[str] = Field(None, max_length=64)
 
 
 class LogOutModel(BaseModel):
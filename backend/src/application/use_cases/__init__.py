@@ -1,9 +1,14 @@
 from .auth_use_cases import RegisterUserUseCase, LoginUserUseCase
-from .log_use_cases import CreateLogUseCase, GetLogsUseCase
+from .log_use_cases import CreateLogUseCase, CreateLogsBulkUseCase, GetLogsUseCase, QueryLogsUseCase, ExportLogsUseCase
+from .occupancy_use_cases import GetOccupancyUseCase
 
 __all__ = [
     'RegisterUserUseCase', 
     'LoginUserUseCase', 
     'CreateLogUseCase', 
-    'GetLogsUseCase'
+    'CreateLogsBulkUseCase', 
+    'GetLogsUseCase',
+    'QueryLogsUseCase',
+    'ExportLogsUseCase',
+    'GetOccupancyUseCase'
 ]
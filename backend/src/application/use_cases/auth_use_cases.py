@@ -24,7 +24,7 @@ class RegisterUserUseCase:
             raise ValueError("Usuário já existe")
         
         # Criar hash da senha
-        password_hash = self.auth_service.hash_password(data.password)
+        password_hash = await self.auth_service.hash_password_async(data.password)
         
         # Criar entidade User
         user = User(
@@ -56,7 +56,9 @@ class LoginUserUseCase:
         else:
             user = await self.user_repository.find_by_username(data.username)
         
-        if not user or not self.auth_service.verify_password(data.password, user.password_hash):
+        if not user or not await self.auth_service.verify_password_async(
+            data.password, user.password_hash
+        ):
             raise ValueError("Credenciais inválidas")
         
         # Criar token
@@ -1,6 +1,9 @@
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 from ...domain.ports.log_repository import LogRepository
 from ...domain.entities.log import Log
+from ...shared.utils.cursor import encode_log_cursor, decode_log_cursor
+from ...shared.utils.datetimes import to_naive_local
 from ..dto.models import LogModel, LogOutModel
 
 
@@ -14,10 +17,11 @@ class CreateLogUseCase:
         """Executa a criação de log."""
         # Criar entidade Log
         log = Log(
-            timestamp=data.timestamp,
+            timestamp=to_naive_local(data.timestamp),
             count=data.count,
             details=data.details,
-            user=user
+            user=user,
+            idempotency_key=data.idempotency_key
         )
         
         # Salvar no repositório
@@ -26,6 +30,34 @@ class CreateLogUseCase:
         return {"msg": "Log registrado"}
 
 
+class CreateLogsBulkUseCase:
+    """Caso de uso para ingestão de logs em lote."""
+    
+    def __init__(self, log_repository: LogRepository):
+        self.log_repository = log_repository
+    
+    async def execute(self, items: List[LogModel], user: str) -> dict:
+        """Grava todos os logs numa única transação; duplicatas são ignoradas."""
+        logs = [
+            Log(
+                timestamp=to_naive_local(item.timestamp),
+                count=item.count,
+                details=item.details,
+                user=user,
+                idempotency_key=item.idempotency_key
+            )
+            for item in items
+        ]
+        
+        inserted = await self.log_repository.create_many(logs)
+        
+        return {
+            "received": len(logs),
+            "inserted": inserted,
+            "duplicates": len(logs) - inserted
+        }
+
+
 class GetLogsUseCase:
     """Caso de uso para buscar logs."""
     
@@ -37,3 +69,89 @@ class GetLogsUseCase:
         logs = await self.log_repository.find_recent(limit)
         
         return [LogOutModel(**log.dict()) for log in logs]
+
+
+class QueryLogsUseCase:
+    """Caso de uso para consultas de logs por intervalo com cursor (keyset)."""
+    
+    def __init__(self, log_repository: LogRepository):
+        self.log_repository = log_repository
+    
+    @staticmethod
+    def to_row(log: Log) -> dict:
+        """Log em dict serializável (sem passar pelo LogOutModel)."""
+        return {
+            "id": log.id,
+            "timestamp": log.timestamp.isoformat(),
+            "count": log.count,
+            "details": log.details,
+            "user": log.user,
+            "created_at": log.created_at.isoformat() if log.created_at else None,
+        }
+    
+    async def page(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Uma página de logs e o cursor da próxima (None se acabou).
+        
+        Levanta ValueError se o cursor for inválido.
+        """
+        after = decode_log_cursor(cursor) if cursor else None
+        # Um registro a mais só para saber se existe próxima página
+        logs = await self.log_repository.find_range(start, end, user, event, after, limit + 1)
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_log_cursor(logs[-1].timestamp, logs[-1].id)
+        return [self.to_row(log) for log in logs], next_cursor
+    
+    async def stream(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[dict]:
+        """Itera sobre as linhas do intervalo; com `limit`, termina com {"next_cursor"}.
+        
+        Levanta ValueError se o cursor for inválido.
+        """
+        after = decode_log_cursor(cursor) if cursor else None
+        sent = 0
+        last = None
+        async for log in self.log_repository.stream_range(start, end, user, event, after, page_size):
+            if limit is not None and sent >= limit:
+                yield {"next_cursor": encode_log_cursor(last.timestamp, last.id)}
+                return
+            yield self.to_row(log)
+            last = log
+            sent += 1
+        if limit is not None:
+            yield {"next_cursor": None}
+
+
+class ExportLogsUseCase:
+    """Caso de uso para exportação completa do histórico de logs."""
+    
+    def __init__(self, log_repository: LogRepository, batch_size: int = 5000):
+        self.log_repository = log_repository
+        self.batch_size = batch_size
+    
+    def batches(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+    ) -> AsyncIterator[List[Log]]:
+        """Lotes de logs em ordem cronológica; só um lote fica em memória."""
+        return self.log_repository.iter_export_batches(start, end, user, event, self.batch_size)
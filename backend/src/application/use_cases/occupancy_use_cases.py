@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from ...domain.ports.occupancy_repository import OccupancyRepository
+
+
+class GetOccupancyUseCase:
+    """Caso de uso para séries de ocupação a partir dos rollups."""
+    
+    def __init__(self, occupancy_repository: OccupancyRepository, hourly_threshold: timedelta):
+        self.occupancy_repository = occupancy_repository
+        self.hourly_threshold = hourly_threshold
+    
+    async def execute(
+        self,
+        start: datetime,
+        end: datetime,
+        camera: Optional[str] = None,
+        granularity: Optional[str] = None,
+    ) -> dict:
+        """Intervalos maiores que o limite leem só o rollup por hora."""
+        if granularity not in ("minute", "hour"):
+            granularity = "hour" if end - start > self.hourly_threshold else "minute"
+        
+        buckets = await self.occupancy_repository.find_range(granularity, start, end, camera)
+        
+        return {
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "buckets": [
+                {
+                    "camera": b.camera,
+                    "bucket": b.bucket.isoformat(),
+                    "entries": b.entries,
+                    "exits": b.exits,
+                    "peak_occupancy": b.peak_occupancy,
+                    "avg_occupancy": b.avg_occupancy,
+                    "avg_dwell_seconds": b.avg_dwell_seconds,
+                }
+                for b in buckets
+            ],
+        }
@@ -1,4 +1,5 @@
 from .user import User
 from .log import Log
+from .occupancy import OccupancyBucket
 
-__all__ = ['User', 'Log']
+__all__ = ['User', 'Log', 'OccupancyBucket']
@@ -10,6 +10,7 @@ class Log(BaseModel):
     count: int = Field(..., description="Quantidade de pessoas detectadas")
     details: Dict[str, Any] = Field(default_factory=dict, description="Detalhes da detecção")
     user: Optional[str] = Field(None, description="Usuário que criou o log")
+    idempotency_key: Optional[str] = Field(None, description="Chave de idempotência do cliente")
     created_at: datetime = Field(default_factory=datetime.now)
     
     class Config:
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class OccupancyBucket(BaseModel):
+    """Agregado de ocupação de uma câmera num intervalo (minuto ou hora)."""
+    camera: str = Field(..., description="Fonte de vídeo (webcam, ip_camera)")
+    bucket: datetime = Field(..., description="Início do intervalo")
+    entries: int = 0
+    exits: int = 0
+    peak_occupancy: int = 0
+    occupancy_sum: int = 0
+    occupancy_samples: int = 0
+    dwell_seconds_sum: float = 0.0
+    dwell_count: int = 0
+    
+    @property
+    def avg_occupancy(self) -> Optional[float]:
+        if not self.occupancy_samples:
+            return None
+        return self.occupancy_sum / self.occupancy_samples
+    
+    @property
+    def avg_dwell_seconds(self) -> Optional[float]:
+        if not self.dwell_count:
+            return None
+        return self.dwell_seconds_sum / self.dwell_count
+    
+    class Config:
+        orm_mode = True
@@ -1,5 +1,6 @@
 from .user_repository import UserRepository
 from .log_repository import LogRepository
-from .auth_service import AuthService
+from .occupancy_repository import OccupancyRepository
+from .auth_service import AuthService, AuthServiceBusy
 
-__all__ = ['UserRepository', 'LogRepository', 'AuthService']
+__all__ = ['UserRepository', 'LogRepository', 'OccupancyRepository', 'AuthService', 'AuthServiceBusy']
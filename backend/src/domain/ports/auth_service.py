@@ -3,6 +3,10 @@ from typing import Optional
 from ..entities.user import User
 
 
+class AuthServiceBusy(Exception):
+    """Capacidade do serviço de autenticação esgotada (hashes de senha, revogações); tente novamente."""
+
+
 class AuthService(ABC):
     """Interface para serviço de autenticação."""
     
@@ -16,6 +20,14 @@ class AuthService(ABC):
         """Verifica se a senha está correta."""
         pass
     
+    async def hash_password_async(self, password: str) -> str:
+        """Gera hash da senha sem bloquear o event loop."""
+        return self.hash_password(password)
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha sem bloquear o event loop."""
+        return self.verify_password(plain_password, hashed_password)
+    
     @abstractmethod
     def create_token(self, user: User) -> str:
         """Cria token JWT para o usuário."""
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 from ..entities.log import Log
 
 
@@ -11,12 +12,61 @@ class LogRepository(ABC):
         """Cria um novo log."""
         pass
     
+    @abstractmethod
+    async def create_many(self, logs: List[Log]) -> int:
+        """Cria vários logs numa única transação.
+
+        Registros cuja (`idempotency_key`, `timestamp`) já existe são ignorados.
+        Retorna quantos foram efetivamente inseridos.
+        """
+        pass
+    
     @abstractmethod
     async def find_recent(self, limit: int = 100) -> List[Log]:
         """Busca logs recentes."""
         pass
     
     @abstractmethod
-    async def find_all(self) -> List[Log]:
-        """Busca todos os logs."""
+    async def find_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 100,
+    ) -> List[Log]:
+        """Busca uma página de logs em [start, end), do mais recente ao mais antigo.
+
+        `after` é a chave (timestamp, id) do último log da página anterior
+        (paginação por keyset).
+        """
+        pass
+    
+    @abstractmethod
+    def stream_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Log]:
+        """Itera sobre todos os logs do intervalo, uma página por vez."""
+        pass
+    
+    @abstractmethod
+    def iter_export_batches(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        batch_size: int = 5000,
+    ) -> AsyncIterator[List[Log]]:
+        """Lotes de logs do intervalo em ordem cronológica para exportação.
+
+        Lidos por um cursor no servidor: a memória fica limitada a um lote.
+        """
         pass
@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+from ..entities.occupancy import OccupancyBucket
+
+
+class OccupancyRepository(ABC):
+    """Interface para os agregados de ocupação (rollups por minuto e por hora)."""
+    
+    @abstractmethod
+    async def upsert(self, granularity: str, buckets: List[OccupancyBucket]) -> None:
+        """Soma os deltas aos agregados existentes (ou cria os intervalos)."""
+        pass
+    
+    @abstractmethod
+    async def find_range(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        camera: Optional[str] = None,
+    ) -> List[OccupancyBucket]:
+        """Busca os agregados com início em [start, end), em ordem cronológica."""
+        pass
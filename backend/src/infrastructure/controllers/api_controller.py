@@ -1,24 +1,39 @@
 import asyncio
+import json
+import re
 import time
 import os
-from datetime import timedelta
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, Request, Response
-from fastapi.responses import JSONResponse
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
 from jose import jwt
 import cv2
 
-from ...application.dto.models import RegisterModel, LoginModel, Token, LogModel, LogOutModel
-from ...application.use_cases import RegisterUserUseCase, LoginUserUseCase, CreateLogUseCase, GetLogsUseCase
-from ...infrastructure.repositories import PostgresUserRepository, PostgresLogRepository
-from ...infrastructure.services import JWTAuthService, get_current_user, check_login_rate_limit
+from ...domain.ports.auth_service import AuthServiceBusy
+from ...application.dto.models import RegisterModel, LoginModel, Token, LogModel
+from ...application.use_cases import (
+    RegisterUserUseCase, LoginUserUseCase, CreateLogUseCase, CreateLogsBulkUseCase,
+    QueryLogsUseCase, GetOccupancyUseCase, ExportLogsUseCase
+)
+from ...infrastructure.repositories import (
+    PostgresUserRepository, PostgresLogRepository, PostgresOccupancyRepository,
+    SpoolingLogRepository, LogSpool, CachedUserRepository
+)
+from ...infrastructure.repositories.postgres_repository import get_pool_stats
+from ...infrastructure.services import (
+    JWTAuthService, get_current_user, check_login_rate_limit, DetectorEventSink,
+    OccupancyRollup, oauth2_scheme, revoke_token, get_token_cache_stats, get_rate_limit_stats,
+    csv_export_chunks, columnar_export_chunks, columnar_export_available
+)
 from ...shared.config import brasilia_now, Config
 from ...shared.utils import (
     export_log_csv, get_logs_list, get_detector_stats, 
-    get_performance_stats, get_health_info
+    get_performance_stats, get_health_info, decode_log_cursor,
+    SerializedResponseCache, etag_matches, to_naive_local
 )
 from detection import VisualDetector
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 # Router para organizar as rotas
 router = APIRouter()
@@ -33,13 +48,64 @@ camera_config = None
 # Instâncias dos serviços e repositórios
 auth_service = JWTAuthService()
 user_repository = PostgresUserRepository()
+if Config.USER_CACHE_ENABLED:
+    # /me e login sem ida ao banco a cada requisição
+    user_repository = CachedUserRepository(
+        user_repository,
+        max_entries=Config.USER_CACHE_MAX_ENTRIES,
+        ttl=Config.USER_CACHE_TTL_SECONDS,
+        negative_ttl=Config.USER_CACHE_NEGATIVE_TTL_SECONDS,
+    )
 log_repository = PostgresLogRepository()
+if Config.LOG_SPOOL_ENABLED:
+    # Logs não se perdem com o Postgres fora: vão para o spool local e são reenviados
+    log_repository = SpoolingLogRepository(
+        log_repository,
+        LogSpool(Config.LOG_SPOOL_PATH),
+        replay_batch_size=Config.LOG_SPOOL_REPLAY_BATCH,
+        retry_interval=Config.LOG_SPOOL_RETRY_SECONDS,
+    )
+occupancy_repository = PostgresOccupancyRepository()
+
+# JSON pré-serializado dos endpoints de polling (stats, performance, status, health)
+response_cache = SerializedResponseCache(
+    min_interval=Config.STATS_CACHE_MIN_INTERVAL_MS / 1000,
+    max_age=Config.STATS_CACHE_MAX_AGE_MS / 1000,
+)
 
 # Casos de uso
 register_use_case = RegisterUserUseCase(user_repository, auth_service)
 login_use_case = LoginUserUseCase(user_repository, auth_service)
 create_log_use_case = CreateLogUseCase(log_repository)
-get_logs_use_case = GetLogsUseCase(log_repository)
+create_logs_bulk_use_case = CreateLogsBulkUseCase(log_repository)
+query_logs_use_case = QueryLogsUseCase(log_repository)
+export_logs_use_case = ExportLogsUseCase(log_repository, Config.LOGS_EXPORT_BATCH_SIZE)
+get_occupancy_use_case = GetOccupancyUseCase(
+    occupancy_repository,
+    hourly_threshold=timedelta(seconds=Config.OCCUPANCY_HOURLY_THRESHOLD_SECONDS),
+)
+
+# Persistência em lote dos eventos ENTRY/EXIT do detector (e rollups de ocupação)
+event_sink = DetectorEventSink(
+    log_repository,
+    batch_size=Config.EVENT_SINK_BATCH_SIZE,
+    flush_interval=Config.EVENT_SINK_FLUSH_MS / 1000.0,
+    queue_size=Config.EVENT_SINK_QUEUE_SIZE,
+    rollup=OccupancyRollup(occupancy_repository, Config.OCCUPANCY_FLUSH_SECONDS),
+)
+
+
+def _attach_event_sink(detector_instance):
+    """Conecta os eventos do detector ao sink (idempotente)."""
+    if detector_instance is not None and Config.EVENT_SINK_ENABLED:
+        detector_instance.add_event_listener(event_sink.submit)
+
+
+def _new_detector(src):
+    """Cria um detector já conectado ao sink de eventos."""
+    detector_instance = VisualDetector(src=src)
+    _attach_event_sink(detector_instance)
+    return detector_instance
 
 
 def set_globals(detector_instance, camera_config_instance):
@@ -47,6 +113,7 @@ def set_globals(detector_instance, camera_config_instance):
     global detector, camera_config
     detector = detector_instance
     camera_config = camera_config_instance
+    _attach_event_sink(detector_instance)
 
 
 def _probe_source(source) -> (bool, str):
@@ -118,6 +185,21 @@ def _normalize_ip_url(raw: str) -> str:
             return url + "/video"
         return url
 
+
+_REWIND_RE = re.compile(r"^-?(\d+(?:\.\d+)?)(ms|s|m)?$")
+
+
+def _parse_rewind(raw: Optional[str]) -> float:
+    """Converte `from` ("-30s", "-2m", "-1500ms", "-30") em segundos para trás."""
+    if not raw:
+        return 0.0
+    match = _REWIND_RE.match(raw.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Parâmetro 'from' inválido (ex.: -30s, -2m)")
+    value, unit = float(match.group(1)), match.group(2) or "s"
+    return value / 1000.0 if unit == "ms" else value * 60 if unit == "m" else value
+
+
 @router.get("/")
 async def root():
     """API info ultra-otimizada."""
@@ -176,10 +258,11 @@ async def update_ip_camera(payload: UpdateIPPayload):
             # Trocar de forma segura
             try:
                 if detector:
-                    detector.stop()
+                    # stop() espera as threads do gravador e do ring: fora do event loop
+                    await asyncio.to_thread(detector.stop)
             except Exception:
                 pass
-            detector = VisualDetector(src=normalized_url)
+            detector = _new_detector(normalized_url)
 
         return {
             "success": True,
@@ -213,29 +296,178 @@ async def list_users(limit: int = 100, current_user: str = Depends(get_current_u
 
 
 @router.get("/video_feed")
-async def video_feed():
-    """Stream MJPEG ultra-otimizado com headers otimizados."""
-    from ...infrastructure.services import get_video_feed_response
-    return get_video_feed_response(detector, camera_config)
+async def video_feed(
+    request: Request,
+    fps: Optional[float] = None,
+    max_latency_ms: Optional[int] = None,
+    max_buffer_kb: Optional[int] = None,
+    rung: Optional[str] = None,
+    annotate: bool = True,
+    rewind: Optional[str] = Query(None, alias="from"),
+    speed: float = 1.0,
+):
+    """Stream MJPEG com degrau, FPS, latência e buffer limitados por cliente.
+
+    Com `annotate=false` os frames saem crus e o cliente desenha o overlay
+    a partir de /detections/stream. Com `from=-30s` (e `speed`) o stream
+    começa pelo histórico do ring de frames e depois segue ao vivo.
+    """
+    from ...infrastructure.services import (
+        get_video_feed_response, StreamPolicy, StreamLimitExceeded
+    )
+    policy = StreamPolicy.from_request(
+        fps, max_latency_ms, max_buffer_kb, rung, annotate,
+        rewind_seconds=_parse_rewind(rewind), speed=speed,
+    )
+    client = request.client.host if request.client else None
+    try:
+        return get_video_feed_response(detector, camera_config, policy, client)
+    except StreamLimitExceeded as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"}
+        )
+
+
+@router.websocket("/ws/video")
+async def video_websocket(
+    websocket: WebSocket,
+    fps: Optional[float] = None,
+    max_latency_ms: Optional[int] = None,
+    max_buffer_kb: Optional[int] = None,
+    rung: Optional[str] = None,
+    annotate: bool = True,
+):
+    """Stream binário (cabeçalho com detecções + JPEG) por WebSocket."""
+    from ...infrastructure.services import serve_websocket_stream, StreamPolicy
+    policy = StreamPolicy.from_request(
+        fps, max_latency_ms, max_buffer_kb, rung, annotate
+    )
+    await serve_websocket_stream(websocket, detector, camera_config, policy)
+
+
+@router.get("/hls/{name}")
+async def hls_file(name: str):
+    """Playlist e segmentos H.264 (HLS) gerados pelo ffmpeg local."""
+    from ...infrastructure.services import hls_segmenter
+    from ...infrastructure.services.hls_segmenter import MEDIA_TYPES
+
+    if not Config.HLS_ENABLED:
+        raise HTTPException(status_code=404, detail="Saída HLS desabilitada")
+    if not detector:
+        raise HTTPException(status_code=503, detail="Detector não iniciado", headers={"Retry-After": "3"})
+    if not hls_segmenter.ensure_running(detector):
+        raise HTTPException(status_code=503, detail=hls_segmenter.last_error or "HLS indisponível")
+
+    data = hls_segmenter.read_file(name)
+    is_playlist = name.endswith(".m3u8")
+    if data is None:
+        if is_playlist:
+            # Pipeline subindo: primeiro segmento ainda não existe
+            raise HTTPException(status_code=503, detail="Playlist ainda não disponível", headers={"Retry-After": "1"})
+        raise HTTPException(status_code=404, detail="Segmento não encontrado")
+
+    extension = name.rsplit(".", 1)[-1]
+    return Response(
+        content=data,
+        media_type=MEDIA_TYPES.get(extension, "application/octet-stream"),
+        headers={
+            "Cache-Control": "no-cache" if is_playlist else "public, max-age=60",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+@router.get("/streams")
+async def list_streams(current_user: str = Depends(get_current_user)):
+    """Lista as sessões de stream ativas e o custo de cada uma."""
+    from ...infrastructure.services import get_stream_sessions_stats
+    return get_stream_sessions_stats()
+
+
+@router.delete("/streams/{session_id}")
+async def terminate_stream(
+    session_id: str, current_user: str = Depends(get_current_user)
+):
+    """Encerra uma sessão de stream ativa."""
+    from ...infrastructure.services import stream_registry
+    if not stream_registry.terminate(session_id):
+        raise HTTPException(status_code=404, detail="Sessão de stream não encontrada")
+    return {"success": True, "terminated": session_id, "user": current_user}
+
+
+@router.get("/detections/stream")
+async def detection_events():
+    """SSE com boxes, IDs de tracking e contadores na cadência da detecção."""
+    from ...infrastructure.services import get_detection_events_response
+    return get_detection_events_response(detector)
 
 
 @router.get("/demo-stream.jpg")
-async def demo_stream():
-    """Imagem única ultra-otimizada."""
+async def demo_stream(request: Request, after: Optional[int] = None):
+    """Imagem única com ETag/304 e long-poll opcional (`?after=<seq>`)."""
     from ...infrastructure.services import get_demo_stream_response
-    return get_demo_stream_response(detector, camera_config)
+    return await get_demo_stream_response(
+        detector,
+        camera_config,
+        if_none_match=request.headers.get("if-none-match"),
+        after=after,
+    )
+
+
+def _camera_state():
+    """Versão do estado da câmera (muda com switch/toggle/URL da IP camera)."""
+    return (
+        detector is not None,
+        camera_config["current_source"],
+        camera_config["stream_enabled"],
+        camera_config["ip_url"],
+    )
+
+
+def _stats_version():
+    """Versão das stats: seq do snapshot do detector + estado da câmera."""
+    snapshot = detector.get_stats_snapshot() if detector else None
+    return (id(detector), snapshot["seq"] if snapshot else 0, _camera_state())
+
+
+def _cached_json(request: Request, key: str, version, build) -> Response:
+    """Serve bytes já serializados com ETag; 304 se o cliente já os tem."""
+    body, etag = response_cache.get(key, version, build)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Stats ultra-rápidas com cache info e tracking."""
-    return get_detector_stats(detector, camera_config)
+    return _cached_json(
+        request, "stats", _stats_version(),
+        lambda: get_detector_stats(detector, camera_config),
+    )
+
+
+def _build_performance():
+    stats = get_performance_stats(detector, camera_config)
+    stats["event_sink"] = event_sink.get_stats()
+    if isinstance(log_repository, SpoolingLogRepository):
+        stats["log_spool"] = log_repository.get_stats()
+    stats["database"] = get_pool_stats()
+    stats["password_hashing"] = auth_service.password_worker.get_stats()
+    stats["token_cache"] = get_token_cache_stats()
+    stats["rate_limit"] = get_rate_limit_stats()
+    if isinstance(user_repository, CachedUserRepository):
+        stats["user_cache"] = user_repository.get_stats()
+    stats["response_cache"] = response_cache.get_stats()
+    return stats
 
 
 @router.get("/performance")
-async def get_performance():
+async def get_performance(request: Request):
     """Métricas de performance detalhadas com cache."""
-    return get_performance_stats(detector, camera_config)
+    return _cached_json(request, "performance", _stats_version(), _build_performance)
 
 
 @router.post("/camera/switch")
@@ -284,16 +516,16 @@ async def switch_camera(source: str):
         try:
             if old_detector:
                 try:
-                    old_detector.stop()
+                    await asyncio.to_thread(old_detector.stop)
                 except Exception:
                     pass
-            detector = VisualDetector(src=new_source)
+            detector = _new_detector(new_source)
             camera_config["current_source"] = new_source
         except Exception as switch_err:
             # Fallback automático para webcam se a troca falhar
             fallback_source = camera_config["available_sources"].get("webcam", 0)
             try:
-                detector = VisualDetector(src=fallback_source)
+                detector = _new_detector(fallback_source)
                 camera_config["current_source"] = fallback_source
                 return {
                     "success": False,
@@ -366,17 +598,21 @@ async def control_stream(action: str, current_user: str = Depends(get_current_us
 
 
 @router.get("/camera/status")
-async def get_camera_status():
+async def get_camera_status(request: Request):
     """Retorna status atual da câmera."""
-    return {
-        "current_source": (
-            "webcam" if camera_config["current_source"] == 0 else "ip_camera"
-        ),
-        "stream_enabled": camera_config["stream_enabled"],
-        "available_sources": list(camera_config["available_sources"].keys()),
-        "detector_ready": detector is not None,
-        "ip_url": camera_config["ip_url"],
-    }
+    return _cached_json(
+        request, "camera_status",
+        (_camera_state(), tuple(camera_config["available_sources"])),
+        lambda: {
+            "current_source": (
+                "webcam" if camera_config["current_source"] == 0 else "ip_camera"
+            ),
+            "stream_enabled": camera_config["stream_enabled"],
+            "available_sources": list(camera_config["available_sources"].keys()),
+            "detector_ready": detector is not None,
+            "ip_url": camera_config["ip_url"],
+        },
+    )
 
 
 @router.get("/config")
@@ -402,9 +638,12 @@ async def export_log(current_user: str = Depends(get_current_user)):
 
 
 @router.get("/health")
-async def health():
+async def health(request: Request):
     """Health check ultra-rápido."""
-    return get_health_info(detector, camera_config)
+    return _cached_json(
+        request, "health", _stats_version(),
+        lambda: get_health_info(detector, camera_config),
+    )
 
 
 # Endpoints de autenticação e logs
@@ -414,6 +653,8 @@ async def register(data: RegisterModel):
     try:
         result = await register_use_case.execute(data, INVITATION_TOKEN)
         return result
+    except AuthServiceBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -433,6 +674,8 @@ async def login(data: LoginModel, request: Request):
     try:
         result = await login_use_case.execute(data)
         return result
+    except AuthServiceBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
@@ -452,6 +695,78 @@ async def create_log(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _parse_bulk_logs(body: bytes, content_type: str) -> List[LogModel]:
+    """Lê um array JSON ou NDJSON (uma linha por registro) e valida cada item."""
+    try:
+        text = body.decode("utf-8")
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            raw_items = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            raw_items = json.loads(text)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {e}")
+
+    if not isinstance(raw_items, list):
+        raise HTTPException(status_code=400, detail="Esperado um array JSON ou NDJSON")
+    if len(raw_items) > Config.LOGS_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo de {Config.LOGS_BULK_MAX_ITEMS} registros por requisição",
+        )
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        try:
+            items.append(LogModel.parse_obj(raw))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422, detail={"index": index, "errors": e.errors()}
+            )
+    return items
+
+
+@router.post("/logs/bulk")
+async def create_logs_bulk(
+    request: Request,
+    current_user: str = Depends(get_current_user),
+):
+    """Ingestão em lote de logs (array JSON ou `application/x-ndjson`).
+
+    Todos os registros são gravados numa única transação; registros com
+    `idempotency_key` já gravada são ignorados, então reenvios são seguros.
+    """
+    items = _parse_bulk_logs(
+        await request.body(), request.headers.get("content-type", "")
+    )
+    try:
+        return await create_logs_bulk_use_case.execute(items, current_user)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/occupancy")
+async def get_occupancy(
+    start: datetime,
+    end: Optional[datetime] = None,
+    camera: Optional[str] = None,
+    granularity: Optional[str] = Query(None, regex="^(minute|hour)$"),
+):
+    """Série de ocupação (entradas, saídas, pico/média de ocupação, permanência média).
+
+    Lê apenas os rollups: por hora quando o intervalo passa de
+    OCCUPANCY_HOURLY_THRESHOLD_SECONDS, senão por minuto.
+    """
+    # Rollups usam horário local sem fuso; ISO com "Z"/offset é convertido
+    start = to_naive_local(start)
+    end = to_naive_local(end) or datetime.now()
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'end' deve ser posterior a 'start'")
+    try:
+        return await get_occupancy_use_case.execute(start, end, camera, granularity)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/me")
 async def get_current_user_info(current_user: str = Depends(get_current_user)):
     """Retorna informações do usuário atual."""
@@ -461,13 +776,134 @@ async def get_current_user_info(current_user: str = Depends(get_current_user)):
     raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
 
-@router.get("/logs", response_model=List[LogOutModel])
-async def list_logs(limit: int = 100):
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    """Revoga o token atual (deixa de ser aceito mesmo antes do exp)."""
+    try:
+        revoked = revoke_token(token)
+    except AuthServiceBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    if not revoked:
+        raise HTTPException(401, "Token inválido")
+    return {"msg": "Sessão encerrada"}
+
+
+@router.get("/logs")
+async def list_logs(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user: Optional[str] = None,
+    event: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Retorna até `limit` logs em ordem decrescente de (timestamp, id), filtrados
+    por intervalo [start, end), usuário e tipo de evento (`details.event`).
+    Se houver mais resultados, o cabeçalho `X-Next-Cursor` traz o cursor
+    opaco para a próxima página (`?cursor=`). O frontend (outra origem) só
+    consegue ler esse cabeçalho porque o CORS expõe todos os headers
+    (`expose_headers=["*"]` em `setup_cors`). Exige autenticação, como
+    `/logs/stream` e `/logs/export`: as linhas trazem id e usuário.
+    """
+    try:
+        rows, next_cursor = await query_logs_use_case.page(
+            to_naive_local(start), to_naive_local(end), user, event, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@router.get("/logs/stream")
+async def stream_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user: Optional[str] = None,
+    event: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: str = Depends(get_current_user),
+):
+    """Logs do intervalo em NDJSON (uma linha por log), lidos página a página.
+
+    Com `limit`, a última linha é `{"next_cursor": ...}` para continuar.
     """
-    Retorna os últimos `limit` logs, em ordem decrescente de timestamp.
+    if cursor:
+        try:
+            decode_log_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    start, end = to_naive_local(start), to_naive_local(end)
+
+    async def lines():
+        async for row in query_logs_use_case.stream(start, end, user, event, cursor, limit):
+            yield json.dumps(row, default=str, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _with_first_batch(first, batches):
+    """Recoloca o lote já lido na frente dos demais."""
+    if first is None:
+        return
+    yield first
+    async for batch in batches:
+        yield batch
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+@router.get("/logs/export")
+async def export_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user: Optional[str] = None,
+    event: Optional[str] = None,
+    fmt: str = Query("csv", alias="format", regex="^(csv|parquet|arrow)$"),
+    current_user: str = Depends(get_current_user),
+):
+    """Exporta o histórico de logs do intervalo (CSV, Parquet ou Arrow IPC).
+
+    As linhas vêm de um cursor no servidor, lote a lote, e cada lote é
+    enviado assim que convertido: a memória não cresce com o tamanho da
+    exportação. Parquet/Arrow exigem `pyarrow` (501 se não instalado).
     """
+    if fmt != "csv" and not columnar_export_available():
+        raise HTTPException(status_code=501, detail="Exportação colunar requer pyarrow")
+
+    batches = export_logs_use_case.batches(
+        to_naive_local(start), to_naive_local(end), user, event
+    )
+    # Primeiro lote antes do 200: erro de consulta vira 500, não um arquivo truncado
     try:
-        results = await get_logs_use_case.execute(limit)
-        return results
+        first = await batches.__anext__()
+    except StopAsyncIteration:
+        first = None
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    batches = _with_first_batch(first, batches)
+    if fmt == "csv":
+        chunks = csv_export_chunks(batches)
+    else:
+        chunks = columnar_export_chunks(batches, fmt)
+
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"shomer_logs_{brasilia_now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -1,3 +1,3 @@
-from .security_middleware import setup_cors, security_middleware
+from .security_middleware import setup_cors, SecurityMiddleware
 
-__all__ = ['setup_cors', 'security_middleware']
+__all__ = ['setup_cors', 'SecurityMiddleware']
@@ -1,6 +1,6 @@
+import json
 import time
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from ..services import check_rate_limit
 
@@ -26,104 +26,168 @@ def setup_cors(app):
     )
 
 
-async def security_middleware(request: Request, call_next):
-    """Middleware personalizado para rate limiting e headers de segurança."""
-    # Endpoints com polling frequente não devem entrar no rate limit global
-    EXEMPT_RATE_LIMIT_PREFIXES = (
-        "/stats",
-        "/performance",
-        "/camera/status",
-        "/health",
-        "/stream",
-    )
-    # Responder pré-flight CORS rapidamente
-    if request.method == "OPTIONS":
-        response = Response(status_code=204)
-        origin = request.headers.get("origin", "http://localhost:3000")
-        req_headers = request.headers.get("access-control-request-headers", "*")
-        req_method = request.headers.get("access-control-request-method", "*")
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = req_method or "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = req_headers or "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-    # Rate limiting
-    client_ip = request.client.host
-    current_time = time.time()
-
-    try:
-        # Verificar rate limit se não for caminho isento (prefix match)
-        if not any(request.url.path.startswith(p) for p in EXEMPT_RATE_LIMIT_PREFIXES):
-            check_rate_limit(client_ip, current_time)
-        response = await call_next(request)
-    except HTTPException as http_exc:
-        # Garantir headers CORS também em respostas de erro
-        origin = request.headers.get("origin", "http://localhost:3000")
-        response = JSONResponse(
-            {"detail": http_exc.detail}, status_code=http_exc.status_code
-        )
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-    except Exception:
-        origin = request.headers.get("origin", "http://localhost:3000")
-        response = JSONResponse({"detail": "Internal Server Error"}, status_code=500)
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        return response
-
-    # Headers de segurança
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-    # CSP padrão para a aplicação
-    default_csp = (
-        "default-src 'self'; "
-        "base-uri 'self'; "
-        "img-src 'self' data:; "
-        "font-src 'self'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "script-src 'self' 'unsafe-inline'; "
-        "connect-src 'self'; "
-        "frame-ancestors 'self'"
-    )
+# Endpoints com polling frequente não devem entrar no rate limit global
+EXEMPT_RATE_LIMIT_PREFIXES = (
+    "/stats",
+    "/performance",
+    "/camera/status",
+    "/health",
+    "/stream",
+    "/hls",
+)
+DOCS_PREFIXES = ("/docs", "/redoc")
+DEFAULT_ORIGIN = b"http://localhost:3000"
+ALLOWED_METHODS = b"GET, POST, PUT, DELETE, OPTIONS"
 
-    # CSP relaxado apenas para a página de documentação (/docs)
-    # Necessário para permitir os assets do Swagger hospedados em CDN
-    docs_csp = (
-        "default-src 'self'; "
-        "base-uri 'self'; "
-        "img-src 'self' data: https://fastapi.tiangolo.com https://cdn.jsdelivr.net; "
-        "font-src 'self' https://cdn.jsdelivr.net; "
-        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-        "connect-src 'self'; "
-        "frame-ancestors 'self'"
-    )
+# CSP padrão para a aplicação
+DEFAULT_CSP = (
+    "default-src 'self'; "
+    "base-uri 'self'; "
+    "img-src 'self' data:; "
+    "font-src 'self'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "script-src 'self' 'unsafe-inline'; "
+    "connect-src 'self'; "
+    "frame-ancestors 'self'"
+)
+
+# CSP relaxado apenas para a página de documentação (/docs)
+# Necessário para permitir os assets do Swagger hospedados em CDN
+DOCS_CSP = (
+    "default-src 'self'; "
+    "base-uri 'self'; "
+    "img-src 'self' data: https://fastapi.tiangolo.com https://cdn.jsdelivr.net; "
+    "font-src 'self' https://cdn.jsdelivr.net; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "connect-src 'self'; "
+    "frame-ancestors 'self'"
+)
+
+# Headers fixos, pré-codificados uma única vez (sobrescrevem os da resposta)
+_SECURITY_HEADERS = [
+    (b"x-frame-options", b"DENY"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+]
+DEFAULT_HEADERS = _SECURITY_HEADERS + [(b"content-security-policy", DEFAULT_CSP.encode())]
+DOCS_HEADERS = _SECURITY_HEADERS + [(b"content-security-policy", DOCS_CSP.encode())]
+OVERRIDDEN_NAMES = frozenset(name for name, _ in DEFAULT_HEADERS)
+
+# CORS: adicionados só se a resposta ainda não tiver (origin é por requisição)
+CORS_DEFAULTS = [
+    (b"access-control-allow-methods", ALLOWED_METHODS),
+    (b"access-control-allow-headers", b"*"),
+    (b"access-control-allow-credentials", b"true"),
+]
+
+
+def _request_header(scope, name: bytes):
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+class SecurityMiddleware:
+    """Middleware ASGI puro para rate limiting e headers de segurança.
+
+    Não usa `BaseHTTPMiddleware`: os headers pré-computados são injetados na
+    mensagem `http.response.start` e os chunks do corpo (ex.: MJPEG de
+    `/video_feed`) passam direto, sem cópia nem fila intermediária.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = _request_header(scope, b"origin") or DEFAULT_ORIGIN
+
+        # Responder pré-flight CORS rapidamente
+        if scope["method"] == "OPTIONS":
+            await self._preflight(scope, send, origin)
+            return
+
+        path = scope.get("path") or ""
+        if not path.startswith(EXEMPT_RATE_LIMIT_PREFIXES):
+            client = scope.get("client")
+            try:
+                check_rate_limit(client[0] if client else "unknown", time.time())
+            except HTTPException as http_exc:
+                await self._send_error(
+                    send, http_exc.status_code, http_exc.detail, origin,
+                    getattr(http_exc, "headers", None),
+                )
+                return
+
+        extra_headers = DOCS_HEADERS if path.startswith(DOCS_PREFIXES) else DEFAULT_HEADERS
+        response_started = False
+
+        async def send_with_headers(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", ())
+                    if name.lower() not in OVERRIDDEN_NAMES
+                ]
+                present = {name.lower() for name, _ in headers}
+                headers.extend(extra_headers)
+                if b"access-control-allow-origin" not in present:
+                    headers.append((b"access-control-allow-origin", origin))
+                for name, value in CORS_DEFAULTS:
+                    if name not in present:
+                        headers.append((name, value))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception:
+            if response_started:
+                raise
+            await self._send_error(send, 500, "Internal Server Error", origin)
+
+    @staticmethod
+    def _cors_headers(origin: bytes):
+        return [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-methods", ALLOWED_METHODS),
+            (b"access-control-allow-headers", b"*"),
+            (b"access-control-allow-credentials", b"true"),
+        ]
 
-    request_path = request.url.path or ""
-    if request_path.startswith("/docs") or request_path.startswith("/redoc"):
-        response.headers["Content-Security-Policy"] = docs_csp
-    else:
-        response.headers["Content-Security-Policy"] = default_csp
-
-    # Adicionar headers CORS se não estiverem presentes
-    if "Access-Control-Allow-Origin" not in response.headers:
-        origin = request.headers.get("origin", "http://localhost:3000")
-        response.headers["Access-Control-Allow-Origin"] = origin
-    if "Access-Control-Allow-Methods" not in response.headers:
-        response.headers["Access-Control-Allow-Methods"] = (
-            "GET, POST, PUT, DELETE, OPTIONS"
+    async def _preflight(self, scope, send, origin: bytes):
+        req_headers = _request_header(scope, b"access-control-request-headers") or b"*"
+        req_method = _request_header(scope, b"access-control-request-method") or b"*"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 204,
+                "headers": [
+                    (b"access-control-allow-origin", origin),
+                    (b"access-control-allow-methods", req_method),
+                    (b"access-control-allow-headers", req_headers),
+                    (b"access-control-allow-credentials", b"true"),
+                ],
+            }
         )
-    if "Access-Control-Allow-Headers" not in response.headers:
-        response.headers["Access-Control-Allow-Headers"] = "*"
-    if "Access-Control-Allow-Credentials" not in response.headers:
-        response.headers["Access-Control-Allow-Credentials"] = "true"
+        await send({"type": "http.response.body", "body": b""})
 
-    return response
+    async def _send_error(self, send, status: int, detail, origin: bytes, headers=None):
+        """Erro JSON com headers CORS (o frontend precisa conseguir lê-lo)."""
+        body = json.dumps({"detail": detail}).encode()
+        raw_headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + self._cors_headers(origin)
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode("latin-1"), str(value).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,3 @@
+from .overlay_renderer import OverlayRenderer
+
+__all__ = ['OverlayRenderer']
@@ -0,0 +1,150 @@
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+
+# Estilo dos labels por tipo: (fonte, escala, espessura, padding, chave de cor de fundo, chave de cor do texto)
+LABEL_STYLES = {
+    "P": (cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2, 8, "person_label_bg", "person_text"),
+    "F": (cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1, 6, "face_label_bg", "face_text"),
+}
+
+# Painel de informações (canto superior esquerdo)
+PANEL_ORIGIN = (10, 10)
+PANEL_SIZE = (291, 131)  # (largura, altura) - equivalente ao retângulo (10,10)-(300,140)
+PANEL_BORDER = (100, 100, 100)
+PANEL_LINE_HEIGHT = 22
+
+
+def _blit(frame, sprite, x: int, y: int) -> None:
+    """Copia o sprite no frame em (x, y) recortando o que ficar fora da imagem."""
+    fh, fw = frame.shape[:2]
+    sh, sw = sprite.shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sw, fw), min(y + sh, fh)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    frame[y0:y1, x0:x1] = sprite[y0 - y : y1 - y, x0 - x : x1 - x]
+
+
+class OverlayRenderer:
+    """Renderiza o overlay das detecções com sprites pré-renderizados.
+
+    - Labels (P1..Pn, F1..Fn) são desenhados uma única vez e reaproveitados.
+    - O painel de stats só é redesenhado quando algum valor exibido muda.
+    - Sprites são copiados no frame via slicing do NumPy (sem putText por frame).
+    """
+
+    def __init__(self, colors: Dict[str, Tuple[int, int, int]], max_labels: int = 256):
+        self.colors = colors
+        self.max_labels = max_labels
+        self._labels: Dict[Tuple[str, int], np.ndarray] = {}
+
+        self._panel = None
+        self._panel_key = None
+        self.panel_rebuilds = 0
+
+        self._clock_second = None
+        self._clock_text = ""
+
+    def label_sprite(self, kind: str, index: int) -> np.ndarray:
+        """Retorna (criando se necessário) o sprite do label `{kind}{index}`."""
+        key = (kind, index)
+        sprite = self._labels.get(key)
+        if sprite is not None:
+            return sprite
+
+        font, scale, thickness, pad, bg_key, text_key = LABEL_STYLES[kind]
+        label = f"{kind}{index}"
+        (tw, th), _ = cv2.getTextSize(label, font, scale, thickness)
+
+        # Mesmo desenho do retângulo preenchido + texto usado antes por frame
+        sprite = np.empty((th + pad + 1, tw + pad + 1, 3), dtype=np.uint8)
+        sprite[:] = self.colors[bg_key]
+        cv2.putText(
+            sprite,
+            label,
+            (pad // 2, th + pad // 2),
+            font,
+            scale,
+            self.colors[text_key],
+            thickness,
+        )
+
+        if len(self._labels) < self.max_labels:
+            self._labels[key] = sprite
+        return sprite
+
+    def draw_boxes(self, frame, boxes, kind: str, box_color) -> None:
+        """Desenha boxes e labels numerados de um tipo de detecção."""
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), box_color, 2)
+            sprite = self.label_sprite(kind, i + 1)
+            # Base do label alinhada ao topo da box
+            _blit(frame, sprite, x1, y1 - sprite.shape[0] + 1)
+
+    def _clock(self) -> str:
+        # Formata o horário só quando o segundo muda
+        second = int(time.time())
+        if second != self._clock_second:
+            self._clock_second = second
+            self._clock_text = datetime.fromtimestamp(second).strftime("%H:%M:%S")
+        return self._clock_text
+
+    def _build_panel(self, lines) -> np.ndarray:
+        width, height = PANEL_SIZE
+        panel = np.empty((height, width, 3), dtype=np.uint8)
+        panel[:] = self.colors["info_bg"]
+        cv2.rectangle(panel, (0, 0), (width - 1, height - 1), PANEL_BORDER, 1)
+
+        ox, oy = PANEL_ORIGIN
+        for i, line in enumerate(lines):
+            cv2.putText(
+                panel,
+                line,
+                (20 - ox, 35 + i * PANEL_LINE_HEIGHT - oy),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.6,
+                self.colors["info_text"],
+                1,
+            )
+        self.panel_rebuilds += 1
+        return panel
+
+    def draw_info_panel(self, frame, people: int, faces: int, total_passed: int, fps: float) -> None:
+        """Copia o painel de stats no frame, redesenhando só se os valores mudaram."""
+        key = (people, faces, total_passed, round(fps, 1), self._clock())
+        if key != self._panel_key:
+            self._panel = self._build_panel(
+                [
+                    f"Pessoas: {people}",
+                    f"Rostos: {faces}",
+                    f"Total Passaram: {total_passed}",
+                    f"FPS: {fps:.1f}",
+                    f"Tempo: {key[4]}",
+                ]
+            )
+            self._panel_key = key
+
+        _blit(frame, self._panel, *PANEL_ORIGIN)
+
+    def render(self, frame, results, total_passed: int, fps: float) -> None:
+        """Desenha pessoas, rostos e o painel de stats diretamente em `frame`."""
+        self.draw_boxes(
+            frame, results.get("people_boxes", []), "P", self.colors["person_box"]
+        )
+        self.draw_boxes(
+            frame, results.get("face_boxes", []), "F", self.colors["face_box"]
+        )
+        self.draw_info_panel(
+            frame,
+            results.get("people_count", 0),
+            results.get("faces_count", 0),
+            total_passed,
+            fps,
+        )
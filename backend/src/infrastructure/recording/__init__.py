@@ -0,0 +1,4 @@
+from .clip_recorder import ClipRecorder
+from .frame_ring import FrameRing
+
+__all__ = ['ClipRecorder', 'FrameRing']
@@ -0,0 +1,299 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CLIP_EXTENSION = ".avi"
+TMP_PREFIX = ".tmp_"
+
+
+class ClipRecorder:
+    """Grava clipes de vídeo disparados por eventos do detector.
+
+    Uma thread amostra o frame mais recente em FPS fixo e mantém os últimos
+    `pre_roll_seconds` já comprimidos (JPEG) num ring buffer. Um evento de
+    ENTRY abre um clipe com esse pre-roll e segue acumulando frames até
+    `post_roll_seconds` após o último evento (limitado a `max_clip_seconds`).
+    O clipe fechado vai para uma fila limitada consumida por uma thread
+    escritora; se a fila estiver cheia o clipe é descartado, nunca bloqueando
+    captura ou detecção. Após cada escrita aplica retenção e cota de disco.
+    """
+
+    def __init__(
+        self,
+        detector,
+        output_dir: str,
+        fps: int,
+        pre_roll_seconds: float,
+        post_roll_seconds: float,
+        max_clip_seconds: float,
+        jpeg_quality: int,
+        annotate: bool,
+        writer_queue_size: int,
+        max_disk_bytes: int,
+        retention_seconds: float,
+    ):
+        self.detector = detector
+        self.output_dir = output_dir
+        self.fps = max(1, fps)
+        self.post_roll_seconds = post_roll_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self.jpeg_quality = jpeg_quality
+        self.annotate = annotate
+        self.max_disk_bytes = max_disk_bytes
+        self.retention_seconds = retention_seconds
+
+        # Ring buffer de pre-roll: (timestamp, jpeg)
+        self._pre_roll: deque = deque(maxlen=max(1, int(pre_roll_seconds * self.fps)))
+        self._writer_queue: "queue.Queue" = queue.Queue(maxsize=max(1, writer_queue_size))
+
+        # Eventos chegam da thread de detecção; a thread de amostragem os consome
+        self._trigger_lock = threading.Lock()
+        self._pending_events: List[Dict[str, Any]] = []
+        self._active_clip: Optional[Dict[str, Any]] = None
+
+        # Métricas
+        self.clips_written = 0
+        self.clips_dropped = 0
+        self.clips_expired = 0
+        self.write_errors = 0
+        self.disk_bytes = 0
+        self.last_clip: Optional[str] = None
+
+        self._running = True
+        self._writer_running = True
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._enforce_quota()
+
+        self._sampler_thread = threading.Thread(
+            target=self._sample_loop, daemon=True, name="ClipSampler"
+        )
+        self._writer_thread = threading.Thread(
+            target=self._write_loop, daemon=True, name="ClipWriter"
+        )
+        self._sampler_thread.start()
+        self._writer_thread.start()
+
+    # Eventos ---------------------------------------------------------------
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Listener do detector: apenas enfileira o gatilho (custo O(1))."""
+        if event.get("event") != "ENTRY":
+            return
+        with self._trigger_lock:
+            self._pending_events.append(event)
+
+    def _take_pending_events(self) -> List[Dict[str, Any]]:
+        with self._trigger_lock:
+            events, self._pending_events = self._pending_events, []
+        return events
+
+    # Amostragem ------------------------------------------------------------
+
+    def _encode(self, packet) -> Optional[Tuple[float, bytes]]:
+        _, captured_at, frame = packet
+        if self.annotate:
+            frame = self.detector.detect_and_annotate(frame)
+        ret, buffer = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        )
+        if not ret:
+            return None
+        return captured_at, buffer.tobytes()
+
+    def _sample_loop(self):
+        interval = 1.0 / self.fps
+        last_seq = None
+
+        while self._running:
+            started = time.monotonic()
+            try:
+                packet = self.detector.get_frame_packet()
+                if packet is not None and packet[0] != last_seq:
+                    last_seq = packet[0]
+                    sample = self._encode(packet)
+                    if sample is not None:
+                        self._pre_roll.append(sample)
+                        if self._active_clip is not None:
+                            self._active_clip["frames"].append(sample)
+
+                self._handle_events(self._take_pending_events())
+                self._maybe_close_clip()
+            except Exception as e:
+                logger.warning(f"Falha na amostragem de clipe: {e}")
+
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+        # Encerramento: fecha o clipe em andamento com o que já foi capturado
+        if self._active_clip is not None:
+            self._submit(self._active_clip)
+            self._active_clip = None
+
+    def _handle_events(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        now = time.time()
+        clip = self._active_clip
+        if clip is None:
+            clip = {
+                "started_at": now,
+                "event": events[0],
+                "person_ids": [],
+                "frames": list(self._pre_roll),
+            }
+            self._active_clip = clip
+
+        for event in events:
+            person_id = event.get("person_id")
+            if person_id is not None and person_id not in clip["person_ids"]:
+                clip["person_ids"].append(person_id)
+        # Novas entradas estendem o clipe, respeitando a duração máxima
+        clip["until"] = min(now + self.post_roll_seconds, clip["started_at"] + self.max_clip_seconds)
+
+    def _maybe_close_clip(self) -> None:
+        clip = self._active_clip
+        if clip is not None and time.time() >= clip["until"]:
+            self._active_clip = None
+            self._submit(clip)
+
+    def _submit(self, clip: Dict[str, Any]) -> None:
+        if not clip["frames"]:
+            return
+        try:
+            self._writer_queue.put_nowait(clip)
+        except queue.Full:
+            # Disco lento: descarta o clipe em vez de segurar memória/threads
+            self.clips_dropped += 1
+
+    # Escrita ---------------------------------------------------------------
+
+    def _write_loop(self):
+        while self._writer_running or not self._writer_queue.empty():
+            try:
+                clip = self._writer_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._write_clip(clip)
+            except Exception as e:
+                self.write_errors += 1
+                logger.warning(f"Falha ao gravar clipe: {e}")
+            finally:
+                self._enforce_quota()
+
+    def _clip_filename(self, clip: Dict[str, Any]) -> str:
+        # Milissegundos no nome: dois clipes no mesmo segundo não se sobrescrevem
+        started = datetime.fromtimestamp(clip["frames"][0][0]).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        people = "-".join(f"P{pid}" for pid in clip["person_ids"]) or "P"
+        return f"clip_{started}_{people}{CLIP_EXTENSION}"
+
+    def _write_clip(self, clip: Dict[str, Any]) -> None:
+        filename = self._clip_filename(clip)
+        path = os.path.join(self.output_dir, filename)
+        # Extensão mantida no temporário: o VideoWriter escolhe o container por ela
+        tmp_path = os.path.join(self.output_dir, f"{TMP_PREFIX}{filename}")
+
+        writer = None
+        size = None
+        try:
+            for _, jpeg in clip["frames"]:
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(
+                        tmp_path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, size, True
+                    )
+                    if not writer.isOpened():
+                        raise RuntimeError(f"VideoWriter não abriu {tmp_path}")
+                elif (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+
+        if writer is None:
+            return
+        # Renomeia só no fim: clipes parciais nunca aparecem como completos
+        os.replace(tmp_path, path)
+        self.clips_written += 1
+        self.last_clip = os.path.basename(path)
+
+    def _enforce_quota(self) -> None:
+        """Apaga clipes vencidos e, se preciso, os mais antigos até caber na cota."""
+        try:
+            names = os.listdir(self.output_dir)
+        except FileNotFoundError:
+            return
+
+        now = time.time()
+        clips = []
+        for name in names:
+            if not name.endswith(CLIP_EXTENSION):
+                continue
+            path = os.path.join(self.output_dir, name)
+            if name.startswith(TMP_PREFIX):
+                # A escrita é sequencial nesta thread: temporário aqui é sobra de falha
+                self._remove(path)
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self.retention_seconds > 0 and now - stat.st_mtime > self.retention_seconds:
+                self._remove(path)
+                self.clips_expired += 1
+                continue
+            clips.append((stat.st_mtime, path, stat.st_size))
+
+        clips.sort()
+        total = sum(size for *_, size in clips)
+        for _, path, size in clips:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            self.clips_expired += 1
+            total -= size
+        self.disk_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # Ciclo de vida ---------------------------------------------------------
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Para a amostragem e aguarda a escrita dos clipes pendentes."""
+        self._running = False
+        self._sampler_thread.join(timeout=1.0)
+        self._writer_running = False
+        self._writer_thread.join(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        clip = self._active_clip
+        return {
+            "recording": clip is not None,
+            "pre_roll_frames": len(self._pre_roll),
+            "writer_queue": self._writer_queue.qsize(),
+            "clips_written": self.clips_written,
+            "clips_dropped": self.clips_dropped,
+            "clips_expired": self.clips_expired,
+            "write_errors": self.write_errors,
+            "disk_bytes": self.disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "last_clip": self.last_clip,
+        }
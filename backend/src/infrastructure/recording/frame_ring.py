@@ -0,0 +1,236 @@
+import bisect
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho de cada registro: magic, seq, timestamp de captura, tamanho do JPEG
+RECORD_HEADER = struct.Struct("<4sQdI")
+RECORD_MAGIC = b"SHRF"
+
+
+class FrameRing:
+    """Ring de frames JPEG num arquivo de tamanho fixo mapeado em memória (DVR).
+
+    Registros são só anexados: o escritor grava sequencialmente e volta ao
+    início quando o próximo registro não cabe, sobrescrevendo os mais antigos.
+    O índice em memória guarda (seq, timestamp, offset, tamanho) por registro.
+
+    Leitores não usam lock: copiam o registro do mmap e depois conferem que
+    seu seq ainda é maior que `_evicted_seq`. O escritor avança `_evicted_seq`
+    *antes* de sobrescrever bytes, então uma leitura que passou na conferência
+    não foi corrompida. A história fica no arquivo (page cache), não na heap.
+
+    O índice é uma lista só anexada, com seqs consecutivos: o registro válido
+    mais antigo está na posição `_evicted_seq + 1 - índice[0].seq`, então
+    leitores acham um seq em O(1) e um timestamp por bisect, sem copiar nada.
+    Entradas já invalidadas são descartadas de tempos em tempos trocando a
+    lista inteira por uma nova (leitores com a antiga seguem consistentes).
+    """
+
+    COMPACT_MIN = 1024
+
+    def __init__(
+        self,
+        detector,
+        capacity_bytes: int,
+        fps: int,
+        jpeg_quality: int,
+        annotate: bool,
+        directory: Optional[str] = None,
+    ):
+        self.detector = detector
+        self.capacity = capacity_bytes
+        self.fps = max(1, fps)
+        self.jpeg_quality = jpeg_quality
+        self.annotate = annotate
+
+        directory = directory or tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"shomer_ring_{detector.instance_id}.bin")
+        with open(self.path, "wb") as f:
+            f.truncate(self.capacity)
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), self.capacity)
+
+        self._index: list = []  # (seq, timestamp, offset, tamanho total)
+        self._used_bytes = 0
+        self._write_pos = 0
+        self._seq = 0
+        self._evicted_seq = 0
+
+        # Métricas
+        self.records_written = 0
+        self.records_oversize = 0
+        self.read_conflicts = 0
+
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._sample_loop, daemon=True, name="FrameRingWriter"
+        )
+        self._thread.start()
+
+    # Escrita (thread única) -----------------------------------------------
+
+    def _evict(self, index: list, first: int) -> int:
+        """Invalida o registro mais antigo; retorna a nova posição do primeiro válido."""
+        seq, _, _, size = index[first]
+        self._evicted_seq = seq
+        self._used_bytes -= size
+        return first + 1
+
+    def append(self, timestamp: float, jpeg: bytes) -> Optional[int]:
+        """Anexa um frame ao ring e retorna seu seq (None se não couber)."""
+        size = RECORD_HEADER.size + len(jpeg)
+        if size > self.capacity:
+            self.records_oversize += 1
+            return None
+
+        # Invalida (para leitores) tudo que será sobrescrito antes de tocar nos bytes
+        index, first = self._live_entries()
+        if self._write_pos + size > self.capacity:
+            # Volta ao início: os registros depois da posição atual (sobra do
+            # fim do arquivo) são mais antigos que os do início e saem primeiro
+            wrap_at = self._write_pos
+            while first < len(index) and index[first][2] >= wrap_at:
+                first = self._evict(index, first)
+            self._write_pos = 0
+        start, end = self._write_pos, self._write_pos + size
+
+        while (
+            first < len(index)
+            and index[first][2] < end
+            and index[first][2] + index[first][3] > start
+        ):
+            first = self._evict(index, first)
+
+        seq = self._seq + 1
+        mm = self._mm
+        mm[start + RECORD_HEADER.size:end] = jpeg
+        mm[start:start + RECORD_HEADER.size] = RECORD_HEADER.pack(
+            RECORD_MAGIC, seq, timestamp, len(jpeg)
+        )
+
+        if first >= self.COMPACT_MIN and first * 2 > len(index):
+            index = index[first:]
+            self._index = index
+        index.append((seq, timestamp, start, size))
+        self._used_bytes += size
+        self._seq = seq
+        self._write_pos = end
+        self.records_written += 1
+        return seq
+
+    def _sample_loop(self):
+        interval = 1.0 / self.fps
+        last_seq = None
+
+        while self._running:
+            started = time.monotonic()
+            try:
+                packet = self.detector.get_frame_packet()
+                if packet is not None and packet[0] != last_seq:
+                    last_seq, captured_at, frame = packet
+                    if self.annotate:
+                        frame = self.detector.detect_and_annotate(frame)
+                    ret, buffer = cv2.imencode(
+                        ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+                    )
+                    if ret:
+                        self.append(captured_at, buffer.tobytes())
+            except Exception as e:
+                logger.warning(f"Falha ao gravar frame no ring: {e}")
+
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    # Leitura (sem lock) ----------------------------------------------------
+
+    def _live_entries(self) -> Tuple[list, int]:
+        """(índice, posição do registro válido mais antigo), sem lock."""
+        index = self._index
+        if not index:
+            return index, 0
+        return index, max(0, self._evicted_seq + 1 - index[0][0])
+
+    def seek(self, timestamp: float) -> int:
+        """Cursor (seq) posicionado logo antes do primeiro frame em/após `timestamp`."""
+        index, first = self._live_entries()
+        end = len(index)
+        if first >= end:
+            return self._seq
+        i = bisect.bisect_left(index, timestamp, lo=first, hi=end, key=lambda entry: entry[1])
+        if i >= end:
+            return self._seq
+        return index[i][0] - 1
+
+    def read_after(self, cursor: int) -> Optional[Tuple[int, float, bytes]]:
+        """Próximo frame com seq > `cursor` como (seq, timestamp, jpeg).
+
+        Se o cursor ficou para trás do que já foi sobrescrito, pula para o
+        registro mais antigo ainda válido. Retorna None quando alcançou o vivo.
+        """
+        while True:
+            index, first = self._live_entries()
+            if first >= len(index) or cursor >= index[-1][0]:
+                return None
+            # seqs são consecutivos no índice
+            i = max(first, cursor + 1 - index[0][0])
+            seq, timestamp, offset, size = index[i]
+
+            record = self._mm[offset:offset + size]
+            if seq <= self._evicted_seq:
+                # Sobrescrito durante a cópia: tenta o próximo válido
+                self.read_conflicts += 1
+                cursor = seq
+                continue
+
+            magic, header_seq, _, length = RECORD_HEADER.unpack_from(record)
+            if magic != RECORD_MAGIC or header_seq != seq:
+                self.read_conflicts += 1
+                cursor = seq
+                continue
+            return seq, timestamp, record[RECORD_HEADER.size:RECORD_HEADER.size + length]
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        index, first = self._live_entries()
+        return index[first][1] if first < len(index) else None
+
+    # Ciclo de vida ---------------------------------------------------------
+
+    def close(self):
+        """Para a gravação e remove o arquivo do ring."""
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self._index = []
+        try:
+            self._mm.close()
+            self._file.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        index, first = self._live_entries()
+        records = max(0, len(index) - first)
+        span = index[-1][1] - index[first][1] if records > 1 else 0.0
+        return {
+            "records": records,
+            "history_seconds": round(span, 1),
+            "capacity_bytes": self.capacity,
+            "used_bytes": self._used_bytes,
+            "records_written": self.records_written,
+            "records_oversize": self.records_oversize,
+            "read_conflicts": self.read_conflicts,
+        }
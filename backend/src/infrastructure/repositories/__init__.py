@@ -1,4 +1,14 @@
 from .postgres_user_repository import PostgresUserRepository
 from .postgres_log_repository import PostgresLogRepository
+from .postgres_occupancy_repository import PostgresOccupancyRepository
+from .spooling_log_repository import SpoolingLogRepository, LogSpool
+from .cached_user_repository import CachedUserRepository
 
-__all__ = ['PostgresUserRepository', 'PostgresLogRepository']
+__all__ = [
+    'PostgresUserRepository',
+    'PostgresLogRepository',
+    'PostgresOccupancyRepository',
+    'SpoolingLogRepository',
+    'LogSpool',
+    'CachedUserRepository'
+]
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional
+
+from ...domain.entities.user import User
+from ...domain.ports.user_repository import UserRepository
+from ...shared.utils.ttl_cache import TTLCache, MISSING
+
+
+class CachedUserRepository(UserRepository):
+    """Cache read-through (TTL + LRU) na frente de um `UserRepository`.
+
+    Consultas por username e por email são guardadas em memória, inclusive
+    "não encontrado" (com TTL menor). `create` invalida as chaves do novo
+    usuário, então um registro nunca fica escondido por um negativo antigo
+    neste processo. `find_all` não é cacheado.
+    """
+
+    def __init__(
+        self,
+        inner: UserRepository,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+    ):
+        self.inner = inner
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(max_entries, ttl)
+
+    def _remember(self, key: tuple, user: Optional[User]) -> None:
+        self._cache.set(key, user, ttl=None if user is not None else self.negative_ttl)
+        if user is not None:
+            # A mesma entidade responde pelas duas chaves
+            other = ("email", user.email) if key[0] == "username" else ("username", user.username)
+            self._cache.set(other, user)
+
+    async def _lookup(self, key: tuple, loader) -> Optional[User]:
+        cached = self._cache.get(key)
+        if cached is not MISSING:
+            return cached.copy() if cached is not None else None
+        user = await loader(key[1])
+        self._remember(key, user)
+        return user.copy() if user is not None else None
+
+    async def find_by_username(self, username: str) -> Optional[User]:
+        return await self._lookup(("username", username), self.inner.find_by_username)
+
+    async def find_by_email(self, email: str) -> Optional[User]:
+        return await self._lookup(("email", email), self.inner.find_by_email)
+
+    async def create(self, user: User) -> User:
+        try:
+            return await self.inner.create(user)
+        finally:
+            self.invalidate(user.username, user.email)
+
+    async def find_all(self) -> List[User]:
+        return await self.inner.find_all()
+
+    def invalidate(self, username: Optional[str] = None, email: Optional[str] = None) -> None:
+        if username is not None:
+            self._cache.pop(("username", username))
+        if email is not None:
+            self._cache.pop(("email", email))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._cache.get_stats()
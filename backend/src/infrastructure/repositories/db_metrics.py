@@ -0,0 +1,92 @@
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class QueryTimings:
+    """Janela das últimas durações (ms) por operação, com p50/p99."""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, elapsed_ms: float, failed: bool = False) -> None:
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(elapsed_ms)
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if failed:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    @staticmethod
+    def _percentile(ordered, fraction: float) -> float:
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+        return {
+            name: {
+                "count": counts.get(name, 0),
+                "errors": errors.get(name, 0),
+                "p50_ms": round(self._percentile(ordered, 0.50), 2),
+                "p99_ms": round(self._percentile(ordered, 0.99), 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+            for name, ordered in snapshot.items()
+            if ordered
+        }
+
+
+query_timings = QueryTimings()
+
+
+def timed(name: str):
+    """Mede a duração de um método de repositório (corrotina ou gerador assíncrono).
+
+    Em geradores assíncronos mede do início ao fim da iteração.
+    """
+
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def gen_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                failed = False
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    query_timings.record(name, (time.perf_counter() - started) * 1000, failed)
+
+            return gen_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = False
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                query_timings.record(name, (time.perf_counter() - started) * 1000, failed)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME_RE = re.compile(r"^logs_y(\d{4})m(\d{2})$")
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"logs_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds_sql(month: date) -> str:
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL da partição mensal [month, month + 1) da tabela `logs`."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF logs "
+        f"{partition_bounds_sql(month)}"
+    )
+
+
+class LogPartitionManager:
+    """Manutenção das partições mensais de `logs`.
+
+    Cria com antecedência as partições dos próximos meses (para que nada caia
+    na partição DEFAULT) e aplica a retenção removendo partições inteiras
+    (DETACH + DROP), em tempo constante, em vez de DELETE linha a linha.
+    O histórico agregado continua nos rollups de ocupação.
+
+    Cada partição é tratada numa transação curta com `lock_timeout`: se um
+    export ou stream longo segura `logs`, o DDL desiste em vez de enfileirar
+    inserts e consultas atrás de si, e a manutenção tenta de novo após
+    `retry_seconds`. Uma partição com problema não bloqueia as demais.
+    """
+
+    def __init__(
+        self,
+        engine,
+        months_ahead: int,
+        retention_months: int,
+        interval_seconds: float,
+        lock_timeout_ms: int = 2000,
+        retry_seconds: float = 300.0,
+    ):
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.interval_seconds = interval_seconds
+        self.lock_timeout_ms = lock_timeout_ms
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.last_run: Optional[datetime] = None
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.rows_moved_from_default = 0
+        self.last_error: Optional[str] = None
+
+    async def list_partitions(self, conn) -> List[str]:
+        res = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'logs'"
+            )
+        )
+        return [row[0] for row in res]
+
+    async def list_monthly_tables(self, conn) -> List[str]:
+        """Tabelas mensais `logs_yYYYYmMM`, anexadas ou não (ex.: DETACH feito, DROP não)."""
+        res = await conn.execute(
+            text(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind IN ('r', 'p') AND relnamespace = current_schema()::regnamespace "
+                "AND relname ~ '^logs_y[0-9]{4}m[0-9]{2}$'"
+            )
+        )
+        return [row[0] for row in res]
+
+    async def _set_lock_timeout(self, conn) -> None:
+        await conn.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+
+    async def _has_default_partition(self, conn) -> bool:
+        res = await conn.execute(
+            text(
+                "SELECT pt.partdefid <> 0 FROM pg_partitioned_table pt "
+                "JOIN pg_class p ON p.oid = pt.partrelid WHERE p.relname = 'logs'"
+            )
+        )
+        return bool(res.scalar())
+
+    async def create_partition(self, month: date) -> int:
+        """Cria a partição do mês; retorna quantas linhas saíram da DEFAULT.
+
+        Linhas do mês já gravadas em `logs_default` impediriam o CREATE ...
+        PARTITION OF. A partição é criada solta, recebe essas linhas e só
+        então é anexada (ATTACH pega um lock mais fraco na tabela pai).
+        """
+        name = partition_name(month)
+        start, end = month.isoformat(), add_months(month, 1).isoformat()
+        async with self.engine.begin() as conn:
+            await self._set_lock_timeout(conn)
+            await conn.execute(
+                text(f"CREATE TABLE {name} (LIKE logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            )
+            moved = 0
+            if await self._has_default_partition(conn):
+                res = await conn.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM logs_default "
+                        f"WHERE timestamp >= '{start}' AND timestamp < '{end}' RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved"
+                    )
+                )
+                moved = res.rowcount or 0
+            await conn.execute(
+                text(f"ALTER TABLE logs ATTACH PARTITION {name} {partition_bounds_sql(month)}")
+            )
+        return moved
+
+    async def drop_partition(self, name: str, attached: bool = True) -> None:
+        """DETACH (CONCURRENTLY quando possível) + DROP de uma partição."""
+        if not attached:
+            async with self.engine.begin() as conn:
+                await self._set_lock_timeout(conn)
+                await conn.execute(text(f"DROP TABLE {name}"))
+            return
+
+        async with self.engine.connect() as conn:
+            version = (await conn.execute(text("SHOW server_version_num"))).scalar()
+            has_default = await self._has_default_partition(conn)
+
+        # CONCURRENTLY (PG 14+) não bloqueia `logs`, mas não existe com partição DEFAULT
+        # e não roda dentro de transação
+        if int(version) >= 140000 and not has_default:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(f"SET lock_timeout = {int(self.lock_timeout_ms)}"))
+                try:
+                    await conn.execute(
+                        text(f"ALTER TABLE logs DETACH PARTITION {name} CONCURRENTLY")
+                    )
+                finally:
+                    # Conexão volta ao pool: não levar o timeout junto
+                    await conn.execute(text("RESET lock_timeout"))
+        else:
+            async with self.engine.begin() as conn:
+                await self._set_lock_timeout(conn)
+                await conn.execute(text(f"ALTER TABLE logs DETACH PARTITION {name}"))
+
+        # Já fora de `logs`: o DROP não trava o tráfego
+        async with self.engine.begin() as conn:
+            await self._set_lock_timeout(conn)
+            await conn.execute(text(f"DROP TABLE {name}"))
+
+    async def run_once(self) -> Dict[str, Any]:
+        today = month_start(datetime.now())
+        created, dropped, failed = [], [], []
+
+        async with self.engine.connect() as conn:
+            existing = set(await self.list_partitions(conn))
+            monthly_tables = set(await self.list_monthly_tables(conn))
+
+        for offset in range(self.months_ahead + 1):
+            month = add_months(today, offset)
+            name = partition_name(month)
+            if name in existing:
+                continue
+            try:
+                self.rows_moved_from_default += await self.create_partition(month)
+                created.append(name)
+            except Exception as e:
+                failed.append(name)
+                self.last_error = str(e)
+                logger.warning(f"Falha ao criar partição {name}: {e}")
+
+        if self.retention_months > 0:
+            cutoff = add_months(today, -self.retention_months)
+            for name in sorted(existing | monthly_tables):
+                match = PARTITION_NAME_RE.match(name)
+                if not match:
+                    continue
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                # A partição inteira é mais antiga que o corte
+                if add_months(month, 1) > cutoff:
+                    continue
+                try:
+                    await self.drop_partition(name, attached=name in existing)
+                    dropped.append(name)
+                except Exception as e:
+                    failed.append(name)
+                    self.last_error = str(e)
+                    logger.warning(f"Falha ao remover partição {name}: {e}")
+
+        self.partitions_created += len(created)
+        self.partitions_dropped += len(dropped)
+        self.last_run = datetime.now()
+        if not failed:
+            self.last_error = None
+        return {"created": created, "dropped": dropped, "failed": failed}
+
+    async def _run(self):
+        while True:
+            delay = self.interval_seconds
+            try:
+                result = await self.run_once()
+                if result["created"] or result["dropped"]:
+                    logger.warning(f"Partições de logs: {result}")
+                if result["failed"]:
+                    delay = min(delay, self.retry_seconds)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Falha na manutenção de partições: {e}")
+                delay = min(delay, self.retry_seconds)
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "rows_moved_from_default": self.rows_moved_from_default,
+            "retention_months": self.retention_months,
+            "last_error": self.last_error,
+        }
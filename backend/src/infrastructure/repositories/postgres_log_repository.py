@@ -1,29 +1,105 @@
-from typing import List
-from sqlalchemy import select, desc
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import select, desc, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...domain.ports.log_repository import LogRepository
 from ...domain.entities.log import Log
 from .postgres_repository import get_session
+from .db_metrics import timed
 from .postgres_models import LogModel
-import uuid
+import os
+import time
+
+# Linhas por INSERT multi-linha (limite de 32767 parâmetros do protocolo)
+BULK_CHUNK_ROWS = 1000
+
+
+def new_log_id() -> str:
+    """UUID ordenado por tempo (48 bits de ms + 80 bits aleatórios, estilo v7).
+
+    Ids crescentes mantêm os inserts no fim do índice da PK em vez de
+    espalhá-los aleatoriamente.
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    hex_id = f"{value:032x}"
+    return f"{hex_id[:8]}-{hex_id[8:12]}-{hex_id[12:16]}-{hex_id[16:20]}-{hex_id[20:]}"
 
 
 class PostgresLogRepository(LogRepository):
+    @timed("logs.create")
     async def create(self, log: Log) -> Log:
-        async for session in get_session():  # type: AsyncSession
-            model = LogModel(
-                id=str(uuid.uuid4()),
+        """Insere um log; uma chave de idempotência repetida devolve o log já gravado."""
+        log.id = log.id or new_log_id()
+        stmt = (
+            insert(LogModel)
+            .values(
+                id=log.id,
                 timestamp=log.timestamp,
                 count=log.count,
                 details=dict(log.details or {}),
                 user=log.user,
                 created_at=log.created_at,
+                idempotency_key=log.idempotency_key,
             )
-            session.add(model)
+            .on_conflict_do_nothing(
+                index_elements=[LogModel.idempotency_key, LogModel.timestamp]
+            )
+            .returning(LogModel.id)
+        )
+        async for session in get_session():  # type: AsyncSession
+            inserted = (await session.execute(stmt)).scalar_one_or_none()
+            if inserted is None:
+                # Reenvio: reaproveita o id da linha que ganhou o conflito
+                existing = await session.execute(
+                    select(LogModel.id).where(
+                        LogModel.idempotency_key == log.idempotency_key,
+                        LogModel.timestamp == log.timestamp,
+                    )
+                )
+                log.id = existing.scalar_one_or_none() or log.id
             await session.commit()
-            log.id = model.id
             return log
 
+    @timed("logs.create_many")
+    async def create_many(self, logs: List[Log]) -> int:
+        """Insere os logs com INSERT multi-linha numa única transação.
+
+        Chaves de idempotência repetidas são ignoradas (ON CONFLICT DO NOTHING).
+        """
+        if not logs:
+            return 0
+        rows = []
+        for log in logs:
+            log.id = log.id or new_log_id()
+            rows.append(
+                {
+                    "id": log.id,
+                    "timestamp": log.timestamp,
+                    "count": log.count,
+                    "details": dict(log.details or {}),
+                    "user": log.user,
+                    "created_at": log.created_at,
+                    "idempotency_key": log.idempotency_key,
+                }
+            )
+        inserted = 0
+        async for session in get_session():  # type: AsyncSession
+            for start in range(0, len(rows), BULK_CHUNK_ROWS):
+                stmt = (
+                    insert(LogModel)
+                    .values(rows[start:start + BULK_CHUNK_ROWS])
+                    .on_conflict_do_nothing(
+                        index_elements=[LogModel.idempotency_key, LogModel.timestamp]
+                    )
+                    .returning(LogModel.id)
+                )
+                res = await session.execute(stmt)
+                inserted += len(res.fetchall())
+            await session.commit()
+            return inserted
+
+    @timed("logs.find_recent")
     async def find_recent(self, limit: int = 100) -> List[Log]:
         async for session in get_session():  # type: AsyncSession
             stmt = select(LogModel).order_by(desc(LogModel.timestamp)).limit(limit)
@@ -41,21 +117,105 @@ class PostgresLogRepository(LogRepository):
                 for r in rows
             ]
 
-    async def find_all(self) -> List[Log]:
+    @staticmethod
+    def _filtered(
+        stmt,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        user: Optional[str],
+        event: Optional[str],
+    ):
+        if start is not None:
+            stmt = stmt.where(LogModel.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(LogModel.timestamp < end)
+        if user is not None:
+            stmt = stmt.where(LogModel.user == user)
+        if event is not None:
+            stmt = stmt.where(LogModel.details["event"].astext == event)
+        return stmt
+
+    def _range_query(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        user: Optional[str],
+        event: Optional[str],
+        after: Optional[Tuple[datetime, str]],
+        limit: int,
+    ):
+        stmt = self._filtered(select(LogModel), start, end, user, event)
+        if after is not None:
+            # Keyset: continua estritamente depois de (timestamp, id) na ordem decrescente
+            stmt = stmt.where(tuple_(LogModel.timestamp, LogModel.id) < tuple_(*after))
+        return stmt.order_by(desc(LogModel.timestamp), desc(LogModel.id)).limit(limit)
+
+    @staticmethod
+    def _to_entity(r: LogModel) -> Log:
+        # Linhas do banco já são válidas: evita revalidar cada uma pelo pydantic
+        return Log.construct(
+            id=r.id,
+            timestamp=r.timestamp,
+            count=r.count,
+            details=r.details,
+            user=r.user,
+            created_at=r.created_at,
+            idempotency_key=r.idempotency_key,
+        )
+
+    @timed("logs.find_range")
+    async def find_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 100,
+    ) -> List[Log]:
         async for session in get_session():  # type: AsyncSession
-            stmt = select(LogModel)
-            res = await session.execute(stmt)
-            rows = res.scalars().all()
-            return [
-                Log(
-                    id=r.id,
-                    timestamp=r.timestamp,
-                    count=r.count,
-                    details=r.details,
-                    user=r.user,
-                    created_at=r.created_at,
-                )
-                for r in rows
-            ]
+            res = await session.execute(
+                self._range_query(start, end, user, event, after, limit)
+            )
+            return [self._to_entity(r) for r in res.scalars().all()]
 
+    @timed("logs.stream_range")
+    async def stream_range(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Log]:
+        # Uma consulta curta por página: memória e transações não crescem com o resultado
+        while True:
+            page = await self.find_range(start, end, user, event, after, page_size)
+            for log in page:
+                yield log
+            if len(page) < page_size:
+                return
+            after = (page[-1].timestamp, page[-1].id)
 
+    @timed("logs.iter_export_batches")
+    async def iter_export_batches(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        event: Optional[str] = None,
+        batch_size: int = 5000,
+    ) -> AsyncIterator[List[Log]]:
+        stmt = self._filtered(select(LogModel), start, end, user, event).order_by(
+            LogModel.timestamp, LogModel.id
+        )
+        async for session in get_session():  # type: AsyncSession
+            # Cursor no servidor: busca `batch_size` linhas por vez
+            result = await session.stream(
+                stmt.execution_options(yield_per=batch_size)
+            )
+            async for partition in result.scalars().partitions(batch_size):
+                yield [self._to_entity(r) for r in partition]
+                # Objetos já exportados não precisam ficar no identity map
+                session.expunge_all()
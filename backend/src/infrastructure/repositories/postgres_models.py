@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, DateTime, Integer, Text
+from sqlalchemy import (
+    Column, String, DateTime, Integer, BigInteger, Float, Text, Index, UniqueConstraint, text
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from .postgres_repository import Base
 
@@ -14,13 +16,54 @@ class UserModel(Base):
 
 
 class LogModel(Base):
+    """Tabela particionada por mês em `timestamp` (ver migrations/)."""
+
     __tablename__ = "logs"
+    __table_args__ = (
+        # Restrições únicas em tabela particionada precisam incluir a chave de partição
+        UniqueConstraint("idempotency_key", "timestamp", name="uq_logs_idempotency"),
+        # btree ordenado para a paginação keyset (timestamp DESC, id DESC);
+        # BRIN fica para varreduras de intervalos largos
+        Index("ix_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_logs_timestamp_brin", "timestamp", postgresql_using="brin"),
+        Index("ix_logs_event", text("(details ->> 'event')")),
+        Index(
+            "ix_logs_details_gin",
+            "details",
+            postgresql_using="gin",
+            postgresql_ops={"details": "jsonb_path_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = Column(String, primary_key=True)
-    timestamp = Column(DateTime, nullable=False, index=True)
+    timestamp = Column(DateTime, primary_key=True)
     count = Column(Integer, nullable=False)
     details = Column(JSONB, nullable=False)
     created_at = Column(DateTime, nullable=False)
     user = Column(String, nullable=True, index=True)
+    idempotency_key = Column(String(64), nullable=True)
+
+
+
+
+class OccupancyColumns:
+    """Colunas comuns dos rollups de ocupação (médias = soma / contagem)."""
+
+    camera = Column(String(64), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    entries = Column(Integer, nullable=False, default=0)
+    exits = Column(Integer, nullable=False, default=0)
+    peak_occupancy = Column(Integer, nullable=False, default=0)
+    occupancy_sum = Column(BigInteger, nullable=False, default=0)
+    occupancy_samples = Column(Integer, nullable=False, default=0)
+    dwell_seconds_sum = Column(Float, nullable=False, default=0.0)
+    dwell_count = Column(Integer, nullable=False, default=0)
+
+
+class OccupancyMinuteModel(OccupancyColumns, Base):
+    __tablename__ = "occupancy_minute"
 
 
+class OccupancyHourModel(OccupancyColumns, Base):
+    __tablename__ = "occupancy_hour"
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...domain.ports.occupancy_repository import OccupancyRepository
+from ...domain.entities.occupancy import OccupancyBucket
+from .postgres_repository import get_session
+from .db_metrics import timed
+from .postgres_models import OccupancyMinuteModel, OccupancyHourModel
+
+ROLLUP_MODELS = {
+    "minute": OccupancyMinuteModel,
+    "hour": OccupancyHourModel,
+}
+
+# Campos somados no upsert (o pico usa GREATEST)
+ADDITIVE_FIELDS = (
+    "entries",
+    "exits",
+    "occupancy_sum",
+    "occupancy_samples",
+    "dwell_seconds_sum",
+    "dwell_count",
+)
+
+
+class PostgresOccupancyRepository(OccupancyRepository):
+    @timed("occupancy.upsert")
+    async def upsert(self, granularity: str, buckets: List[OccupancyBucket]) -> None:
+        if not buckets:
+            return
+        model = ROLLUP_MODELS[granularity]
+        stmt = insert(model).values([bucket.dict() for bucket in buckets])
+        excluded = stmt.excluded
+        updates = {
+            field: getattr(model, field) + getattr(excluded, field)
+            for field in ADDITIVE_FIELDS
+        }
+        updates["peak_occupancy"] = func.greatest(
+            model.peak_occupancy, excluded.peak_occupancy
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.camera, model.bucket], set_=updates
+        )
+        async for session in get_session():  # type: AsyncSession
+            await session.execute(stmt)
+            await session.commit()
+
+    @timed("occupancy.find_range")
+    async def find_range(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        camera: Optional[str] = None,
+    ) -> List[OccupancyBucket]:
+        model = ROLLUP_MODELS[granularity]
+        stmt = select(model).where(model.bucket >= start, model.bucket < end)
+        if camera is not None:
+            stmt = stmt.where(model.camera == camera)
+        stmt = stmt.order_by(model.bucket, model.camera)
+        async for session in get_session():  # type: AsyncSession
+            res = await session.execute(stmt)
+            return [OccupancyBucket.from_orm(r) for r in res.scalars().all()]
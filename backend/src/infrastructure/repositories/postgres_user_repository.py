@@ -4,12 +4,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ...domain.ports.user_repository import UserRepository
 from ...domain.entities.user import User
 from .postgres_repository import get_session
+from .db_metrics import timed
 from .postgres_models import UserModel
 from datetime import datetime
 import uuid
 
 
 class PostgresUserRepository(UserRepository):
+    @timed("users.create")
     async def create(self, user: User) -> User:
         async for session in get_session():  # type: AsyncSession
             model = UserModel(
@@ -24,6 +26,7 @@ class PostgresUserRepository(UserRepository):
             user.id = model.id
             return user
 
+    @timed("users.find_by_username")
     async def find_by_username(self, username: str) -> Optional[User]:
         async for session in get_session():  # type: AsyncSession
             stmt = select(UserModel).where(UserModel.username == username)
@@ -39,6 +42,7 @@ class PostgresUserRepository(UserRepository):
                 created_at=row.created_at,
             )
 
+    @timed("users.find_by_email")
     async def find_by_email(self, email: str) -> Optional[User]:
         async for session in get_session():  # type: AsyncSession
             stmt = select(UserModel).where(UserModel.email == email)
@@ -54,6 +58,7 @@ class PostgresUserRepository(UserRepository):
                 created_at=row.created_at,
             )
 
+    @timed("users.find_all")
     async def find_all(self) -> List[User]:
         async for session in get_session():  # type: AsyncSession
             stmt = select(UserModel)
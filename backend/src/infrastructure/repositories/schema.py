@@ -0,0 +1,21 @@
+import asyncio
+import os
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+
+def _upgrade_head():
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+
+    config = AlembicConfig(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # Não reconfigurar o logging da aplicação
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+async def upgrade_schema() -> None:
+    """Aplica as migrations Alembic pendentes (em thread: o env.py tem seu próprio loop)."""
+    await asyncio.to_thread(_upgrade_head)
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import exc as sa_exc
+
+from ...domain.entities.log import Log
+from ...domain.ports.log_repository import LogRepository
+from .postgres_log_repository import new_log_id
+
+logger = logging.getLogger(__name__)
+
+
+def is_database_unavailable(error: BaseException) -> bool:
+    """Erro de conectividade (banco fora/lento), e não de dados ou de SQL."""
+    if isinstance(error, (OSError, asyncio.TimeoutError, sa_exc.TimeoutError)):
+        return True
+    if isinstance(error, (sa_exc.OperationalError, sa_exc.InterfaceError)):
+        return True
+    return isinstance(error, sa_exc.DBAPIError) and error.connection_invalidated
+
+
+class LogSpool:
+    """Fila durável de logs num SQLite local (WAL), em ordem de chegada."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL em WAL: sobrevive a queda do processo; só perde o último commit se a máquina cair
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)"
+        )
+        self._depth = self._conn.execute("SELECT count(*) FROM spool").fetchone()[0]
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @staticmethod
+    def _encode(log: Log) -> str:
+        return json.dumps(
+            {
+                "id": log.id,
+                "timestamp": log.timestamp.isoformat(),
+                "count": log.count,
+                "details": log.details,
+                "user": log.user,
+                "idempotency_key": log.idempotency_key,
+                "created_at": log.created_at.isoformat(),
+            },
+            default=str,
+            ensure_ascii=False,
+        )
+
+    @staticmethod
+    def _decode(payload: str) -> Log:
+        data = json.loads(payload)
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return Log.construct(**data)
+
+    def append(self, logs: List[Log]) -> None:
+        rows = [(self._encode(log),) for log in logs]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT INTO spool (payload) VALUES (?)", rows)
+            self._depth += len(rows)
+
+    def peek(self, limit: int) -> List[Tuple[int, Log]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, payload FROM spool ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, self._decode(payload)) for seq, payload in rows]
+
+    def ack(self, last_seq: int) -> None:
+        """Remove tudo até `last_seq` (inclusive), já gravado no banco."""
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute(
+                    "DELETE FROM spool WHERE seq <= ?", (last_seq,)
+                ).rowcount
+            self._depth = max(0, self._depth - removed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolingLogRepository(LogRepository):
+    """Decorador de `LogRepository` que não perde logs com o Postgres fora.
+
+    Gravações que falham por conectividade vão para o spool local e, enquanto
+    houver algo no spool, novas gravações também vão para ele (mantém a
+    ordem). Uma task reenvia o spool em lotes via `create_many` assim que o
+    banco volta; cada log recebe id e chave de idempotência ao entrar no
+    spool, então um reenvio repetido não duplica linhas. Leituras são
+    delegadas direto ao repositório interno.
+    """
+
+    def __init__(
+        self,
+        inner: LogRepository,
+        spool: LogSpool,
+        replay_batch_size: int = 500,
+        retry_interval: float = 2.0,
+    ):
+        self.inner = inner
+        self.spool = spool
+        self.replay_batch_size = max(1, replay_batch_size)
+        self.retry_interval = retry_interval
+
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.spooled = 0
+        self.replayed = 0
+        self.replay_rejected = 0
+        self.replay_batches = 0
+        self.replay_rows_per_second = 0.0
+        self.database_available = True
+        self.last_error: Optional[str] = None
+        self.last_replay: Optional[datetime] = None
+
+    # Escrita ---------------------------------------------------------------
+
+    async def _to_spool(self, logs: List[Log]) -> None:
+        for log in logs:
+            log.id = log.id or new_log_id()
+            log.idempotency_key = log.idempotency_key or log.id
+        await asyncio.to_thread(self.spool.append, logs)
+        self.spooled += len(logs)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _mark_unavailable(self, error: BaseException) -> None:
+        if self.database_available:
+            logger.warning(f"Postgres indisponível, gravando logs no spool local: {error}")
+        self.database_available = False
+        self.last_error = str(error)
+
+    async def create(self, log: Log) -> Log:
+        if self.spool.depth or not self.database_available:
+            await self._to_spool([log])
+            return log
+        try:
+            return await self.inner.create(log)
+        except Exception as e:
+            if not is_database_unavailable(e):
+                raise
+            self._mark_unavailable(e)
+            await self._to_spool([log])
+            return log
+
+    async def create_many(self, logs: List[Log]) -> int:
+        if not logs:
+            return 0
+        if self.spool.depth or not self.database_available:
+            await self._to_spool(logs)
+            return len(logs)
+        try:
+            return await self.inner.create_many(logs)
+        except Exception as e:
+            if not is_database_unavailable(e):
+                raise
+            self._mark_unavailable(e)
+            await self._to_spool(logs)
+            return len(logs)
+
+    # Leitura (delegada) ----------------------------------------------------
+
+    async def find_recent(self, limit: int = 100) -> List[Log]:
+        return await self.inner.find_recent(limit)
+
+    async def find_range(self, *args, **kwargs) -> List[Log]:
+        return await self.inner.find_range(*args, **kwargs)
+
+    def stream_range(self, *args, **kwargs) -> AsyncIterator[Log]:
+        return self.inner.stream_range(*args, **kwargs)
+
+    def iter_export_batches(self, *args, **kwargs) -> AsyncIterator[List[Log]]:
+        return self.inner.iter_export_batches(*args, **kwargs)
+
+    # Reenvio ---------------------------------------------------------------
+
+    def start(self) -> None:
+        """Inicia a task de reenvio no event loop corrente."""
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wake = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.retry_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                if self.spool.depth:
+                    await self.replay()
+                elif not self.database_available:
+                    # Spool vazio: a próxima gravação volta a tentar o banco
+                    self.database_available = True
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Falha no reenvio do spool de logs: {e}")
+
+    async def replay(self) -> int:
+        """Reenvia o spool em ordem até esvaziá-lo ou o banco falhar."""
+        replayed = 0
+        started = time.perf_counter()
+        while True:
+            entries = await asyncio.to_thread(self.spool.peek, self.replay_batch_size)
+            if not entries:
+                break
+            logs = [log for _, log in entries]
+            try:
+                await self.inner.create_many(logs)
+            except Exception as e:
+                if is_database_unavailable(e):
+                    self._mark_unavailable(e)
+                    break
+                # Erro de dados: isola as linhas problemáticas para não travar o spool
+                if not await self._replay_one_by_one(logs):
+                    break
+            await asyncio.to_thread(self.spool.ack, entries[-1][0])
+            replayed += len(entries)
+            self.replay_batches += 1
+
+        if replayed:
+            elapsed = time.perf_counter() - started
+            self.replayed += replayed
+            self.replay_rows_per_second = replayed / elapsed if elapsed > 0 else 0.0
+            self.last_replay = datetime.now()
+        if not self.spool.depth:
+            if not self.database_available:
+                logger.warning("Postgres disponível, spool de logs reenviado")
+            self.database_available = True
+            self.last_error = None
+        return replayed
+
+    async def _replay_one_by_one(self, logs: List[Log]) -> bool:
+        """Reenvia linha a linha; False se o banco caiu no meio (lote fica no spool)."""
+        for log in logs:
+            try:
+                await self.inner.create_many([log])
+            except Exception as e:
+                if is_database_unavailable(e):
+                    self._mark_unavailable(e)
+                    return False
+                self.replay_rejected += 1
+                logger.warning(f"Log descartado no reenvio do spool ({log.id}): {e}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "database_available": self.database_available,
+            "depth": self.spool.depth,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "replay_rejected": self.replay_rejected,
+            "replay_batches": self.replay_batches,
+            "replay_rows_per_second": round(self.replay_rows_per_second, 1),
+            "last_replay": self.last_replay.isoformat() if self.last_replay else None,
+            "last_error": self.last_error,
+        }
@@ -1,12 +1,51 @@
-from .jwt_auth_service import JWTAuthService, get_current_user, check_rate_limit, check_login_rate_limit
-from .video_service import get_video_feed_response, get_demo_stream_response, get_cache_stats
+from .jwt_auth_service import (
+    JWTAuthService,
+    get_current_user,
+    check_rate_limit,
+    check_login_rate_limit,
+    oauth2_scheme,
+    revoke_token,
+    revoke_all_tokens,
+    get_token_cache_stats,
+    get_rate_limit_stats,
+)
+from .video_service import get_video_feed_response, get_demo_stream_response, get_cache_stats, serve_websocket_stream, get_detection_events_response
+from .stream_session import (
+    StreamPolicy,
+    StreamSession,
+    StreamLimitExceeded,
+    stream_registry,
+    get_stream_sessions_stats,
+)
+from .hls_segmenter import hls_segmenter
+from .event_sink import DetectorEventSink
+from .occupancy_rollup import OccupancyRollup
+from .log_export import csv_export_chunks, columnar_export_chunks, columnar_export_available
 
 __all__ = [
     'JWTAuthService', 
     'get_current_user', 
     'check_rate_limit', 
     'check_login_rate_limit',
+    'oauth2_scheme',
+    'revoke_token',
+    'revoke_all_tokens',
+    'get_token_cache_stats',
+    'get_rate_limit_stats',
     'get_video_feed_response',
     'get_demo_stream_response',
-    'get_cache_stats'
+    'serve_websocket_stream',
+    'get_detection_events_response',
+    'get_cache_stats',
+    'StreamPolicy',
+    'StreamSession',
+    'StreamLimitExceeded',
+    'stream_registry',
+    'get_stream_sessions_stats',
+    'hls_segmenter',
+    'DetectorEventSink',
+    'OccupancyRollup',
+    'csv_export_chunks',
+    'columnar_export_chunks',
+    'columnar_export_available'
 ]
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ...domain.entities.log import Log
+from ...domain.ports.log_repository import LogRepository
+from .occupancy_rollup import OccupancyRollup, parse_event_timestamp
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_USER = "detector"
+
+
+class DetectorEventSink:
+    """Persiste eventos ENTRY/EXIT do detector em lotes, sem bloquear a detecção.
+
+    `submit` é chamado na thread de detecção e só faz `put_nowait` numa fila
+    limitada. Uma task asyncio grava a cada `batch_size` eventos ou
+    `flush_interval` segundos com um único INSERT multi-linha. Com o banco
+    lento a fila enche e os eventos excedentes viram contagens por tipo,
+    gravadas como um único log "COALESCED" no próximo lote.
+
+    Com `rollup`, todo evento (inclusive as amostras OCCUPANCY, que não
+    viram linhas em `logs`) também atualiza os agregados de ocupação, que
+    são gravados junto de cada flush.
+    """
+
+    def __init__(
+        self,
+        repository: LogRepository,
+        batch_size: int,
+        flush_interval: float,
+        queue_size: int,
+        rollup: Optional[OccupancyRollup] = None,
+    ):
+        self.repository = repository
+        self.rollup = rollup
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.queue_size = max(self.batch_size, queue_size)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._coalesce_lock = threading.Lock()
+        self._coalesced: Dict[str, int] = {}
+        self._coalesced_span: Optional[List[str]] = None  # [primeiro, último] timestamp
+        self._retry: List[Log] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.events_received = 0
+        self.events_inserted = 0
+        self.events_coalesced = 0
+        self.events_dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_flush_ms = 0.0
+
+    # Produtor (thread de detecção) -----------------------------------------
+
+    def submit(self, event: Dict[str, Any]) -> None:
+        """Listener do detector: nunca bloqueia."""
+        if self.rollup is not None:
+            self.rollup.add(event)
+        if event.get("event") == "OCCUPANCY":
+            return
+
+        self.events_received += 1
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._coalesce_lock:
+                kind = event.get("event", "UNKNOWN")
+                self._coalesced[kind] = self._coalesced.get(kind, 0) + 1
+                timestamp = event.get("timestamp")
+                if self._coalesced_span is None:
+                    self._coalesced_span = [timestamp, timestamp]
+                else:
+                    self._coalesced_span[1] = timestamp
+            self.events_coalesced += 1
+
+        if self._loop is not None and self._queue.qsize() >= self.batch_size:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # Consumidor (event loop) -----------------------------------------------
+
+    def start(self) -> None:
+        """Inicia a task de gravação no event loop corrente."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Cancela a task e grava o que restou na fila."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        await self.flush(force=True)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self, force: bool = False) -> None:
+        """Grava todos os eventos pendentes em lotes de `batch_size` e os rollups."""
+        await self._flush_logs()
+        if self.rollup is not None:
+            await self.rollup.flush(force)
+
+    async def _flush_logs(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            started = time.perf_counter()
+            try:
+                await self.repository.create_many(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                logger.warning(f"Falha ao gravar lote de eventos: {e}")
+                self._keep_for_retry(batch)
+                return
+            self.batches += 1
+            self.events_inserted += len(batch)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _take_batch(self) -> List[Log]:
+        batch, self._retry = self._retry[: self.batch_size], self._retry[self.batch_size:]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._to_log(self._queue.get_nowait()))
+            except queue.Empty:
+                break
+
+        summary = self._take_coalesced()
+        if summary is not None:
+            batch.append(summary)
+        return batch
+
+    def _keep_for_retry(self, batch: List[Log]) -> None:
+        """Guarda o lote para a próxima tentativa, limitado ao tamanho da fila."""
+        self._retry = batch + self._retry
+        overflow = len(self._retry) - self.queue_size
+        if overflow > 0:
+            self._retry = self._retry[:-overflow]
+            self.events_dropped += overflow
+
+    def _take_coalesced(self) -> Optional[Log]:
+        with self._coalesce_lock:
+            if not self._coalesced:
+                return None
+            counts, self._coalesced = self._coalesced, {}
+            span, self._coalesced_span = self._coalesced_span, None
+
+        details = {"event": "COALESCED", "counts": counts, "first": span[0], "last": span[1]}
+        return Log(
+            timestamp=parse_event_timestamp(span[1]),
+            count=sum(counts.values()),
+            details=details,
+            user=DETECTOR_USER,
+        )
+
+    def _to_log(self, event: Dict[str, Any]) -> Log:
+        return Log(
+            timestamp=parse_event_timestamp(event.get("timestamp")),
+            count=int(event.get("current_count", 0)),
+            details=event,
+            user=DETECTOR_USER,
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "queued": self._queue.qsize(),
+            "pending_retry": len(self._retry),
+            "events_received": self.events_received,
+            "events_inserted": self.events_inserted,
+            "events_coalesced": self.events_coalesced,
+            "events_dropped": self.events_dropped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "rollup": self.rollup.get_stats() if self.rollup is not None else None,
+        }
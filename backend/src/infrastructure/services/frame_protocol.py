@@ -0,0 +1,119 @@
+import struct
+from typing import Any, Dict, Optional
+
+# Formato binário das mensagens do stream WebSocket (little-endian):
+#
+#   cabeçalho fixo (HEADER_STRUCT, 44 bytes)
+#     magic          4s   b"SHMR"
+#     version        B
+#     flags          B    FLAG_*
+#     header_len     H    tamanho total do cabeçalho (fixo + boxes)
+#     frame_seq      Q    seq do frame enviado
+#     timestamp      d    captura do frame (epoch, segundos)
+#     boxes_seq      Q    seq do frame em que as boxes foram detectadas
+#     people_count   H
+#     faces_count    H
+#     total_passed   I
+#     n_people       H    quantidade de boxes de pessoas
+#     n_faces        H    quantidade de boxes de rostos
+#   boxes de pessoas   n_people * 4 * int16 (x1, y1, x2, y2)
+#   boxes de rostos    n_faces * 4 * int16
+#   payload JPEG       restante da mensagem (pode estar vazio)
+
+PROTOCOL_MAGIC = b"SHMR"
+PROTOCOL_VERSION = 1
+
+FLAG_PLACEHOLDER = 0x01  # frame de espera/erro, sem detecções
+FLAG_ANNOTATED = 0x02  # boxes já desenhadas no JPEG
+
+HEADER_STRUCT = struct.Struct("<4sBBHQdQHHIHH")
+BOX_STRUCT = struct.Struct("<4h")
+
+# header_len é uint16: o total de boxes (pessoas + rostos) precisa caber nele
+MAX_BOXES = (0xFFFF - HEADER_STRUCT.size) // BOX_STRUCT.size
+
+
+def _clamp_coord(value: int) -> int:
+    return max(-32768, min(32767, int(value)))
+
+
+def pack_frame_message(
+    frame_seq: int,
+    timestamp: float,
+    jpeg: Optional[bytes],
+    results: Optional[Dict[str, Any]] = None,
+    total_passed: int = 0,
+    flags: int = 0,
+) -> bytes:
+    """Monta uma mensagem binária com cabeçalho de detecções + JPEG."""
+    results = results or {}
+    people_boxes = list(results.get("people_boxes", []))[:MAX_BOXES]
+    face_boxes = list(results.get("face_boxes", []))[:MAX_BOXES - len(people_boxes)]
+
+    header_len = HEADER_STRUCT.size + BOX_STRUCT.size * (
+        len(people_boxes) + len(face_boxes)
+    )
+
+    parts = [
+        HEADER_STRUCT.pack(
+            PROTOCOL_MAGIC,
+            PROTOCOL_VERSION,
+            flags,
+            header_len,
+            frame_seq,
+            timestamp,
+            results.get("frame_seq", 0),
+            min(results.get("people_count", 0), 0xFFFF),
+            min(results.get("faces_count", 0), 0xFFFF),
+            min(total_passed, 0xFFFFFFFF),
+            len(people_boxes),
+            len(face_boxes),
+        )
+    ]
+    for box in people_boxes + face_boxes:
+        parts.append(BOX_STRUCT.pack(*(_clamp_coord(v) for v in box)))
+    if jpeg:
+        parts.append(jpeg)
+
+    return b"".join(parts)
+
+
+def unpack_frame_header(message: bytes) -> Dict[str, Any]:
+    """Decodifica o cabeçalho de uma mensagem (útil para clientes Python e depuração)."""
+    (
+        magic,
+        version,
+        flags,
+        header_len,
+        frame_seq,
+        timestamp,
+        boxes_seq,
+        people_count,
+        faces_count,
+        total_passed,
+        n_people,
+        n_faces,
+    ) = HEADER_STRUCT.unpack_from(message, 0)
+
+    if magic != PROTOCOL_MAGIC:
+        raise ValueError("Mensagem de frame inválida")
+
+    offset = HEADER_STRUCT.size
+    boxes = []
+    for _ in range(n_people + n_faces):
+        boxes.append(BOX_STRUCT.unpack_from(message, offset))
+        offset += BOX_STRUCT.size
+
+    return {
+        "version": version,
+        "flags": flags,
+        "frame_seq": frame_seq,
+        "timestamp": timestamp,
+        "boxes_seq": boxes_seq,
+        "people_count": people_count,
+        "faces_count": faces_count,
+        "total_passed": total_passed,
+        "people_boxes": boxes[:n_people],
+        "face_boxes": boxes[n_people:],
+        "jpeg_offset": header_len,
+    }
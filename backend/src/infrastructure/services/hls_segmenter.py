@@ -0,0 +1,405 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import cv2
+
+from ...shared.config import Config
+
+SEGMENT_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+\.(m4s|ts|mp4)$")
+SEGMENT_INDEX_RE = re.compile(r"seg_(\d+)\.")
+
+MEDIA_TYPES = {
+    "m3u8": "application/vnd.apple.mpegurl",
+    "m4s": "video/iso.segment",
+    "mp4": "video/mp4",
+    "ts": "video/mp2t",
+}
+
+
+def _default_output_dir() -> str:
+    """Diretório dos segmentos: tmpfs (/dev/shm) quando disponível."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="shomer-hls-", dir=base)
+
+
+class HLSSegmenter:
+    """Saída H.264 de baixa banda: frames -> ffmpeg local -> segmentos HLS.
+
+    Uma thread alimenta o stdin do ffmpeg com frames BGR crus em FPS constante;
+    o ffmpeg gera HLS (fMP4 ou MPEG-TS) num diretório em tmpfs, apagando
+    segmentos antigos. O pipeline sobe sob demanda no primeiro acesso e é
+    encerrado após `idle_timeout` sem clientes.
+
+    O limite `max_store_bytes` é aplicado reduzindo o tamanho da playlist
+    passado ao ffmpeg (`-hls_list_size` + `delete_segments`); segmentos que
+    ainda estão na playlist nunca são apagados por aqui.
+    """
+
+    def __init__(
+        self,
+        ffmpeg_bin: str,
+        width: int,
+        height: int,
+        fps: int,
+        segment_seconds: int,
+        list_size: int,
+        bitrate_kbps: int,
+        segment_type: str,
+        annotate: bool,
+        idle_timeout: float,
+        max_store_bytes: int,
+    ):
+        self.ffmpeg_bin = ffmpeg_bin
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.list_size = list_size
+        self.bitrate_kbps = bitrate_kbps
+        self.segment_type = segment_type if segment_type in ("fmp4", "mpegts") else "fmp4"
+        self.annotate = annotate
+        self.idle_timeout = idle_timeout
+        self.max_store_bytes = max_store_bytes
+
+        self.output_dir: Optional[str] = None
+        self.detector = None
+        self.last_access = 0.0
+        self.last_error: Optional[str] = None
+
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.started_at = 0.0
+        self.frames_written = 0
+        self.segments_produced = 0
+        self.bytes_produced = 0
+        self._gop = max(1, fps * segment_seconds)
+        self.effective_list_size = self._list_size_for_store()
+        self._segment_start_times: Dict[int, float] = {}  # índice do segmento -> captura do 1º frame
+        self._latencies = deque(maxlen=30)
+        self._seen_segments = set()
+        self._cpu_sample = None  # (wall, cpu_seconds)
+        self._cpu_share = 0.0
+
+    # Ciclo de vida ---------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._running and self._process is not None and self._process.poll() is None
+
+    def ensure_running(self, detector) -> bool:
+        """Marca acesso e sobe o pipeline se necessário. Retorna False se ffmpeg faltar."""
+        self.last_access = time.monotonic()
+        self.detector = detector
+
+        with self._lock:
+            if self.running:
+                return True
+            if shutil.which(self.ffmpeg_bin) is None:
+                self.last_error = f"ffmpeg não encontrado: {self.ffmpeg_bin}"
+                return False
+            self._start()
+            return True
+
+    def _list_size_for_store(self) -> int:
+        """Tamanho da playlist que cabe em `max_store_bytes` no bitrate alvo.
+
+        Com `delete_segments` o ffmpeg mantém no disco a playlist, mais um
+        segmento (hls_delete_threshold) e o que está sendo escrito.
+        """
+        segment_bytes = self.bitrate_kbps * 1000 / 8 * self.segment_seconds
+        if segment_bytes <= 0 or self.max_store_bytes <= 0:
+            return self.list_size
+        fits = int(self.max_store_bytes // segment_bytes) - 2
+        return max(1, min(self.list_size, fits))
+
+    def _ffmpeg_command(self):
+        playlist = os.path.join(self.output_dir, "index.m3u8")
+        extension = "m4s" if self.segment_type == "fmp4" else "ts"
+        command = [
+            self.ffmpeg_bin,
+            "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{self.width}x{self.height}",
+            "-framerate", str(self.fps),
+            "-i", "pipe:0",
+            "-an",
+            "-c:v", "libx264",
+            "-preset", "veryfast",
+            "-tune", "zerolatency",
+            "-pix_fmt", "yuv420p",
+            # GOP fixo = 1 keyframe por segmento (segmentos independentes)
+            "-g", str(self._gop),
+            "-keyint_min", str(self._gop),
+            "-sc_threshold", "0",
+            "-b:v", f"{self.bitrate_kbps}k",
+            "-maxrate", f"{self.bitrate_kbps}k",
+            "-bufsize", f"{self.bitrate_kbps * 2}k",
+            "-f", "hls",
+            "-hls_time", str(self.segment_seconds),
+            "-hls_list_size", str(self.effective_list_size),
+            "-hls_flags", "delete_segments+independent_segments+omit_endlist",
+            "-hls_segment_type", self.segment_type,
+            "-start_number", "0",
+            "-hls_segment_filename", os.path.join(self.output_dir, f"seg_%05d.{extension}"),
+        ]
+        if self.segment_type == "fmp4":
+            command += ["-hls_fmp4_init_filename", "init.mp4"]
+        command.append(playlist)
+        return command
+
+    def _start(self):
+        # Pipeline anterior (ex.: ffmpeg morreu) ainda pode ter processo e diretório
+        previous, self._process = self._process, None
+        if previous is not None and previous.poll() is None:
+            previous.kill()
+        if self.output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+        self.output_dir = _default_output_dir()
+        self._process = subprocess.Popen(
+            self._ffmpeg_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._running = True
+        self.started_at = time.time()
+        self.frames_written = 0
+        self._segment_start_times.clear()
+        self._seen_segments.clear()
+        self._cpu_sample = None
+        self.last_error = None
+
+        self._thread = threading.Thread(
+            target=self._feed_loop, args=(self._process,), daemon=True, name="HLSFeeder"
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Para o ffmpeg e remove os segmentos."""
+        self._running = False
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except Exception:
+                pass
+            try:
+                process.wait(timeout=2)
+            except Exception:
+                process.kill()
+        if self.output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+    # Alimentação -----------------------------------------------------------
+
+    def _next_frame(self, last_frame):
+        detector = self.detector
+        if detector is None:
+            return last_frame, None
+        packet = detector.get_frame_packet()
+        if packet is None:
+            return last_frame, None
+        _, captured_at, frame = packet
+        if self.annotate:
+            frame = detector.detect_and_annotate(frame)
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return frame, captured_at
+
+    def _feed_loop(self, process: subprocess.Popen):
+        interval = 1.0 / self.fps
+        next_tick = time.monotonic()
+        frame = None
+
+        while self._running:
+            try:
+                if time.monotonic() - self.last_access > self.idle_timeout:
+                    break
+
+                frame, captured_at = self._next_frame(frame)
+                if frame is not None:
+                    # FPS constante: repete o último frame se não houver novo
+                    if self.frames_written % self._gop == 0:
+                        segment = self.frames_written // self._gop
+                        self._segment_start_times[segment] = captured_at or time.time()
+                    process.stdin.write(frame.tobytes())
+                    self.frames_written += 1
+
+                self._collect_segments()
+            except (BrokenPipeError, ValueError) as e:
+                self.last_error = f"ffmpeg encerrou: {e}"
+                break
+            except Exception as e:
+                self.last_error = str(e)
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            time.sleep(delay)
+
+        with self._lock:
+            # Só encerra se nenhum novo pipeline foi iniciado nesse meio tempo
+            if self._process is process:
+                self.stop()
+
+    def _collect_segments(self):
+        """Detecta segmentos novos (latência) e limita o tamanho do diretório."""
+        output_dir = self.output_dir
+        if not output_dir:
+            return
+
+        entries = []
+        for name in os.listdir(output_dir):
+            match = SEGMENT_INDEX_RE.match(name)
+            if not match:
+                continue
+            path = os.path.join(output_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((int(match.group(1)), name, path, stat.st_size))
+
+        entries.sort()
+        # O último segmento ainda está sendo escrito
+        for index, name, _, size in entries[:-1]:
+            if name in self._seen_segments:
+                continue
+            self._seen_segments.add(name)
+            self.segments_produced += 1
+            self.bytes_produced += size
+            start = self._segment_start_times.pop(index, None)
+            if start is not None:
+                self._latencies.append(time.time() - start)
+
+        # Limpar nomes já apagados pelo ffmpeg
+        names = {name for _, name, _, _ in entries}
+        self._seen_segments &= names
+        if entries:
+            oldest = entries[0][0]
+            for index in [i for i in self._segment_start_times if i < oldest]:
+                del self._segment_start_times[index]
+
+        # Rede de segurança para o limite de disco: só segmentos que não estão
+        # mais na playlist (ex.: sobras de um ffmpeg que caiu) podem ser apagados
+        total = sum(size for *_, size in entries)
+        if total <= self.max_store_bytes:
+            return
+        listed = self._playlist_segments(output_dir)
+        if listed is None:
+            return
+        for _, name, path, size in entries[:-1]:
+            if total <= self.max_store_bytes:
+                break
+            if name in listed:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _playlist_segments(output_dir: str) -> Optional[set]:
+        """Segmentos citados no index.m3u8 atual (None se ainda não existe)."""
+        try:
+            with open(os.path.join(output_dir, "index.m3u8")) as f:
+                return {line.strip() for line in f if line.strip() and not line.startswith("#")}
+        except FileNotFoundError:
+            return None
+
+    # Leitura ---------------------------------------------------------------
+
+    def read_file(self, name: str) -> Optional[bytes]:
+        """Lê playlist/segmento pelo nome (validado) ou None se não existir."""
+        self.last_access = time.monotonic()
+        if not self.output_dir:
+            return None
+        if name != "index.m3u8" and not SEGMENT_NAME_RE.match(name):
+            return None
+        try:
+            with open(os.path.join(self.output_dir, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    # Métricas --------------------------------------------------------------
+
+    def _encoder_cpu_share(self) -> Optional[float]:
+        """Fração de um núcleo usada pelo ffmpeg (via /proc, quando disponível)."""
+        process = self._process
+        if process is None:
+            return None
+        try:
+            with open(f"/proc/{process.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+        except Exception:
+            return None
+
+        now = time.monotonic()
+        if self._cpu_sample is not None:
+            wall = now - self._cpu_sample[0]
+            if wall > 0.5:
+                self._cpu_share = (cpu_seconds - self._cpu_sample[1]) / wall
+                self._cpu_sample = (now, cpu_seconds)
+        else:
+            self._cpu_sample = (now, cpu_seconds)
+        return self._cpu_share
+
+    def get_stats(self) -> Dict[str, Any]:
+        uptime = time.time() - self.started_at if self.running else 0
+        latencies = list(self._latencies)
+        return {
+            "running": self.running,
+            "segment_type": self.segment_type,
+            "list_size": self.effective_list_size,
+            "fps": self.fps,
+            "resolution": f"{self.width}x{self.height}",
+            "bitrate_kbps_target": self.bitrate_kbps,
+            "bitrate_kbps_actual": (
+                round(self.bytes_produced * 8 / 1000 / uptime, 1) if uptime > 0 else 0
+            ),
+            "frames_written": self.frames_written,
+            "segments_produced": self.segments_produced,
+            "encoder_cpu_share": self._encoder_cpu_share() if self.running else None,
+            # Da captura do 1º frame do segmento até ele ficar disponível
+            "segment_latency_ms": round(latencies[-1] * 1000) if latencies else None,
+            "avg_segment_latency_ms": (
+                round(sum(latencies) / len(latencies) * 1000) if latencies else None
+            ),
+            "last_error": self.last_error,
+        }
+
+
+hls_segmenter = HLSSegmenter(
+    ffmpeg_bin=Config.FFMPEG_BIN,
+    width=Config.HLS_WIDTH,
+    height=Config.HLS_HEIGHT,
+    fps=Config.HLS_FPS,
+    segment_seconds=Config.HLS_SEGMENT_SECONDS,
+    list_size=Config.HLS_LIST_SIZE,
+    bitrate_kbps=Config.HLS_BITRATE_KBPS,
+    segment_type=Config.HLS_SEGMENT_TYPE,
+    annotate=Config.HLS_ANNOTATE,
+    idle_timeout=Config.HLS_IDLE_TIMEOUT,
+    max_store_bytes=Config.HLS_MAX_STORE_MB * 1024 * 1024,
+)
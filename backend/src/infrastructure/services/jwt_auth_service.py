@@ -1,14 +1,22 @@
+import hashlib
+import logging
+import math
 import os
+import threading
 import time
 from datetime import timedelta
-from collections import defaultdict
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from ...domain.ports.auth_service import AuthService
+from ...domain.ports.auth_service import AuthService, AuthServiceBusy
 from ...domain.entities.user import User
-from ...shared.config import brasilia_now
+from ...shared.config import brasilia_now, Config
+from ...shared.utils.ttl_cache import TTLCache, MISSING
+from .password_worker import PasswordWorker
+from .rate_limiter import TokenBucketLimiter, create_bucket_store
+
+logger = logging.getLogger(__name__)
 
 # Constantes para JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -21,22 +29,99 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 # Configuração de autenticação
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Rate limiting simples
-request_counts = defaultdict(list)
-RATE_LIMIT_WINDOW = 60  # 60 segundos
-RATE_LIMIT_MAX_REQUESTS = 100  # 100 requests por minuto
-LOGIN_RATE_LIMIT_MAX = 5  # 5 tentativas de login por minuto
+# Tokens já verificados: sha256(token) -> (username, exp), válidos até o exp do token
+token_cache = TTLCache(Config.AUTH_TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+class RevocationList:
+    """Tokens revogados (sha256 -> exp), removidos só quando expiram.
+
+    Ao contrário do `TTLCache`, nunca descarta uma revogação ainda válida
+    para abrir espaço: cheio e sem nada expirado, `add` recusa a nova
+    revogação (o chamador responde erro) em vez de reabilitar outro token.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def __contains__(self, key: bytes) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, key: bytes, expires_at: float) -> bool:
+        """Guarda a revogação até `expires_at`; False se não houver espaço."""
+        now = time.time()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Só expiradas saem; a varredura acontece apenas com a lista cheia
+                for expired in [k for k, exp in self._entries.items() if exp <= now]:
+                    del self._entries[expired]
+                if len(self._entries) >= self.max_entries:
+                    self.rejected += 1
+                    return False
+            self._entries[key] = max(expires_at, self._entries.get(key, 0.0))
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Tokens revogados, mantidos até expirarem (limite: AUTH_REVOKED_TOKENS_MAX)
+revoked_tokens = RevocationList(Config.AUTH_REVOKED_TOKENS_MAX)
+
+# Rate limiting: token buckets com estado limitado (memória LRU ou arquivo compartilhado)
+rate_limit_store = create_bucket_store(
+    Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_MAX_CLIENTS, Config.RATE_LIMIT_SHARED_PATH
+)
+global_rate_limiter = TokenBucketLimiter(
+    rate_limit_store,
+    "global",
+    capacity=Config.RATE_LIMIT_BURST,
+    refill_per_second=Config.RATE_LIMIT_PER_MINUTE / 60.0,
+)
+login_rate_limiter = TokenBucketLimiter(
+    rate_limit_store,
+    "login",
+    capacity=Config.LOGIN_RATE_LIMIT_BURST,
+    refill_per_second=Config.LOGIN_RATE_LIMIT_PER_MINUTE / 60.0,
+)
 
 
 class JWTAuthService(AuthService):
     """Implementação do serviço de autenticação usando JWT."""
     
+    def __init__(self):
+        # bcrypt fora do event loop, com fila limitada e custo adaptativo
+        self.password_worker = PasswordWorker(
+            workers=Config.AUTH_HASH_WORKERS,
+            max_pending=Config.AUTH_HASH_MAX_PENDING,
+            rounds=Config.AUTH_BCRYPT_ROUNDS,
+            min_rounds=Config.AUTH_BCRYPT_MIN_ROUNDS,
+            max_rounds=Config.AUTH_BCRYPT_MAX_ROUNDS,
+            target_ms=Config.AUTH_BCRYPT_TARGET_MS,
+        )
+    
     def hash_password(self, password: str) -> str:
         return pwd_context.hash(password)
     
     def verify_password(self, plain: str, hashed: str) -> bool:
         return pwd_context.verify(plain, hashed)
     
+    async def hash_password_async(self, password: str) -> str:
+        return await self.password_worker.hash(password)
+    
+    async def verify_password_async(self, plain: str, hashed: str) -> bool:
+        return await self.password_worker.verify(plain, hashed)
+    
     def create_token(self, user: User) -> str:
         """Cria um token JWT."""
         to_encode = {"sub": user.username}
@@ -47,24 +132,93 @@ class JWTAuthService(AuthService):
     
     def verify_token(self, token: str) -> str:
         """Verifica um token JWT."""
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                return None
-            return username
-        except JWTError:
-            return None
+        return verify_token_cached(token)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Dependency para obter usuário atual a partir do token."""
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def verify_token_cached(token: str):
+    """Username do token (None se inválido, expirado ou revogado).
+
+    A assinatura só é verificada na primeira vez; depois o subject sai do
+    cache até o `exp` do token.
+    """
+    key = _token_key(token)
+    if key in revoked_tokens:
+        return None
+    now = time.time()
+    cached = token_cache.get(key)
+    if cached is not MISSING and cached[1] > now:
+        return cached[0]
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
-            raise HTTPException(401, "Token inválido")
-    except JWTError as e:
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if not username:
+        return None
+
+    expires_at = payload.get("exp")
+    if expires_at is None:
+        expires_at = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    if expires_at > now:
+        token_cache.set(key, (username, expires_at), ttl=expires_at - now)
+    return username
+
+
+def revoke_token(token: str) -> bool:
+    """Revoga o token neste processo até ele expirar (ex.: logout).
+
+    Só tokens válidos (assinatura e `exp` verificados) são revogados;
+    retorna False para qualquer outro, sem guardar nada. Levanta
+    `AuthServiceBusy` se a lista de revogados estiver cheia.
+    """
+    key = _token_key(token)
+    if key in revoked_tokens:
+        return True
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    if not payload.get("sub"):
+        return False
+
+    now = time.time()
+    expires_at = payload.get("exp")
+    if expires_at is None:
+        expires_at = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    if expires_at <= now:
+        return True
+    if not revoked_tokens.add(key, expires_at):
+        logger.error(
+            "Lista de tokens revogados cheia (%d válidos): logout recusado; "
+            "aumente AUTH_REVOKED_TOKENS_MAX",
+            len(revoked_tokens),
+        )
+        raise AuthServiceBusy("Não foi possível encerrar a sessão, tente novamente")
+    token_cache.pop(key)
+    return True
+
+
+def revoke_all_tokens() -> None:
+    """Esquece todos os tokens verificados (ex.: troca de JWT_SECRET_KEY)."""
+    token_cache.clear()
+
+
+def get_token_cache_stats() -> dict:
+    stats = token_cache.get_stats()
+    stats["revoked"] = len(revoked_tokens)
+    stats["revocations_rejected"] = revoked_tokens.rejected
+    return stats
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Dependency para obter usuário atual a partir do token."""
+    username = verify_token_cached(token)
+    if not username:
         raise HTTPException(401, "Token inválido")
 
     # Aqui você precisaria injetar o repositório de usuários
@@ -72,39 +226,35 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     return username
 
 
-def check_rate_limit(client_ip: str, current_time: float):
-    """Verifica rate limiting para um IP."""
-    # Limpar requests antigos
-    request_counts[client_ip] = [
-        req_time
-        for req_time in request_counts[client_ip]
-        if current_time - req_time < RATE_LIMIT_WINDOW
-    ]
+def _retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
 
-    # Verificar limite
-    if len(request_counts[client_ip]) >= RATE_LIMIT_MAX_REQUESTS:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
 
-    # Adicionar request atual
-    request_counts[client_ip].append(current_time)
+def check_rate_limit(client_ip: str, current_time: float):
+    """Verifica rate limiting para um IP."""
+    allowed, retry_after = global_rate_limiter.acquire(client_ip, current_time)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers=_retry_after_header(retry_after),
+        )
 
 
 def check_login_rate_limit(client_ip: str, current_time: float):
     """Verifica rate limiting específico para login."""
-    # Limpar tentativas antigas
-    login_attempts = [
-        attempt_time
-        for attempt_time in request_counts.get(f"login_{client_ip}", [])
-        if current_time - attempt_time < RATE_LIMIT_WINDOW
-    ]
-
-    # Verificar limite de tentativas de login
-    if len(login_attempts) >= LOGIN_RATE_LIMIT_MAX:
+    allowed, retry_after = login_rate_limiter.acquire(client_ip, current_time)
+    if not allowed:
         raise HTTPException(
-            status_code=429, detail="Too many login attempts. Try again later."
+            status_code=429,
+            detail="Too many login attempts. Try again later.",
+            headers=_retry_after_header(retry_after),
         )
 
-    # Adicionar tentativa
-    if f"login_{client_ip}" not in request_counts:
-        request_counts[f"login_{client_ip}"] = []
-    request_counts[f"login_{client_ip}"].append(current_time)
+
+def get_rate_limit_stats() -> dict:
+    return {
+        "store": rate_limit_store.get_stats(),
+        "global": global_rate_limiter.get_stats(),
+        "login": login_rate_limiter.get_stats(),
+    }
@@ -0,0 +1,142 @@
+import asyncio
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+
+from ...domain.entities.log import Log
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # exportação colunar é opcional
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = ["id", "timestamp", "event", "count", "user", "details", "created_at"]
+
+
+def columnar_export_available() -> bool:
+    return pa is not None
+
+
+def _row(log: Log) -> list:
+    details = log.details or {}
+    return [
+        log.id,
+        log.timestamp.isoformat() if log.timestamp else "",
+        details.get("event", ""),
+        log.count,
+        log.user or "",
+        json.dumps(details, ensure_ascii=False, separators=(",", ":")),
+        log.created_at.isoformat() if log.created_at else "",
+    ]
+
+
+async def csv_export_chunks(batches: AsyncIterator[List[Log]]) -> AsyncIterator[bytes]:
+    """CSV em pedaços: um pedaço por lote lido do cursor do banco."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    async for batch in batches:
+        writer.writerows(_row(log) for log in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Arquivo só-escrita que acumula bytes até serem drenados pela resposta."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        chunks, self._chunks = self._chunks, []
+        return b"".join(chunks)
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("event", pa.string()),
+        ("count", pa.int32()),
+        ("user", pa.string()),
+        ("details", pa.string()),
+        ("created_at", pa.timestamp("us")),
+    ])
+
+
+def _to_record_batch(batch: List[Log], schema):
+    details = [log.details or {} for log in batch]
+    return pa.record_batch(
+        [
+            pa.array([log.id for log in batch], pa.string()),
+            pa.array([log.timestamp for log in batch], pa.timestamp("us")),
+            pa.array([d.get("event") for d in details], pa.string()),
+            pa.array([log.count for log in batch], pa.int32()),
+            pa.array([log.user for log in batch], pa.string()),
+            pa.array(
+                [json.dumps(d, ensure_ascii=False, separators=(",", ":")) for d in details],
+                pa.string(),
+            ),
+            pa.array([log.created_at for log in batch], pa.timestamp("us")),
+        ],
+        schema=schema,
+    )
+
+
+async def columnar_export_chunks(
+    batches: AsyncIterator[List[Log]], fmt: str = "parquet"
+) -> AsyncIterator[bytes]:
+    """Parquet (um row group por lote) ou Arrow IPC stream, em pedaços.
+
+    A conversão e a compressão rodam numa thread para não travar o event
+    loop; cada pedaço é drenado do sink assim que o lote é escrito.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow não está instalado")
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+
+    try:
+        async for batch in batches:
+            if not batch:
+                continue
+            await asyncio.to_thread(lambda b=batch: writer.write_batch(_to_record_batch(b, schema)))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        # Rodapé (Parquet) / marcador de fim (Arrow)
+        writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
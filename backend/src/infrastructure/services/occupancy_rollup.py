@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from ...domain.entities.occupancy import OccupancyBucket
+from ...domain.ports.occupancy_repository import OccupancyRepository
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("minute", "hour")
+DEFAULT_CAMERA = "default"
+
+
+def parse_event_timestamp(value) -> datetime:
+    """Timestamp ISO de um evento do detector (agora, se ausente/inválido)."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now()
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class OccupancyRollup:
+    """Mantém incrementalmente os rollups de ocupação por minuto e por hora.
+
+    `add` recebe cada evento do detector (ENTRY, EXIT e amostras OCCUPANCY)
+    e só atualiza deltas em memória; `flush` soma esses deltas às tabelas
+    com um upsert por granularidade. Entradas, saídas e permanência vêm dos
+    eventos; a ocupação média vem das amostras periódicas.
+    """
+
+    def __init__(self, repository: OccupancyRepository, flush_interval: float = 5.0):
+        self.repository = repository
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, datetime], OccupancyBucket] = {}
+
+        # Métricas
+        self.events_applied = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """Aplica um evento aos deltas pendentes (chamado na thread de detecção)."""
+        kind = event.get("event")
+        camera = event.get("camera") or DEFAULT_CAMERA
+        timestamp = parse_event_timestamp(event.get("timestamp"))
+        count = event.get("current_count")
+
+        with self._lock:
+            for granularity in GRANULARITIES:
+                key = (granularity, camera, bucket_start(timestamp, granularity))
+                bucket = self._pending.get(key)
+                if bucket is None:
+                    bucket = OccupancyBucket(camera=camera, bucket=key[2])
+                    self._pending[key] = bucket
+
+                if kind == "ENTRY":
+                    bucket.entries += 1
+                elif kind == "EXIT":
+                    bucket.exits += 1
+                    if event.get("duration_seconds") is not None:
+                        bucket.dwell_seconds_sum += float(event["duration_seconds"])
+                        bucket.dwell_count += 1
+                elif kind == "OCCUPANCY" and count is not None:
+                    bucket.occupancy_sum += int(count)
+                    bucket.occupancy_samples += 1
+
+                if count is not None:
+                    bucket.peak_occupancy = max(bucket.peak_occupancy, int(count))
+            self.events_applied += 1
+
+    async def flush(self, force: bool = False) -> None:
+        """Grava os deltas pendentes; em caso de falha eles voltam para a próxima vez.
+
+        Sem `force`, grava no máximo uma vez por `flush_interval` (os deltas
+        de vários segundos viram um único upsert por granularidade).
+        """
+        if not force and time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        by_granularity = {granularity: [] for granularity in GRANULARITIES}
+        for (granularity, _, _), bucket in pending.items():
+            by_granularity[granularity].append(bucket)
+
+        done = set()
+        try:
+            for granularity, buckets in by_granularity.items():
+                await self.repository.upsert(granularity, buckets)
+                done.add(granularity)
+            self.flushes += 1
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning(f"Falha ao gravar rollups de ocupação: {e}")
+            self._restore(
+                {key: bucket for key, bucket in pending.items() if key[0] not in done}
+            )
+
+    def _restore(self, pending: Dict[Tuple[str, str, datetime], OccupancyBucket]) -> None:
+        with self._lock:
+            for key, old in pending.items():
+                bucket = self._pending.get(key)
+                if bucket is None:
+                    self._pending[key] = old
+                    continue
+                bucket.entries += old.entries
+                bucket.exits += old.exits
+                bucket.occupancy_sum += old.occupancy_sum
+                bucket.occupancy_samples += old.occupancy_samples
+                bucket.dwell_seconds_sum += old.dwell_seconds_sum
+                bucket.dwell_count += old.dwell_count
+                bucket.peak_occupancy = max(bucket.peak_occupancy, old.peak_occupancy)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending_buckets": len(self._pending),
+            "events_applied": self.events_applied,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
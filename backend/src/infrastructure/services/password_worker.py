@@ -0,0 +1,138 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from passlib.hash import bcrypt
+
+from ...domain.ports.auth_service import AuthServiceBusy
+
+
+class PasswordWorker:
+    """Executa bcrypt (hash/verify) num pool de threads dedicado e limitado.
+
+    bcrypt libera o GIL, então o event loop segue servindo streams enquanto
+    senhas são processadas. Com `max_pending` tarefas em andamento ou na
+    fila, novas chamadas falham na hora com `AuthServiceBusy` (HTTP 429)
+    em vez de acumular requisições.
+
+    O tempo de CPU de cada hash (EWMA) ajusta o custo (rounds) dos próximos
+    hashes para ficar perto de `target_ms` no hardware atual. Em execução o
+    custo só sobe; baixar fica para a calibração da inicialização, para que
+    carga na máquina nunca enfraqueça os hashes. Hashes existentes
+    continuam válidos: o custo fica gravado no próprio hash.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        rounds: int,
+        min_rounds: int,
+        max_rounds: int,
+        target_ms: float,
+    ):
+        self.max_pending = max(1, max_pending)
+        self.min_rounds = min_rounds
+        self.max_rounds = max(min_rounds, max_rounds)
+        self.rounds = min(max(rounds, self.min_rounds), self.max_rounds)
+        self.target_ms = target_ms
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="PasswordWorker"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        # Métricas
+        self.hashes = 0
+        self.verifications = 0
+        self.rejected = 0
+        self.hash_ms = 0.0  # EWMA do custo por hash no `rounds` atual
+        self.verify_ms = 0.0
+
+    async def _submit(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise AuthServiceBusy("Serviço de autenticação ocupado, tente novamente")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    # Operações -------------------------------------------------------------
+
+    def _hash(self, password: str, allow_decrease: bool = False) -> str:
+        rounds = self.rounds
+        # CPU da thread, não relógio: fila no pool e threads concorrentes não contam
+        started = time.thread_time()
+        hashed = bcrypt.using(rounds=rounds).hash(password)
+        self._record_hash(rounds, (time.thread_time() - started) * 1000, allow_decrease)
+        return hashed
+
+    def _verify(self, plain: str, hashed: str) -> bool:
+        started = time.perf_counter()
+        try:
+            return bcrypt.verify(plain, hashed)
+        except ValueError:
+            # Hash malformado no banco: trata como senha incorreta
+            return False
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.verify_ms = elapsed if not self.verify_ms else 0.8 * self.verify_ms + 0.2 * elapsed
+
+    async def hash(self, password: str) -> str:
+        result = await self._submit(self._hash, password)
+        self.hashes += 1
+        return result
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        result = await self._submit(self._verify, plain, hashed)
+        self.verifications += 1
+        return result
+
+    async def calibrate(self) -> None:
+        """Mede um hash descartável para ajustar o custo já na inicialização.
+
+        Único momento em que o custo pode baixar (ex.: `rounds` configurado
+        alto demais para o hardware).
+        """
+        await self._submit(self._hash, os.urandom(16).hex(), True)
+        self.hashes += 1
+
+    # Custo adaptativo ------------------------------------------------------
+
+    def _record_hash(self, rounds: int, elapsed_ms: float, allow_decrease: bool) -> None:
+        with self._lock:
+            if rounds != self.rounds:
+                return
+            self.hash_ms = elapsed_ms if not self.hash_ms else 0.7 * self.hash_ms + 0.3 * elapsed_ms
+            # Cada round dobra o custo do bcrypt
+            delta = math.log2(self.target_ms / max(self.hash_ms, 1e-3))
+            if delta >= 0.75 or (allow_decrease and delta <= -0.75):
+                new_rounds = min(max(rounds + round(delta), self.min_rounds), self.max_rounds)
+                if new_rounds != rounds:
+                    self.rounds = new_rounds
+                    self.hash_ms = self.hash_ms * 2 ** (new_rounds - rounds)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "target_ms": self.target_ms,
+            "hash_ms": round(self.hash_ms, 1),
+            "verify_ms": round(self.verify_ms, 1),
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "hashes": self.hashes,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+        }
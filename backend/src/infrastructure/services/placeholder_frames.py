@@ -0,0 +1,93 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Resolução de referência dos layouts abaixo
+BASE_SIZE = (640, 480)
+
+# Textos de cada estado: (texto, posição, escala da fonte, cor BGR, espessura)
+PLACEHOLDER_LAYOUTS = {
+    "waiting": [
+        ("AGUARDANDO LIBERACAO", (120, 200), 0.8, (0, 255, 255), 2),
+        ("Clique em 'Iniciar Stream'", (140, 240), 0.6, (255, 255, 255), 1),
+    ],
+    "no_detector": [
+        ("DETECTOR NAO INICIADO", (150, 240), 1.0, (0, 0, 255), 2),
+    ],
+    "error": [
+        ("SEM SINAL DA CAMERA", (150, 220), 0.9, (0, 0, 255), 2),
+        ("Verifique a fonte de video", (160, 260), 0.6, (255, 255, 255), 1),
+    ],
+}
+
+
+class PlaceholderFrames:
+    """Cache de frames de status já codificados em JPEG.
+
+    Cada estado é desenhado e codificado uma única vez por (estado, resolução,
+    qualidade); streams ociosos só reenviam os mesmos bytes.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, int, int, int], bytes] = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def get(
+        self,
+        kind: str,
+        width: int = BASE_SIZE[0],
+        height: int = BASE_SIZE[1],
+        quality: int = 50,
+    ) -> Optional[bytes]:
+        """Retorna os bytes JPEG do estado `kind` na resolução pedida."""
+        key = (kind, width, height, quality)
+        chunk = self._cache.get(key)
+        if chunk is not None:
+            return chunk
+
+        with self._lock:
+            chunk = self._cache.get(key)
+            if chunk is None:
+                chunk = self._render(kind, width, height, quality)
+                if chunk is not None:
+                    self._cache[key] = chunk
+        return chunk
+
+    def get_scaled(self, kind: str, scale: float = 1.0, quality: int = 50) -> Optional[bytes]:
+        """Atalho para a resolução base reduzida pelo degrau do stream."""
+        return self.get(
+            kind, int(BASE_SIZE[0] * scale), int(BASE_SIZE[1] * scale), quality
+        )
+
+    def _render(self, kind: str, width: int, height: int, quality: int) -> Optional[bytes]:
+        layout = PLACEHOLDER_LAYOUTS.get(kind)
+        if layout is None:
+            return None
+
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        factor = width / BASE_SIZE[0]
+        for text, (x, y), font_scale, color, thickness in layout:
+            cv2.putText(
+                frame,
+                text,
+                (int(x * factor), int(y * factor)),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                font_scale * factor,
+                color,
+                max(1, int(round(thickness * factor))),
+            )
+
+        ret, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ret:
+            return None
+        self.renders += 1
+        return buffer.tobytes()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"cached": len(self._cache), "renders": self.renders}
+
+
+placeholder_frames = PlaceholderFrames()
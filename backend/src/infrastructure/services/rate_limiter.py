@@ -0,0 +1,179 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o backend em memória
+    fcntl = None
+
+# Estado de um bucket: (tokens, último refill em epoch segundos)
+BucketState = Tuple[float, float]
+
+
+class MemoryBucketStore:
+    """Estado dos buckets em memória, limitado a `max_entries` (LRU).
+
+    Clientes ociosos são os primeiros a sair; um cliente removido volta com
+    o bucket cheio, o que é o mesmo que ele teria após ficar ocioso.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._buckets: "OrderedDict[str, BucketState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def update(self, key: str, fn) -> Any:
+        """Aplica `fn(estado|None) -> (novo_estado, resultado)` atomicamente."""
+        with self._lock:
+            state, result = fn(self._buckets.get(key))
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._buckets),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
+
+
+class SharedFileBucketStore:
+    """Estado dos buckets num arquivo mapeado em memória, compartilhado entre workers.
+
+    Tabela hash de tamanho fixo (`slots` registros de 24 bytes: hash da
+    chave, tokens, último refill) com sondagem linear curta. Sem slot livre
+    na vizinhança, o bucket ocioso há mais tempo é substituído. Cada
+    atualização segura um `flock` exclusivo no arquivo, então processos
+    diferentes enxergam o mesmo limite.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int):
+        if fcntl is None:
+            raise RuntimeError("Backend compartilhado de rate limit requer fcntl (POSIX)")
+        self.path = path
+        self.slots = max(self.PROBES, slots)
+        size = self.slots * self.SLOT.size
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, size)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return value or 1  # 0 marca slot livre
+
+    def _find_slot(self, key_hash: int) -> Tuple[int, Optional[BucketState]]:
+        mm = self._mm
+        start = key_hash % self.slots
+        victim, victim_last = None, None
+        for i in range(self.PROBES):
+            slot = (start + i) % self.slots
+            stored_hash, tokens, last = self.SLOT.unpack_from(mm, slot * self.SLOT.size)
+            if stored_hash == key_hash:
+                return slot, (tokens, last)
+            if stored_hash == 0:
+                return slot, None
+            if victim_last is None or last < victim_last:
+                victim, victim_last = slot, last
+        self.evictions += 1
+        return victim, None
+
+    def update(self, key: str, fn) -> Any:
+        key_hash = self._hash(key)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                slot, state = self._find_slot(key_hash)
+                new_state, result = fn(state)
+                self.SLOT.pack_into(self._mm, slot * self.SLOT.size, key_hash, *new_state)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "shared",
+            "path": self.path,
+            "slots": self.slots,
+            "evictions": self.evictions,
+        }
+
+
+class TokenBucketLimiter:
+    """Token bucket por chave: O(1) por requisição e estado de tamanho fixo.
+
+    `capacity` é a rajada permitida; tokens são repostos continuamente a
+    `refill_per_second`. `prefix` separa limites diferentes no mesmo store.
+    """
+
+    def __init__(self, store, prefix: str, capacity: float, refill_per_second: float):
+        self.store = store
+        self.prefix = prefix
+        self.capacity = max(1.0, capacity)
+        self.refill_per_second = max(1e-6, refill_per_second)
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: str, now: float) -> Tuple[bool, float]:
+        """Consome um token. Retorna (permitido, segundos até o próximo token)."""
+        capacity, rate = self.capacity, self.refill_per_second
+
+        def take(state: Optional[BucketState]):
+            if state is None:
+                tokens = capacity
+            else:
+                tokens, last = state
+                tokens = min(capacity, tokens + max(0.0, now - last) * rate)
+            if tokens >= 1.0:
+                return (tokens - 1.0, now), (True, 0.0)
+            return (tokens, now), (False, (1.0 - tokens) / rate)
+
+        allowed, retry_after = self.store.update(f"{self.prefix}:{key}", take)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, retry_after
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "refill_per_second": round(self.refill_per_second, 4),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def create_bucket_store(backend: str, max_entries: int, shared_path: str = ""):
+    """Store configurado: "memory" (por processo) ou "shared" (arquivo mmap)."""
+    if backend == "shared":
+        if not shared_path:
+            base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            shared_path = os.path.join(base, "shomer_ratelimit.bin")
+        return SharedFileBucketStore(shared_path, max_entries)
+    return MemoryBucketStore(max_entries)
@@ -0,0 +1,303 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ...shared.config import Config
+
+
+class StreamLimitExceeded(Exception):
+    """Limite global de streams atingido com o orçamento de codificação excedido."""
+
+
+class StreamPolicy:
+    """Política de entrega de um cliente de stream (degrau, FPS, latência e buffer)."""
+
+    def __init__(
+        self,
+        rung: str,
+        target_fps: float,
+        jpeg_quality: int,
+        scale: float,
+        max_latency: float,
+        max_buffered_bytes: int,
+        annotate: bool = True,
+        rewind_seconds: float = 0.0,
+        speed: float = 1.0,
+    ):
+        self.rung = rung
+        self.target_fps = target_fps
+        self.jpeg_quality = jpeg_quality
+        self.scale = scale
+        self.max_latency = max_latency  # segundos
+        self.max_buffered_bytes = max_buffered_bytes
+        # False = frames crus; o cliente desenha o overlay via /detections/stream
+        self.annotate = annotate
+        # Replay do ring de frames antes de seguir ao vivo (0 = só ao vivo)
+        self.rewind_seconds = rewind_seconds
+        self.speed = speed
+
+    @classmethod
+    def from_request(
+        cls,
+        fps: Optional[float] = None,
+        max_latency_ms: Optional[int] = None,
+        max_buffer_kb: Optional[int] = None,
+        rung: Optional[str] = None,
+        annotate: Optional[bool] = None,
+        rewind_seconds: Optional[float] = None,
+        speed: Optional[float] = None,
+    ) -> "StreamPolicy":
+        """Cria a política a partir dos parâmetros do cliente, limitada pela config."""
+        stream_config = Config.get_stream_config()
+
+        rungs = stream_config["rungs"]
+        if rung not in rungs:
+            rung = stream_config["default_rung"]
+        rung_config = rungs[rung]
+
+        target_fps = fps if fps and fps > 0 else rung_config["fps"]
+        target_fps = min(max(target_fps, 1.0), stream_config["max_fps"])
+
+        latency_ms = max_latency_ms if max_latency_ms and max_latency_ms > 0 else stream_config["max_latency_ms"]
+        latency_ms = min(latency_ms, stream_config["max_latency_ms"])
+
+        buffer_kb = max_buffer_kb if max_buffer_kb and max_buffer_kb > 0 else stream_config["max_buffer_kb"]
+        buffer_kb = min(buffer_kb, stream_config["max_buffer_kb"])
+
+        return cls(
+            rung=rung,
+            target_fps=target_fps,
+            jpeg_quality=rung_config["jpeg_quality"],
+            scale=rung_config["scale"],
+            max_latency=latency_ms / 1000.0,
+            max_buffered_bytes=buffer_kb * 1024,
+            annotate=True if annotate is None else annotate,
+            rewind_seconds=max(rewind_seconds or 0.0, 0.0),
+            speed=min(max(speed or 1.0, 0.25), Config.RING_MAX_SPEED),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rung": self.rung,
+            "target_fps": self.target_fps,
+            "jpeg_quality": self.jpeg_quality,
+            "scale": self.scale,
+            "max_latency_ms": int(self.max_latency * 1000),
+            "max_buffer_kb": self.max_buffered_bytes // 1024,
+            "annotate": self.annotate,
+            "rewind_seconds": self.rewind_seconds,
+            "speed": self.speed,
+        }
+
+
+class StreamSession:
+    """Sessão de stream de um cliente com buffer limitado que descarta frames antigos.
+
+    O produtor oferece frames já codificados; o consumidor (resposta HTTP) retira
+    o próximo frame quando o cliente termina de receber o anterior. Se o cliente
+    fica para trás, frames antigos são descartados em vez de enfileirados.
+    """
+
+    def __init__(self, policy: StreamPolicy, client: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.policy = policy
+        self.client = client
+        self.started_at = time.time()
+        self.closed = False
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.encode_seconds = 0.0
+        self.latency = 0.0  # média móvel captura -> entrega (segundos)
+        self._current_captured_at = None
+
+        self._buffer = deque()  # (captured_at, chunk)
+        self._buffered_bytes = 0
+        self._ready = asyncio.Event()
+        self._sent_log = deque(maxlen=120)  # (monotonic, bytes)
+
+    def offer(self, chunk: bytes, captured_at: float) -> None:
+        """Enfileira um frame codificado, descartando os mais antigos se exceder o buffer."""
+        if self.closed:
+            return
+
+        self._buffer.append((captured_at, chunk))
+        self._buffered_bytes += len(chunk)
+
+        while self._buffered_bytes > self.policy.max_buffered_bytes and len(self._buffer) > 1:
+            self._drop_oldest()
+
+        self._ready.set()
+
+    async def next_chunk(self) -> Optional[bytes]:
+        """Aguarda e retorna o próximo frame a ser enviado (None se a sessão fechou)."""
+        while not self.closed:
+            now = time.time()
+            while self._buffer:
+                captured_at, chunk = self._buffer[0]
+                # Frame velho demais e já existe um mais novo: descartar
+                if now - captured_at > self.policy.max_latency and len(self._buffer) > 1:
+                    self._drop_oldest()
+                    continue
+                self._buffer.popleft()
+                self._buffered_bytes -= len(chunk)
+                self._current_captured_at = captured_at
+                return chunk
+
+            self._ready.clear()
+            await self._ready.wait()
+
+        return None
+
+    def mark_sent(self, nbytes: int) -> None:
+        """Registra um frame entregue ao cliente."""
+        self.frames_sent += 1
+        self.bytes_sent += nbytes
+        self._sent_log.append((time.monotonic(), nbytes))
+        if self._current_captured_at is not None:
+            latency = time.time() - self._current_captured_at
+            self.latency = latency if self.frames_sent == 1 else 0.9 * self.latency + 0.1 * latency
+            self._current_captured_at = None
+
+    def add_encode_time(self, seconds: float) -> None:
+        """Acumula o tempo gasto anotando/codificando frames desta sessão."""
+        self.encode_seconds += seconds
+
+    def close(self) -> None:
+        self.closed = True
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._ready.set()
+
+    def _drop_oldest(self) -> None:
+        _, old_chunk = self._buffer.popleft()
+        self._buffered_bytes -= len(old_chunk)
+        self.frames_dropped += 1
+
+    def _sent_window(self):
+        if len(self._sent_log) < 2:
+            return 0.0, 0
+        elapsed = self._sent_log[-1][0] - self._sent_log[0][0]
+        # bytes do primeiro item marcam o início da janela
+        nbytes = sum(size for _, size in self._sent_log) - self._sent_log[0][1]
+        return elapsed, nbytes
+
+    @property
+    def delivered_fps(self) -> float:
+        elapsed, _ = self._sent_window()
+        if elapsed <= 0:
+            return 0.0
+        return (len(self._sent_log) - 1) / elapsed
+
+    @property
+    def bytes_per_second(self) -> float:
+        elapsed, nbytes = self._sent_window()
+        if elapsed <= 0:
+            return 0.0
+        return nbytes / elapsed
+
+    @property
+    def encode_time_share(self) -> float:
+        """Fração de um núcleo gasta anotando/codificando para esta sessão."""
+        uptime = time.time() - self.started_at
+        if uptime <= 0:
+            return 0.0
+        return self.encode_seconds / uptime
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "client": self.client,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "rung": self.policy.rung,
+            "policy": self.policy.to_dict(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "delivered_fps": round(self.delivered_fps, 1),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "bytes_sent": self.bytes_sent,
+            "bytes_per_second": int(self.bytes_per_second),
+            "buffered_bytes": self._buffered_bytes,
+            "encode_time_share": round(self.encode_time_share, 4),
+            "latency_ms": round(self.latency * 1000),
+        }
+
+
+class StreamSessionRegistry:
+    """Registro das sessões de stream ativas com controle de admissão."""
+
+    def __init__(self, encode_budget: float, max_sessions_over_budget: int):
+        self.encode_budget = encode_budget
+        self.max_sessions_over_budget = max_sessions_over_budget
+        self._sessions: Dict[str, StreamSession] = {}
+        self.rejected = 0
+        self.terminated = 0
+
+    def register(self, session: StreamSession) -> None:
+        """Registra a sessão; recusa se o orçamento estiver excedido e o limite atingido."""
+        if (
+            self.total_encode_share() > self.encode_budget
+            and len(self._sessions) >= self.max_sessions_over_budget
+        ):
+            self.rejected += 1
+            raise StreamLimitExceeded(
+                f"Orçamento de codificação excedido com {len(self._sessions)} streams ativos"
+            )
+        self._sessions[session.id] = session
+
+    def unregister(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def get(self, session_id: str) -> Optional[StreamSession]:
+        return self._sessions.get(session_id)
+
+    def terminate(self, session_id: str) -> bool:
+        """Encerra uma sessão ativa. Retorna False se ela não existir."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session.close()
+        self.terminated += 1
+        return True
+
+    def total_encode_share(self) -> float:
+        return sum(s.encode_time_share for s in list(self._sessions.values()))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        sessions = [s.get_stats() for s in list(self._sessions.values())]
+        total_share = sum(s["encode_time_share"] for s in sessions)
+        return {
+            "active": len(sessions),
+            "bytes_per_second": sum(s["bytes_per_second"] for s in sessions),
+            "avg_latency_ms": (
+                round(sum(s["latency_ms"] for s in sessions) / len(sessions))
+                if sessions
+                else None
+            ),
+            "encode_budget": self.encode_budget,
+            "encode_time_share": round(total_share, 4),
+            "over_budget": total_share > self.encode_budget,
+            "max_sessions_over_budget": self.max_sessions_over_budget,
+            "rejected": self.rejected,
+            "terminated": self.terminated,
+            "sessions": sessions,
+        }
+
+
+# Registro global das sessões de stream
+stream_registry = StreamSessionRegistry(
+    encode_budget=Config.STREAM_ENCODE_BUDGET,
+    max_sessions_over_budget=Config.STREAM_MAX_SESSIONS_OVER_BUDGET,
+)
+
+
+def get_stream_sessions_stats() -> Dict[str, Any]:
+    """Retorna estatísticas do registro de sessões de stream."""
+    return stream_registry.get_stats()
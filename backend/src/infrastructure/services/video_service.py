@@ -1,50 +1,34 @@
 import cv2
-import numpy as np
 import asyncio
-from datetime import datetime
-from fastapi import Response
+import json
+import time
+from fastapi import Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from detection import VisualDetector
 from ...shared.config import Config
-
-
-# Cache de frames ultra-otimizado
-frame_cache = {
-    "last_frame": None,
-    "last_encoding": None,
-    "last_time": 0,
-    "cache_hits": 0,
-    "cache_misses": 0,
-}
-
-
-def encode_frame_ultra_fast(frame):
-    """Codificação ultra-rápida com cache inteligente e qualidade otimizada."""
-    global frame_cache
-
+from ...shared.utils.fast_json import etag_matches
+from .stream_session import (
+    StreamPolicy,
+    StreamSession,
+    StreamLimitExceeded,
+    stream_registry,
+)
+from .frame_protocol import pack_frame_message, FLAG_ANNOTATED, FLAG_PLACEHOLDER
+from .placeholder_frames import placeholder_frames
+from .frame_cache import encoded_frame_cache
+
+
+def encode_frame_ultra_fast(frame, quality=50):
+    """Codificação JPEG ultra-rápida (sem cache; ver `get_encoded_frame`)."""
     if frame is None:
         return None
 
     try:
-        current_time = datetime.now().timestamp()
-
-        # Cache inteligente - se frame muito similar ao anterior, reusar encoding
-        if (
-            frame_cache["last_frame"] is not None
-            and current_time - frame_cache["last_time"] < 0.02
-        ):  # 20ms cache
-
-            # Verificação rápida de similaridade (sample menor para velocidade)
-            if np.array_equal(frame[::16, ::16], frame_cache["last_frame"][::16, ::16]):
-                frame_cache["cache_hits"] += 1
-                return frame_cache["last_encoding"]
-
-        frame_cache["cache_misses"] += 1
-
         # Parâmetros de encoding ultra-otimizados para velocidade máxima
         encode_params = [
             cv2.IMWRITE_JPEG_QUALITY,
-            50,  # Qualidade reduzida para velocidade máxima
+            quality,  # Qualidade reduzida para velocidade máxima
             cv2.IMWRITE_JPEG_OPTIMIZE,
             0,  # Sem otimização = mais rápido
             cv2.IMWRITE_JPEG_PROGRESSIVE,
@@ -54,20 +38,7 @@ def encode_frame_ultra_fast(frame):
         ret, buffer = cv2.imencode(".jpg", frame, encode_params)
 
         if ret and buffer is not None:
-            encoded = buffer.tobytes()
-
-            # Atualizar cache com sample menor
-            frame_cache.update(
-                {
-                    "last_frame": frame[
-                        ::16, ::16
-                    ].copy(),  # Sample menor para comparação
-                    "last_encoding": encoded,
-                    "last_time": current_time,
-                }
-            )
-
-            return encoded
+            return buffer.tobytes()
 
     except Exception as e:
         pass
@@ -75,112 +46,265 @@ def encode_frame_ultra_fast(frame):
     return None
 
 
-async def generate_ultra_fast_stream(detector, camera_config):
-    """Gerador de stream ultra-otimizado com FPS máximo."""
-    if not detector:
-        # Stream de erro se detector não disponível
-        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(
-            error_frame,
-            "DETECTOR NAO INICIADO",
-            (150, 240),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 0, 255),
-            2,
-        )
-
-        chunk = encode_frame_ultra_fast(error_frame)
-        if chunk:
-            while True:
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n"
-                    b"Content-Length: "
-                    + str(len(chunk)).encode()
-                    + b"\r\n\r\n"
-                    + chunk
-                    + b"\r\n"
-                )
-                await asyncio.sleep(0.016)  # ~60 FPS para erro
-        return
+def get_encoded_frame(detector, packet, scale=1.0, quality=50, annotate=True):
+    """Retorna (jpeg, results) do frame do `packet` na rendição pedida.
 
-    frame_count = 0
+    Usa o cache LRU por (fonte, seq, rendição, anotado): cada frame é anotado e
+    codificado uma única vez por rendição, não importa quantos consumidores.
+    `results` é o snapshot de detecções usado na anotação.
+    """
+    seq, _, frame = packet
+    key = (detector.instance_id, seq, f"{scale:g}@q{quality}", annotate)
 
-    while True:
-        try:
-            # Verificar se stream está habilitado
-            if not camera_config["stream_enabled"]:
-                # Frame de "aguardando liberação"
-                waiting_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(
-                    waiting_frame,
-                    "AGUARDANDO LIBERACAO",
-                    (120, 200),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.8,
-                    (0, 255, 255),
-                    2,
-                )
-                cv2.putText(
-                    waiting_frame,
-                    "Clique em 'Iniciar Stream'",
-                    (140, 240),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6,
-                    (255, 255, 255),
-                    1,
-                )
+    entry = encoded_frame_cache.get(key)
+    if entry is not None:
+        return entry
 
-                chunk = encode_frame_ultra_fast(waiting_frame)
-                if chunk:
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n"
-                        b"Content-Length: "
-                        + str(len(chunk)).encode()
-                        + b"\r\n\r\n"
-                        + chunk
-                        + b"\r\n"
-                    )
-                await asyncio.sleep(0.1)  # 10 FPS para frame de espera
-                continue
+    # Snapshot único: boxes desenhadas == boxes enviadas junto do frame
+    results = detector.get_detection_results()
+    if annotate:
+        frame = detector.detect_and_annotate(frame, results)
+    jpeg = encode_frame_ultra_fast(_scale_for_rung(frame, scale), quality)
+    if not jpeg:
+        return None
 
-            # Obter frame mais recente
-            frame = detector.get_frame()
+    entry = (jpeg, results)
+    encoded_frame_cache.put(key, entry, len(jpeg))
+    return entry
+
+
+def _mjpeg_part(chunk: bytes) -> bytes:
+    """Monta uma parte multipart/x-mixed-replace com o JPEG."""
+    return (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n"
+        b"Content-Length: "
+        + str(len(chunk)).encode()
+        + b"\r\n\r\n"
+        + chunk
+        + b"\r\n"
+    )
 
-            if frame is not None:
-                # Anotar frame (usa cache de detecções)
-                annotated_frame = detector.detect_and_annotate(frame)
 
-                # Encoding ultra-rápido
-                chunk = encode_frame_ultra_fast(annotated_frame)
+def _scale_for_rung(frame, scale: float):
+    """Reduz a resolução do frame conforme o degrau da sessão."""
+    if scale >= 1.0:
+        return frame
+    h, w = frame.shape[:2]
+    return cv2.resize(
+        frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+    )
 
-                if chunk:
-                    frame_count += 1
 
-                    # Yield do frame SEM LIMITE DE FPS
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n"
-                        b"Content-Length: "
-                        + str(len(chunk)).encode()
-                        + b"\r\n\r\n"
-                        + chunk
-                        + b"\r\n"
-                    )
+def _scale_results(results, scale: float):
+    """Escala as boxes dos resultados para a resolução do degrau."""
+    if scale >= 1.0:
+        return results
+    scaled = dict(results)
+    for key in ("people_boxes", "face_boxes"):
+        scaled[key] = [
+            tuple(int(v * scale) for v in box) for box in results.get(key, [])
+        ]
+    return scaled
 
-            # Yield mínimo para não travar (sem limite de FPS)
-            await asyncio.sleep(0.001)
 
-        except Exception as e:
-            await asyncio.sleep(0.01)
+def _offer_placeholder(session: StreamSession, kind: str, binary: bool) -> None:
+    """Oferece à sessão o frame de status pré-codificado."""
+    chunk = placeholder_frames.get_scaled(
+        kind, session.policy.scale, session.policy.jpeg_quality
+    )
+    if not chunk:
+        return
+    now = time.time()
+    if binary:
+        chunk = pack_frame_message(0, now, chunk, flags=FLAG_PLACEHOLDER)
+    session.offer(chunk, now)
+
+
+async def _produce_stream_frames(
+    detector, camera_config, session: StreamSession, binary: bool = False
+):
+    """Produz frames para uma sessão no ritmo do FPS alvo do cliente.
+
+    Com `binary=True` cada frame é empacotado com o cabeçalho de detecções
+    (ver `frame_protocol`) para o stream WebSocket.
+    """
+    interval = 1.0 / session.policy.target_fps
+    refresh = Config.PLACEHOLDER_REFRESH_SECONDS
+    last_seq = None
+    placeholder_kind = None
+    placeholder_sent_at = 0.0
+    next_tick = time.monotonic()
+
+    while not session.closed:
+        try:
+            # Stream desabilitado ou câmera sem sinal: frame de status em cache
+            kind = None
+            packet = None
+            if not camera_config["stream_enabled"]:
+                kind = "waiting"
+            else:
+                packet = detector.get_frame_packet()
+                if packet is None or time.time() - packet[1] > Config.PLACEHOLDER_STALL_SECONDS:
+                    kind = "error"
+
+            if kind is not None:
+                now = time.monotonic()
+                if kind != placeholder_kind or now - placeholder_sent_at >= refresh:
+                    _offer_placeholder(session, kind, binary)
+                    placeholder_kind = kind
+                    placeholder_sent_at = now
+                last_seq = None
+                # Só verifica o estado; não reenvia nada até o próximo refresh
+                await asyncio.sleep(min(0.1, refresh))
+                next_tick = time.monotonic()
+                continue
+            placeholder_kind = None
+
+            # Só anota/codifica quando existe frame novo
+            if packet[0] != last_seq:
+                seq, captured_at, _ = packet
+                encode_start = time.perf_counter()
+                entry = get_encoded_frame(
+                    detector,
+                    packet,
+                    session.policy.scale,
+                    session.policy.jpeg_quality,
+                    session.policy.annotate,
+                )
+                session.add_encode_time(time.perf_counter() - encode_start)
+                if entry:
+                    chunk, results = entry
+                    if binary:
+                        chunk = pack_frame_message(
+                            seq,
+                            captured_at,
+                            chunk,
+                            _scale_results(results, session.policy.scale),
+                            detector.total_passed,
+                            FLAG_ANNOTATED if session.policy.annotate else 0,
+                        )
+                    session.offer(chunk, captured_at)
+                    last_seq = seq
+
+        except Exception:
+            pass
+
+        # Ritmo do FPS alvo; se atrasou, não tentar compensar em rajada
+        next_tick += interval
+        delay = next_tick - time.monotonic()
+        if delay < 0:
+            next_tick = time.monotonic()
+            delay = 0
+        await asyncio.sleep(delay)
+
+
+async def _produce_replay_frames(detector, session: StreamSession):
+    """Reproduz o histórico do ring de frames a partir de `rewind_seconds` atrás.
+
+    Os frames são lidos um a um do arquivo mapeado (nada é carregado em lote)
+    e entregues no ritmo original dividido por `speed`; com atraso, frames são
+    pulados. Termina quando alcança o ao vivo.
+    """
+    ring = detector.frame_ring
+    policy = session.policy
+    interval = 1.0 / policy.target_fps
+    cursor = ring.seek(time.time() - policy.rewind_seconds)
+    wall_start = time.monotonic()
+    media_start = None
+
+    while not session.closed:
+        record = ring.read_after(cursor)
+        if record is None:
+            return
+        cursor, timestamp, jpeg = record
+        if media_start is None:
+            media_start = timestamp
+
+        due = wall_start + (timestamp - media_start) / policy.speed
+        delay = due - time.monotonic()
+        if delay < -interval:
+            # Atrasado (ou speed alto para o FPS do cliente): pula o frame
+            continue
+        if delay > 0:
+            await asyncio.sleep(delay)
+        session.offer(jpeg, timestamp)
+
+
+async def _produce_with_replay(detector, camera_config, session: StreamSession):
+    """Replay do ring (se pedido e disponível) seguido do stream ao vivo."""
+    if session.policy.rewind_seconds > 0 and getattr(detector, "frame_ring", None):
+        try:
+            await _produce_replay_frames(detector, session)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+    await _produce_stream_frames(detector, camera_config, session)
+
+
+async def _error_stream():
+    """Stream de erro quando o detector não está disponível (baixa taxa de refresh)."""
+    chunk = placeholder_frames.get("no_detector")
+    if chunk:
+        part = _mjpeg_part(chunk)
+        while True:
+            yield part
+            await asyncio.sleep(Config.PLACEHOLDER_REFRESH_SECONDS)
+
+
+async def generate_ultra_fast_stream(detector, camera_config, session: StreamSession):
+    """Gerador de stream com FPS por cliente e descarte de frames atrasados.
+
+    Com `policy.rewind_seconds` o stream começa pelo histórico do ring de
+    frames e segue ao vivo quando o alcança.
+
+    A sessão já deve estar registrada em `stream_registry`; ela é removida
+    quando o cliente desconecta ou quando é encerrada pelo endpoint admin.
+    """
+    producer = asyncio.ensure_future(
+        _produce_with_replay(detector, camera_config, session)
+    )
 
+    try:
+        while True:
+            chunk = await session.next_chunk()
+            if chunk is None:
+                break
+            part = _mjpeg_part(chunk)
+            # O yield só retorna quando o cliente consumiu o frame (backpressure)
+            yield part
+            session.mark_sent(len(part))
+    finally:
+        producer.cancel()
+        _release_session(session)
+
+
+def _release_session(session: StreamSession) -> None:
+    """Fecha e remove a sessão do registro (idempotente)."""
+    session.close()
+    stream_registry.unregister(session.id)
+
+
+def get_video_feed_response(detector, camera_config, policy=None, client=None):
+    """Retorna resposta de streaming MJPEG ultra-otimizada.
+
+    Levanta `StreamLimitExceeded` se o registro recusar a nova sessão.
+    """
+    background = None
+    if not detector:
+        stream = _error_stream()
+    else:
+        session = StreamSession(policy or StreamPolicy.from_request(), client)
+        stream_registry.register(session)
+        stream = generate_ultra_fast_stream(detector, camera_config, session)
+        # Se o cliente some antes do 1º chunk, o `finally` do gerador nunca
+        # roda; a background task da resposta libera a sessão nesse caso
+        background = BackgroundTask(_release_session, session)
 
-def get_video_feed_response(detector, camera_config):
-    """Retorna resposta de streaming MJPEG ultra-otimizada."""
     return StreamingResponse(
-        generate_ultra_fast_stream(detector, camera_config),
+        stream,
+        background=background,
         media_type="multipart/x-mixed-replace; boundary=frame",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -194,62 +318,202 @@ def get_video_feed_response(detector, camera_config):
     )
 
 
-def get_demo_stream_response(detector, camera_config):
-    """Retorna imagem única ultra-otimizada."""
+async def serve_websocket_stream(websocket: WebSocket, detector, camera_config, policy=None):
+    """Stream binário via WebSocket: cada mensagem traz cabeçalho de detecções + JPEG.
+
+    Usa a mesma sessão/registro do MJPEG, então FPS por cliente, descarte de
+    frames atrasados e os controles admin valem também aqui.
+    """
+    await websocket.accept()
+
+    if not detector:
+        await websocket.close(code=1013)  # Try again later
+        return
+
+    client = websocket.client.host if websocket.client else None
+    session = StreamSession(policy or StreamPolicy.from_request(), client)
+    try:
+        stream_registry.register(session)
+    except StreamLimitExceeded:
+        await websocket.close(code=1013)
+        return
+
+    producer = asyncio.ensure_future(
+        _produce_stream_frames(detector, camera_config, session, binary=True)
+    )
+
+    async def _receive_until_disconnect():
+        # Cliente não precisa enviar nada; só detectamos o fechamento
+        try:
+            while True:
+                await websocket.receive()
+        except Exception:
+            pass
+        finally:
+            session.close()
+
+    receiver = asyncio.ensure_future(_receive_until_disconnect())
+
+    try:
+        while True:
+            message = await session.next_chunk()
+            if message is None:
+                break
+            await websocket.send_bytes(message)
+            session.mark_sent(len(message))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        producer.cancel()
+        receiver.cancel()
+        session.close()
+        stream_registry.unregister(session.id)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+async def generate_detection_events(detector, keepalive: float = 15.0):
+    """Gera eventos SSE com boxes, IDs de tracking e contadores a cada detecção.
+
+    Só envia quando há uma detecção nova; o custo não depende do número de
+    viewers desenhando o overlay no cliente.
+    """
+    last_seq = None
+    last_sent = time.monotonic()
+    poll_interval = max(getattr(detector, "detection_interval", 0.033) / 2, 0.005)
+
+    yield b"retry: 2000\n\n"
+
+    while True:
+        try:
+            event = detector.get_detection_event()
+            if event["detection_seq"] != last_seq:
+                last_seq = event["detection_seq"]
+                last_sent = time.monotonic()
+                payload = json.dumps(event, separators=(",", ":"))
+                yield (
+                    f"id: {last_seq}\nevent: detection\ndata: {payload}\n\n"
+                ).encode()
+            elif time.monotonic() - last_sent > keepalive:
+                last_sent = time.monotonic()
+                yield b": keepalive\n\n"
+        except Exception:
+            pass
+        await asyncio.sleep(poll_interval)
+
+
+def get_detection_events_response(detector):
+    """Retorna resposta SSE (text/event-stream) com as detecções."""
+    if not detector:
+        return Response(content=b"", status_code=503, headers={"Retry-After": "3"})
+
+    return StreamingResponse(
+        generate_detection_events(detector),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+def _snapshot_etag(detector, seq: int) -> str:
+    return f'"{detector.instance_id}-{seq}"'
+
+
+def _snapshot_response(chunk: bytes, etag: str, seq: int = 0) -> Response:
+    return Response(
+        content=chunk,
+        media_type="image/jpeg",
+        headers={
+            # no-cache = pode guardar, mas revalida com If-None-Match
+            "Cache-Control": "no-cache, max-age=0",
+            "ETag": etag,
+            "X-Frame-Seq": str(seq),
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+def _not_modified(etag: str, seq: int = 0) -> Response:
+    return Response(
+        status_code=304,
+        headers={
+            "Cache-Control": "no-cache, max-age=0",
+            "ETag": etag,
+            "X-Frame-Seq": str(seq),
+        },
+    )
+
+
+async def wait_for_frame_after(detector, after_seq: int, timeout: float):
+    """Aguarda (sem bloquear o loop) um frame com seq > `after_seq`.
+
+    Retorna o packet mais recente ou None se o tempo esgotar.
+    """
+    deadline = time.monotonic() + timeout
+    poll_interval = 1.0 / max(Config.TARGET_FPS, 1)
+
+    while True:
+        packet = detector.get_frame_packet()
+        # seq menor que o pedido = detector reiniciado; qualquer frame é novo
+        if packet is not None and (packet[0] > after_seq or detector.frame_seq < after_seq):
+            return packet
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(poll_interval)
+
+
+async def get_demo_stream_response(
+    detector, camera_config, if_none_match=None, after=None
+):
+    """Retorna imagem única com ETag por seq do frame.
+
+    - `If-None-Match` com o ETag atual responde 304 sem reenviar o JPEG.
+    - `after=<seq>` segura a requisição (long-poll) até existir frame mais novo;
+      se o prazo acabar, responde 304 apenas quando `If-None-Match` casa com o
+      frame `after`, e senão devolve o frame atual.
+    """
     if not detector:
         return Response(content=b"", status_code=503, headers={"Retry-After": "3"})
 
     try:
         # Verificar se stream está habilitado
         if not camera_config["stream_enabled"]:
-            # Frame de "aguardando liberação"
-            waiting_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(
-                waiting_frame,
-                "AGUARDANDO LIBERACAO",
-                (120, 200),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.8,
-                (0, 255, 255),
-                2,
-            )
-            cv2.putText(
-                waiting_frame,
-                "Clique em 'Iniciar Stream'",
-                (140, 240),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (255, 255, 255),
-                1,
-            )
-
-            chunk = encode_frame_ultra_fast(waiting_frame)
+            # Frame de "aguardando liberação" (pré-codificado)
+            etag = '"waiting"'
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+            chunk = placeholder_frames.get("waiting")
             if chunk:
-                return Response(
-                    content=chunk,
-                    media_type="image/jpeg",
-                    headers={
-                        "Cache-Control": "no-cache, max-age=0",
-                        "Pragma": "no-cache",
-                        "X-Content-Type-Options": "nosniff",
-                    },
-                )
-
-        frame = detector.get_frame()
-        if frame is not None:
-            frame = detector.detect_and_annotate(frame)
-            chunk = encode_frame_ultra_fast(frame)
+                return _snapshot_response(chunk, etag)
 
-            if chunk:
-                return Response(
-                    content=chunk,
-                    media_type="image/jpeg",
-                    headers={
-                        "Cache-Control": "no-cache, max-age=0",
-                        "Pragma": "no-cache",
-                        "X-Content-Type-Options": "nosniff",
-                    },
-                )
+        if after is not None:
+            packet = await wait_for_frame_after(
+                detector, after, Config.SNAPSHOT_LONG_POLL_TIMEOUT
+            )
+            if packet is None:
+                # Nada novo no prazo. 304 só vale para requisição condicional
+                # com o ETag do frame que o cliente já tem; senão, frame atual
+                etag = _snapshot_etag(detector, after)
+                if etag_matches(if_none_match, etag):
+                    return _not_modified(etag, after)
+                packet = detector.get_frame_packet()
+        else:
+            packet = detector.get_frame_packet()
+
+        if packet is not None:
+            seq = packet[0]
+            etag = _snapshot_etag(detector, seq)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag, seq)
+
+            entry = get_encoded_frame(detector, packet)
+            if entry:
+                return _snapshot_response(entry[0], etag, seq)
 
         return Response(status_code=204)  # No content
 
@@ -258,10 +522,7 @@ def get_demo_stream_response(detector, camera_config):
 
 
 def get_cache_stats():
-    """Retorna estatísticas do cache de frames."""
-    cache_ratio = frame_cache["cache_hits"] / max(frame_cache["cache_misses"], 1) * 100
-    return {
-        "cache_hits": frame_cache["cache_hits"],
-        "cache_misses": frame_cache["cache_misses"],
-        "cache_efficiency": f"{cache_ratio:.1f}%",
-    }
+    """Retorna estatísticas do cache de frames codificados."""
+    stats = encoded_frame_cache.get_stats()
+    stats["placeholders"] = placeholder_frames.get_stats()
+    return stats
@@ -5,11 +5,23 @@ from .helpers import (
     get_performance_stats, 
     get_health_info
 )
+from .cursor import encode_log_cursor, decode_log_cursor
+from .datetimes import to_naive_local
+from .ttl_cache import TTLCache, MISSING
+from .fast_json import dumps_bytes, etag_matches, SerializedResponseCache
 
 __all__ = [
     'export_log_csv', 
     'get_logs_list', 
     'get_detector_stats', 
     'get_performance_stats', 
-    'get_health_info'
+    'get_health_info',
+    'encode_log_cursor',
+    'decode_log_cursor',
+    'to_naive_local',
+    'TTLCache',
+    'MISSING',
+    'dumps_bytes',
+    'etag_matches',
+    'SerializedResponseCache'
 ]
@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from .datetimes import to_naive_local
+
+
+def encode_log_cursor(timestamp: datetime, log_id: str) -> str:
+    """Cursor opaco (base64 url-safe) da posição (timestamp, id) de um log."""
+    raw = json.dumps([timestamp.isoformat(), log_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverso de `encode_log_cursor`. Levanta ValueError se o cursor for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return to_naive_local(datetime.fromisoformat(timestamp)), str(log_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
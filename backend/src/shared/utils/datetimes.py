@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Optional
+
+
+def to_naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Datetime com fuso -> horário local sem fuso (naive e None ficam como estão).
+
+    As colunas `TIMESTAMP` (logs, rollups) guardam horário local sem fuso; o
+    asyncpg recusa datetimes com fuso nelas e o Python não compara os dois tipos.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+try:
+    import orjson
+except ImportError:  # opcional: cai no json da stdlib
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # Escalares numpy (np.float32, np.int64...) e qualquer outro tipo desconhecido
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps_bytes(data: Any) -> bytes:
+    """Serializa para JSON compacto em bytes (orjson quando instalado)."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class SerializedResponseCache:
+    """Corpo JSON já serializado (e seu ETag) por endpoint.
+
+    `get(chave, versão, build)` só chama `build()` e serializa quando a
+    versão mudou (ex.: seq do snapshot do detector) e o corpo atual tem mais
+    de `min_interval` segundos, ou quando passou `max_age` (partes sem versão,
+    como timestamps e stats de outros serviços). Entre uma coisa e outra,
+    qualquer número de clientes recebe os mesmos bytes: o custo do polling
+    não cresce com o número de dashboards abertos.
+
+    Feito para ser usado no event loop (sem lock): cada entrada é trocada
+    inteira, numa única atribuição.
+    """
+
+    def __init__(self, min_interval: float, max_age: float):
+        self.min_interval = min_interval
+        self.max_age = max(min_interval, max_age)
+        self._entries: Dict[Hashable, Tuple[Hashable, float, bytes, str]] = {}
+        self.builds = 0
+        self.hits = 0
+        self.not_modified = 0
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Tuple[bytes, str]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            cached_version, built_at, body, etag = entry
+            age = now - built_at
+            if age < self.min_interval or (cached_version == version and age < self.max_age):
+                self.hits += 1
+                return body, etag
+
+        body = dumps_bytes(build())
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self._entries[key] = (version, now, body, etag)
+        self.builds += 1
+        return body, etag
+
+    def get_stats(self) -> Dict[str, Any]:
+        served = self.builds + self.hits
+        return {
+            "serializer": "orjson" if orjson is not None else "json",
+            "builds": self.builds,
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / served, 3) if served else 0.0,
+        }
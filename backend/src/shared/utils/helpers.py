@@ -1,5 +1,6 @@
 import csv
 import io
+import time
 from datetime import datetime
 from typing import List
 from ..config import brasilia_now
@@ -78,12 +79,13 @@ def get_detector_stats(detector, camera_config):
 
     from ...infrastructure.services.video_service import get_cache_stats
     cache_stats = get_cache_stats()
+    snapshot = detector.get_stats_snapshot()
 
     stats_data = {
-        "current": detector.prev_count,
-        "total_passed": detector.total_passed,
+        "current": snapshot["current"],
+        "total_passed": snapshot["total_passed"],
         "status": "active",
-        "fps": detector.current_fps,
+        "fps": snapshot["capture_fps"],
         "cache_efficiency": cache_stats["cache_efficiency"],
         "camera": {
             "current_source": (
@@ -92,12 +94,10 @@ def get_detector_stats(detector, camera_config):
             "stream_enabled": camera_config["stream_enabled"],
         },
         "tracking": {
-            "total_entries": detector.person_tracking["total_entries"],
-            "total_exits": detector.person_tracking["total_exits"],
-            "current_persons": detector.person_tracking["current_session_persons"],
-            "session_duration": (
-                brasilia_now() - detector.person_tracking["session_start"]
-            ).total_seconds(),
+            "total_entries": snapshot["total_entries"],
+            "total_exits": snapshot["total_exits"],
+            "current_persons": snapshot["current_persons"],
+            "session_duration": time.time() - snapshot["session_start_ts"],
         },
     }
 
@@ -133,7 +133,10 @@ def get_performance_stats(detector, camera_config):
 
         stats = detector.get_performance_stats()
         from ...infrastructure.services.video_service import get_cache_stats
+        from ...infrastructure.services.stream_session import get_stream_sessions_stats
+        from ...infrastructure.services.hls_segmenter import hls_segmenter
         cache_stats = get_cache_stats()
+        streams = get_stream_sessions_stats()
 
         return {
             "capture_fps": stats.get("capture_fps", 0),
@@ -161,6 +164,20 @@ def get_performance_stats(detector, camera_config):
                 ),
                 "stream_enabled": camera_config["stream_enabled"],
             },
+            "streams": streams,
+            "video_outputs": {
+                "mjpeg": {
+                    "sessions": streams["active"],
+                    "encode_time_share": streams["encode_time_share"],
+                    "bytes_per_second": streams["bytes_per_second"],
+                    "avg_latency_ms": streams["avg_latency_ms"],
+                },
+                "hls": hls_segmenter.get_stats(),
+            },
+            "recording": {
+                "clips": stats.get("clips"),
+                "frame_ring": stats.get("frame_ring"),
+            },
         }
     except Exception as e:
         # Retornar resposta de erro estruturada em vez de 500
@@ -193,12 +210,21 @@ def get_health_info(detector, camera_config):
     """Health check ultra-rápido."""
     detector_info = {}
     if detector:
+        snapshot = detector.get_stats_snapshot()
+        # Resumo do tracking (sem as pessoas ativas nem objetos datetime)
         detector_info = {
-            "running": detector.running,
-            "prev_count": detector.prev_count,
-            "total_passed": detector.total_passed,
-            "current_fps": detector.current_fps,
-            "person_tracking": detector.person_tracking,
+            "running": snapshot["running"],
+            "prev_count": snapshot["current"],
+            "total_passed": snapshot["total_passed"],
+            "current_fps": snapshot["capture_fps"],
+            "person_tracking": {
+                "active_persons": snapshot["active_persons"],
+                "person_counter": snapshot["person_counter"],
+                "session_start": snapshot["session_start"],
+                "total_entries": snapshot["total_entries"],
+                "total_exits": snapshot["total_exits"],
+                "current_session_persons": snapshot["current_persons"],
+            },
         }
 
     return {
@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.infrastructure.recording import FrameRing  # noqa: E402
+
+
+class IdleDetector:
+    """Detector sem frames: o ring só recebe o que o teste anexa."""
+
+    instance_id = "test"
+
+    def get_frame_packet(self):
+        return None
+
+
+def make_ring(tmp_path, capacity=100 * 1024):
+    return FrameRing(
+        IdleDetector(),
+        capacity_bytes=capacity,
+        fps=1,
+        jpeg_quality=80,
+        annotate=False,
+        directory=str(tmp_path),
+    )
+
+
+def payload(seq: int, size: int) -> bytes:
+    return seq.to_bytes(8, "little") * (size // 8)
+
+
+def test_index_stays_bounded_across_many_wraps(tmp_path):
+    ring = make_ring(tmp_path)
+    rng = random.Random(0)
+    try:
+        for n in range(1, 50_001):
+            seq = ring.append(float(n), payload(n, rng.randint(1024, 9 * 1024)))
+            assert seq == n
+
+            if n % 1000 == 0:
+                stats = ring.get_stats()
+                # Menor registro possível: cabeçalho + 1 KB
+                assert stats["records"] <= ring.capacity // 1024
+                assert stats["used_bytes"] <= ring.capacity
+                assert len(ring._index) <= 2 * ring.COMPACT_MIN + stats["records"]
+    finally:
+        ring.close()
+
+
+def test_every_indexed_record_reads_back(tmp_path):
+    ring = make_ring(tmp_path)
+    rng = random.Random(1)
+    try:
+        for n in range(1, 20_001):
+            ring.append(float(n), payload(n, rng.randint(1024, 9 * 1024)))
+
+        stats = ring.get_stats()
+        cursor = ring.seek(0.0)
+        read = 0
+        while True:
+            record = ring.read_after(cursor)
+            if record is None:
+                break
+            seq, timestamp, jpeg = record
+            assert seq == cursor + 1 or read == 0
+            assert timestamp == float(seq)
+            assert jpeg == payload(seq, len(jpeg))
+            cursor = seq
+            read += 1
+
+        assert cursor == 20_000
+        assert read == stats["records"]
+        assert ring.read_conflicts == 0
+    finally:
+        ring.close()
+
+
+def test_seek_lands_before_first_frame_at_timestamp(tmp_path):
+    ring = make_ring(tmp_path)
+    try:
+        for n in range(1, 5_001):
+            ring.append(float(n), payload(n, 4096))
+        oldest = ring.oldest_timestamp
+        assert ring.seek(4_990.0) == 4_989
+        assert ring.seek(0.0) == int(oldest) - 1
+        assert ring.seek(10_000.0) == 5_000
+    finally:
+        ring.close()